@@ -0,0 +1,440 @@
+""" A module for sending a built model to a solver.
+
+Each backend takes the same VariableIndexes and ConstraintMatrix, and
+returns a SolveResult holding the value of each variable, indexed by
+variable id.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+import multiprocessing
+from multiprocessing.connection import Connection
+from timeit import default_timer as timer
+from typing import Callable
+from typing import Dict
+from typing import List
+
+import numpy as np
+from ortools.linear_solver import linear_solver_pb2
+from ortools.linear_solver import pywraplp
+from ortools.sat.python import cp_model
+
+from constraints import Constraints
+from constraints import room_slots_of
+from data import BIG_M_CONFLICTS
+from data import CBC_BACKEND
+from data import CP_SAT_BACKEND
+from data import ModelBuilderInput
+from data import ModelOptions
+from data import NO_OVERLAP_CONFLICTS
+from data import OCCUPANCY_CONFLICTS
+from data import SolverOptions
+from matrix import ConstraintMatrix
+from matrix import to_model_proto
+from timer import Timer
+from variables import VariableIndexes
+from variables import mask_days
+
+
+""" Solve statuses shared by all backends. """
+OPTIMAL = 'OPTIMAL'
+FEASIBLE = 'FEASIBLE'
+INFEASIBLE = 'INFEASIBLE'
+UNKNOWN = 'UNKNOWN'
+
+
+@dataclass
+class SolveResult:
+    """ The outcome of a solve.
+
+    Attributes:
+     - status: one of OPTIMAL, FEASIBLE, INFEASIBLE or UNKNOWN.
+     - values: the value of each variable, indexed by variable id. Only
+       meaningful if the status is OPTIMAL or FEASIBLE.
+     - wall_time: the time spent in the solver, in seconds.
+     - statistics: solver-specific statistics, such as the number of nodes
+       or branches explored and the relative gap to the best bound.
+    """
+    status: str
+    values: np.ndarray
+    wall_time: float
+    statistics: Dict[str, float] = field(default_factory=dict)
+
+    def has_solution(self):
+        return self.status in (OPTIMAL, FEASIBLE)
+
+
+# The fraction of the time left given to CBC's own time limit when solving
+# in a child process, leaving the rest for it to send back its result.
+CBC_TIME_LIMIT_FRACTION = 0.9
+
+
+def relative_gap(objective: float, best_bound: float) -> float:
+    return abs(best_bound - objective) / max(1.0, abs(objective))
+
+
+class SolverBackend:
+    """ An interface for solving a built model.
+
+    Subclasses set default_conflict_formulation to the conflict formulation
+    that suits them best, supports_no_overlap to whether they enforce
+    room conflicts natively (see NO_OVERLAP_CONFLICTS), and supports_hints
+    to whether they use the hint passed to solve.
+    """
+    default_conflict_formulation = BIG_M_CONFLICTS
+    supports_no_overlap = False
+    supports_hints = False
+
+    def __init__(self, options: SolverOptions):
+        self.options = options
+
+    def check_options(self, options: ModelOptions):
+        """ Raise a ValueError unless this backend supports the model
+        options and its solver options. """
+        if (options.conflict_formulation == NO_OVERLAP_CONFLICTS
+                and not self.supports_no_overlap):
+            raise ValueError("The {} backend does not support {}".format(
+                self.options.backend, NO_OVERLAP_CONFLICTS))
+        if self.options.greedy_hint and not self.supports_hints:
+            raise ValueError("The {} backend does not support greedy_hint"
+                             .format(self.options.backend))
+
+    def solve(
+            self,
+            model_input: ModelBuilderInput,
+            variables: VariableIndexes,
+            matrix: ConstraintMatrix,
+            constraints: Constraints = None,
+            hint: List[int] = None,
+            on_solution: Callable[[np.ndarray], None] = None) -> SolveResult:
+        """ Solve the model given by the matrix. The constraints, if given,
+        are only used to name the solver's constraints for debugging.
+
+        The hint, if given, is a list of the ids of variables which are
+        likely to be 1 in a solution, such as a previous solution. Backends
+        which do not support hints log that they ignore it.
+
+        If on_solution is given, it is called with the variable values of
+        each improved solution as soon as it is found, for backends that
+        support it, so that a solve stopped by its time limit has already
+        reported its best solution.
+        """
+        raise NotImplementedError
+
+
+def load_cbc_model(model_proto: linear_solver_pb2.MPModelProto
+                   ) -> pywraplp.Solver:
+    """ A CBC solver with the model_proto loaded, ready to Solve. """
+    solver = pywraplp.Solver(
+        'SolveIntegerProblem',
+        pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING
+    )
+    error = solver.LoadModelFromProto(model_proto)
+    if error:
+        raise ValueError("Could not load model: {}".format(error))
+    return solver
+
+
+def solve_cbc_model(
+        solver: pywraplp.Solver, options: SolverOptions) -> SolveResult:
+    """ Solve a loaded CBC model. CBC only checks the time limit during
+    branch and bound, so solving the root LP may run past it. """
+    parameters = pywraplp.MPSolverParameters()
+    if options.time_limit_seconds is not None:
+        solver.SetTimeLimit(int(options.time_limit_seconds * 1000))
+    if options.relative_gap is not None:
+        parameters.SetDoubleParam(
+            parameters.RELATIVE_MIP_GAP, options.relative_gap)
+
+    result_status = solver.Solve(parameters)
+
+    result = SolveResult(
+        status=CbcBackend.statuses.get(result_status, UNKNOWN),
+        values=np.zeros(solver.NumVariables()),
+        wall_time=solver.wall_time() / 1000,
+        statistics={
+            'nodes': solver.nodes(),
+            'iterations': solver.iterations(),
+        },
+    )
+    if result.has_solution():
+        # Reading values without a solution, such as after hitting the
+        # time limit, logs an error per variable.
+        objective = solver.Objective()
+        response = linear_solver_pb2.MPSolutionResponse()
+        solver.FillSolutionResponseProto(response)
+        result.values = np.array(response.variable_value)
+        result.statistics['gap'] = relative_gap(
+            objective.Value(), objective.BestBound())
+
+    return result
+
+
+def _solve_cbc_process(
+        model_bytes: bytes,
+        options: SolverOptions,
+        connection: Connection):
+    """ Load and solve a serialized model in a child process, and send the
+    SolveResult, or the error raised, on the connection. """
+    try:
+        model_proto = linear_solver_pb2.MPModelProto.FromString(model_bytes)
+        result = solve_cbc_model(load_cbc_model(model_proto), options)
+    except Exception as error:
+        result = error
+    connection.send(result)
+    connection.close()
+
+
+class CbcBackend(SolverBackend):
+    """ Solve the model as a MIP with CBC, loaded in bulk from a proto.
+
+    CBC does not check its time limit while solving the root LP, and can
+    not be interrupted, so with a time limit the model is solved in a child
+    process, which is stopped if it has not finished by the limit.
+    """
+
+    statuses = {
+        pywraplp.Solver.OPTIMAL: OPTIMAL,
+        pywraplp.Solver.FEASIBLE: FEASIBLE,
+        pywraplp.Solver.INFEASIBLE: INFEASIBLE,
+    }
+
+    def model_proto(
+            self,
+            variables: VariableIndexes,
+            matrix: ConstraintMatrix,
+            constraints: Constraints = None) -> linear_solver_pb2.MPModelProto:
+        if self.options.debug_names:
+            return to_model_proto(matrix, variables, constraints)
+        return to_model_proto(matrix)
+
+    def load_model(
+            self,
+            variables: VariableIndexes,
+            matrix: ConstraintMatrix,
+            constraints: Constraints = None) -> pywraplp.Solver:
+        """ A CBC solver with the model loaded, ready to Solve. """
+        return load_cbc_model(self.model_proto(variables, matrix, constraints))
+
+    def solve(
+            self, model_input, variables, matrix, constraints=None, hint=None,
+            on_solution=None):
+        # The Python wrapper of CBC has no incumbent callback, so
+        # on_solution is never called. The CBC bundled with ortools is
+        # built without threads, so num_workers is ignored. ortools does not
+        # pass solution hints to CBC.
+        if hint:
+            print("CBC ignores the solution hint")
+        time_limit = self.options.time_limit_seconds
+        if time_limit is None:
+            with Timer("Converting to ortools model"):
+                solver = self.load_model(variables, matrix, constraints)
+            with Timer("Solving model"):
+                return solve_cbc_model(solver, self.options)
+
+        start = timer()
+        with Timer("Converting to ortools model"):
+            model_bytes = self.model_proto(
+                variables, matrix, constraints).SerializeToString()
+        with Timer("Solving model"):
+            return self.solve_in_process(
+                model_bytes, len(variables), start + time_limit)
+
+    def solve_in_process(
+            self,
+            model_bytes: bytes,
+            num_variables: int,
+            deadline: float) -> SolveResult:
+        """ Solve a serialized model in a child process, stopping it at the
+        deadline, a default_timer time. CBC's own time limit is set to end a
+        little earlier, so that it can return its best solution. """
+        start = timer()
+        time_left = deadline - start
+        (receiver, sender) = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=_solve_cbc_process,
+            args=(model_bytes, replace(
+                self.options,
+                time_limit_seconds=time_left * CBC_TIME_LIMIT_FRACTION),
+                sender))
+        process.start()
+        sender.close()
+
+        try:
+            if receiver.poll(max(0, deadline - timer())):
+                result = receiver.recv()
+            else:
+                print("Stopped CBC at the time limit")
+                result = SolveResult(
+                    status=UNKNOWN,
+                    values=np.zeros(num_variables),
+                    wall_time=timer() - start)
+        except EOFError:
+            raise RuntimeError(
+                "CBC exited with code {} without a result".format(
+                    process.exitcode))
+        finally:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+            receiver.close()
+
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class IncumbentCallback(cp_model.CpSolverSolutionCallback):
+    """ Pass the values of each improved CP-SAT solution to on_solution.
+
+    The presence_indexes are the CP-SAT indexes of the variables' presence
+    literals, by variable id.
+    """
+    def __init__(self, presence_indexes, on_solution):
+        super().__init__()
+        self.presence_indexes = presence_indexes
+        self.on_solution = on_solution
+
+    def on_solution_callback(self):
+        print("Found a solution after {:.3g} seconds".format(self.WallTime()))
+        self.on_solution(
+            np.array(self.Response().solution)[self.presence_indexes])
+
+
+class CpSatBackend(SolverBackend):
+    """ Solve the model with CP-SAT.
+
+    Each variable's class is an optional interval on each of its days,
+    present if and only if the variable is 1, and the intervals of each
+    (day, room) may not overlap, or for a class of rooms, may not overlap
+    more than its capacity. Any rows in the constraints are added as
+    linear constraints.
+    """
+    default_conflict_formulation = NO_OVERLAP_CONFLICTS
+    supports_no_overlap = True
+    supports_hints = True
+
+    statuses = {
+        cp_model.OPTIMAL: OPTIMAL,
+        cp_model.FEASIBLE: FEASIBLE,
+        cp_model.INFEASIBLE: INFEASIBLE,
+    }
+
+    def solve(
+            self, model_input, variables, matrix, constraints=None, hint=None,
+            on_solution=None):
+        with Timer("Converting to CP-SAT model"):
+            model = cp_model.CpModel()
+            debug_names = self.options.debug_names
+            presences = [
+                model.NewBoolVar(str(variable) if debug_names else '')
+                for variable in variables
+            ]
+
+            boundaries = matrix.row_boundaries().tolist()
+            cols = matrix.cols.tolist()
+            coefficients = matrix.coefficients.astype(np.int64).tolist()
+            for (row, (lower_bound, upper_bound)) in enumerate(zip(
+                    matrix.lower_bounds.astype(np.int64).tolist(),
+                    matrix.upper_bounds.astype(np.int64).tolist())):
+                start, end = boundaries[row], boundaries[row + 1]
+                model.AddLinearConstraint(
+                    cp_model.LinearExpr.WeightedSum(
+                        [presences[col] for col in cols[start:end]],
+                        coefficients[start:end]),
+                    lower_bound,
+                    upper_bound)
+
+            # The slot at the end of the class is occupied as well,
+            # matching the conflict constraints.
+            interval_sizes = (
+                room_slots_of(model_input, variables)[variables.course_of]
+                + 1).tolist()
+            intervals = defaultdict(list)
+            for (presence, mask, slot, room, size) in zip(
+                    presences,
+                    variables.mask_of.tolist(),
+                    variables.slot_of.tolist(),
+                    variables.room_of.tolist(),
+                    interval_sizes):
+                interval = model.NewOptionalFixedSizeIntervalVar(
+                    slot, size, presence, '')
+                for day in mask_days(mask):
+                    intervals[(day, room)].append(interval)
+
+            if hint:
+                hinted = set(hint)
+                for (variable_id, presence) in enumerate(presences):
+                    model.AddHint(presence, int(variable_id in hinted))
+
+            for ((day, room_index), room_intervals) in intervals.items():
+                room = variables.rooms[room_index]
+                if len(room_intervals) <= room.capacity:
+                    continue
+                if room.capacity == 1:
+                    model.AddNoOverlap(room_intervals)
+                else:
+                    model.AddCumulative(
+                        room_intervals,
+                        [1] * len(room_intervals),
+                        room.capacity)
+
+        with Timer("Solving model"):
+            solver = cp_model.CpSolver()
+            solver.parameters.num_workers = self.options.num_workers
+            if self.options.time_limit_seconds is not None:
+                solver.parameters.max_time_in_seconds = (
+                    self.options.time_limit_seconds)
+            if self.options.relative_gap is not None:
+                solver.parameters.relative_gap_limit = (
+                    self.options.relative_gap)
+            presence_indexes = np.array(
+                [presence.Index() for presence in presences], dtype=np.int64)
+            callback = None
+            if on_solution is not None:
+                callback = IncumbentCallback(presence_indexes, on_solution)
+            result_status = solver.Solve(model, callback)
+
+        result = SolveResult(
+            status=self.statuses.get(result_status, UNKNOWN),
+            values=np.zeros(len(presences)),
+            wall_time=solver.WallTime(),
+            statistics={
+                'branches': solver.NumBranches(),
+                'conflicts': solver.NumConflicts(),
+                'gap': relative_gap(
+                    solver.ObjectiveValue(), solver.BestObjectiveBound()),
+            },
+        )
+        if result.has_solution():
+            result.values = np.array(
+                solver.ResponseProto().solution)[presence_indexes]
+
+        return result
+
+
+BACKENDS = {
+    CBC_BACKEND: CbcBackend,
+    CP_SAT_BACKEND: CpSatBackend,
+}
+
+
+def make_backend(options: SolverOptions) -> SolverBackend:
+    if options.backend not in BACKENDS:
+        raise ValueError("Unknown solver backend {}".format(options.backend))
+    return BACKENDS[options.backend](options)
+
+
+def default_conflict_formulation(
+        options: ModelOptions, solver_options: SolverOptions) -> str:
+    """ The conflict formulation to use with the other model options when
+    none is given, which is the best one for the backend, unless it does
+    not support them. options.conflict_formulation itself is ignored. """
+    if options.lazy_conflicts:
+        return BIG_M_CONFLICTS
+    conflict_formulation = make_backend(
+        solver_options).default_conflict_formulation
+    if options.room_classes and conflict_formulation == BIG_M_CONFLICTS:
+        return OCCUPANCY_CONFLICTS
+    return conflict_formulation
@@ -0,0 +1,50 @@
+from assertpy import assert_that
+from timeit import default_timer as timer
+
+from backends import CbcBackend
+from backends import OPTIMAL
+from backends import UNKNOWN
+from constraints import build_constraints
+from constraints_test import small_input
+from data import ModelOptions
+from data import OCCUPANCY_CONFLICTS
+from data import SolverOptions
+from generate import InstanceOptions
+from generate import generate_input
+from matrix import build_constraint_matrix
+from variables import build_variables
+
+
+def build_model(model_input, options):
+    variables = build_variables(model_input, options)
+    constraints = build_constraints(model_input, variables, options)
+    return (variables, build_constraint_matrix(variables, constraints))
+
+
+def test_cbc_solves_with_a_time_limit():
+    model_input = small_input()
+    (variables, matrix) = build_model(model_input, ModelOptions())
+    backend = CbcBackend(SolverOptions(time_limit_seconds=30))
+
+    result = backend.solve(model_input, variables, matrix)
+
+    assert_that(result.status).is_equal_to(OPTIMAL)
+    assert_that(result.values).is_length(len(variables))
+    assert_that(int((result.values > 0.5).sum())).is_positive()
+
+
+def test_cbc_stops_at_the_time_limit():
+    # CBC spends minutes solving the root LP of this model, during which it
+    # does not check its own time limit.
+    model_input = generate_input(
+        InstanceOptions(num_courses=60, num_rooms=12, seed=2))
+    (variables, matrix) = build_model(
+        model_input, ModelOptions(conflict_formulation=OCCUPANCY_CONFLICTS))
+    backend = CbcBackend(SolverOptions(time_limit_seconds=2))
+
+    start = timer()
+    result = backend.solve(model_input, variables, matrix)
+
+    assert_that(timer() - start).is_less_than(2.5)
+    assert_that(result.status).is_equal_to(UNKNOWN)
+    assert_that(result.values).is_length(len(variables))
@@ -0,0 +1,324 @@
+""" Benchmark each stage of building and solving the model.
+
+Runs the stages one at a time on a generated instance, recording the time,
+peak memory and size of what each stage builds, and solves the model with
+both CBC and CP-SAT, so the backends can be compared on the same model. The
+results are compared to a saved baseline, exiting with an error if any
+stage regressed.
+
+Usage:
+
+    python benchmark.py --preset department --save-baseline baseline.json
+    python benchmark.py --preset department --baseline baseline.json
+"""
+import argparse
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from dataclasses import replace
+import io
+import json
+import sys
+from timeit import default_timer as timer
+import tracemalloc
+from typing import Callable
+from typing import Dict
+from typing import List
+
+from backends import BACKENDS
+from backends import CbcBackend
+from backends import CpSatBackend
+from constraints import Constraints
+from constraints import build_conflict_constraints
+from constraints import build_lab_room_constraints
+from constraints import build_meeting_consistency_constraints
+from constraints import build_occupancy_constraints
+from constraints import build_uniqueness_constraints
+from constraints import check_options
+from data import BIG_M_CONFLICTS
+from data import BaseDataclass
+from data import CONFLICT_FORMULATIONS
+from data import CP_SAT_BACKEND
+from data import ModelBuilderInput
+from data import ModelOptions
+from data import NO_OVERLAP_CONFLICTS
+from data import OCCUPANCY_CONFLICTS
+from data import SOLVER_BACKENDS
+from data import SolverOptions
+from generate import InstanceOptions
+from generate import PRESETS
+from generate import generate_input
+from matrix import build_constraint_matrix
+from rooms import group_rooms
+from variables import build_variables
+
+
+DEFAULT_OUTPUT = 'bench_output.txt'
+
+# Stages faster than this are too noisy to compare to the baseline.
+MIN_COMPARED_SECONDS = 0.05
+
+
+@dataclass
+class StageResult(BaseDataclass):
+    """ The cost of one stage.
+
+    Attributes:
+     - name: the name of the stage.
+     - seconds: the wall time of the stage.
+     - peak_bytes: the peak memory allocated during the stage, or 0 if
+       memory was not traced.
+     - count: the number of variables, constraints or nonzeros built, or
+       of class starts in the solution.
+    """
+    name: str
+    seconds: float
+    peak_bytes: int
+    count: int
+
+
+def run_stage(
+        results: List[StageResult],
+        name: str,
+        build: Callable,
+        count: Callable = len):
+    """ Run build(), append its StageResult to results and return its
+    value. The stage's progress messages are suppressed. """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.clear_traces()
+    start = timer()
+    with redirect_stdout(io.StringIO()):
+        value = build()
+    seconds = timer() - start
+    peak_bytes = tracemalloc.get_traced_memory()[1] if tracing else 0
+
+    results.append(StageResult(
+        name=name, seconds=seconds, peak_bytes=peak_bytes, count=count(value)))
+    return value
+
+
+def run_benchmark(
+        model_input: ModelBuilderInput,
+        options: ModelOptions = ModelOptions(),
+        solve_time_limit: float = None,
+        trace_memory: bool = True,
+        backends: List[str] = SOLVER_BACKENDS) -> List[StageResult]:
+    """ Build the model stage by stage, one constraint builder at a time,
+    into the same constraints as build_constraints, and solve it with each
+    of the backends which supports the conflict formulation. The solves are
+    skipped if solve_time_limit is 0.
+
+    Memory is traced while building if trace_memory is True, or if the
+    caller is already tracing it, in which case tracing is left on. """
+    check_options(options)
+    if options.room_classes:
+        model_input = group_rooms(model_input)
+    backends = [
+        BACKENDS[backend] for backend in backends
+        if options.conflict_formulation != NO_OVERLAP_CONFLICTS
+        or BACKENDS[backend].supports_no_overlap
+    ]
+
+    results = []
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    try:
+        variables = run_stage(
+            results, 'build_variables',
+            lambda: build_variables(model_input, options))
+        uniqueness_constraints = run_stage(
+            results, 'build_uniqueness_constraints',
+            lambda: build_uniqueness_constraints(model_input, variables))
+        meeting_consistency_constraints = run_stage(
+            results, 'build_meeting_consistency_constraints',
+            lambda: build_meeting_consistency_constraints(
+                model_input, variables))
+        lab_room_constraints = run_stage(
+            results, 'build_lab_room_constraints',
+            lambda: build_lab_room_constraints(model_input, variables))
+        conflict_constraints = []
+        occupancy_constraints = []
+        if options.conflict_formulation == BIG_M_CONFLICTS:
+            conflict_constraints = run_stage(
+                results, 'build_conflict_constraints',
+                lambda: build_conflict_constraints(model_input, variables))
+        elif options.conflict_formulation == OCCUPANCY_CONFLICTS:
+            occupancy_constraints = run_stage(
+                results, 'build_occupancy_constraints',
+                lambda: build_occupancy_constraints(model_input, variables))
+
+        # The same constraints as build_constraints builds.
+        constraints = Constraints(
+            uniqueness_constraints=uniqueness_constraints,
+            conflict_constraints=conflict_constraints,
+            meeting_consistency_constraints=meeting_consistency_constraints,
+            occupancy_constraints=occupancy_constraints,
+            lab_room_constraints=lab_room_constraints,
+        )
+        matrix = run_stage(
+            results, 'build_constraint_matrix',
+            lambda: build_constraint_matrix(variables, constraints))
+
+        if CbcBackend in backends:
+            run_stage(
+                results, 'load_cbc_model',
+                lambda: CbcBackend(SolverOptions()).load_model(
+                    variables, matrix),
+                count=lambda solver: solver.NumConstraints())
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+
+    if solve_time_limit == 0:
+        return results
+
+    if CbcBackend in backends:
+        # The CBC model is loaded again as part of its solve, which keeps
+        # to the time limit the same way as a real run.
+        cbc = CbcBackend(SolverOptions(time_limit_seconds=solve_time_limit))
+        run_stage(
+            results, 'solve_cbc',
+            lambda: cbc.solve(model_input, variables, matrix),
+            count=lambda result: int((result.values > 0.5).sum()))
+    if CpSatBackend in backends:
+        # The CP-SAT model is built from the matrix as part of its solve.
+        cp_sat = CpSatBackend(SolverOptions(
+            backend=CP_SAT_BACKEND, time_limit_seconds=solve_time_limit))
+        run_stage(
+            results, 'solve_cp_sat',
+            lambda: cp_sat.solve(model_input, variables, matrix),
+            count=lambda result: int((result.values > 0.5).sum()))
+
+    return results
+
+
+def find_regressions(
+        results: List[StageResult],
+        baseline: Dict[str, Dict],
+        threshold: float) -> List[str]:
+    """ Describe each stage whose time or peak memory is more than
+    threshold times the baseline, or whose count changed. """
+    regressions = []
+    for result in results:
+        if result.name not in baseline:
+            continue
+        base = baseline[result.name]
+        if (result.seconds > MIN_COMPARED_SECONDS
+                and result.seconds > threshold * base['seconds']):
+            regressions.append("{} took {:.3f}s, baseline {:.3f}s".format(
+                result.name, result.seconds, base['seconds']))
+        if base['peak_bytes'] and result.peak_bytes > (
+                threshold * base['peak_bytes']):
+            regressions.append("{} peaked at {} bytes, baseline {}".format(
+                result.name, result.peak_bytes, base['peak_bytes']))
+        # The solution found within the time limit may vary across runs.
+        if (not result.name.startswith('solve')
+                and result.count != base['count']):
+            regressions.append("{} built {}, baseline {}".format(
+                result.name, result.count, base['count']))
+    return regressions
+
+
+def format_results(results: List[StageResult]) -> str:
+    lines = ["{:<40} {:>10} {:>12} {:>12}".format(
+        'stage', 'seconds', 'peak MiB', 'count')]
+    for result in results:
+        lines.append("{:<40} {:>10.3f} {:>12.1f} {:>12}".format(
+            result.name,
+            result.seconds,
+            result.peak_bytes / (1024 * 1024),
+            result.count))
+    return '\n'.join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument(
+        '--preset', choices=sorted(PRESETS), default='readme',
+        help='The size of the generated instance.')
+    parser.add_argument('--courses', type=int, help='Override the preset.')
+    parser.add_argument('--rooms', type=int, help='Override the preset.')
+    parser.add_argument('--blocks', type=int, help='Override the preset.')
+    parser.add_argument('--seed', type=int, default=InstanceOptions.seed)
+    parser.add_argument(
+        '--conflict-formulation',
+        choices=CONFLICT_FORMULATIONS,
+        default=ModelOptions.conflict_formulation)
+    parser.add_argument(
+        '--room-classes', action='store_true',
+        help='Model classes of interchangeable rooms.')
+    parser.add_argument(
+        '--backends', nargs='+', choices=SOLVER_BACKENDS,
+        default=SOLVER_BACKENDS,
+        help='The solver backends to solve with, of those supporting the '
+             'conflict formulation.')
+    parser.add_argument(
+        '--solve-time-limit', type=float, default=60,
+        help='The time limit of each solve in seconds, 0 to skip them.')
+    parser.add_argument(
+        '--no-trace-memory', action='store_true',
+        help='Do not trace memory, which slows down every stage.')
+    parser.add_argument(
+        '--baseline', metavar='FILE',
+        help='Compare the results to a baseline saved by --save-baseline.')
+    parser.add_argument('--save-baseline', metavar='FILE')
+    parser.add_argument(
+        '--threshold', type=float, default=1.5,
+        help='The ratio to the baseline beyond which a stage regressed.')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    instance_options = PRESETS[args.preset]
+    overrides = {
+        'num_courses': args.courses,
+        'num_rooms': args.rooms,
+        'num_blocks': args.blocks,
+        'seed': args.seed,
+    }
+    instance_options = replace(instance_options, **{
+        name: value for (name, value) in overrides.items()
+        if value is not None
+    })
+    model_input = generate_input(instance_options)
+    print("Generated {} courses, {} rooms and {} blocks".format(
+        len(model_input.courses), len(model_input.rooms),
+        len(model_input.blocks)))
+
+    results = run_benchmark(
+        model_input,
+        ModelOptions(
+            conflict_formulation=args.conflict_formulation,
+            room_classes=args.room_classes),
+        solve_time_limit=args.solve_time_limit,
+        trace_memory=not args.no_trace_memory,
+        backends=args.backends)
+
+    report = format_results(results)
+    print(report)
+    with open(args.output, 'w') as outfile:
+        outfile.write(report + '\n')
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as outfile:
+            json.dump(
+                {result.name: result.as_dict() for result in results},
+                outfile, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            regressions = find_regressions(
+                results, json.load(infile), args.threshold)
+        for regression in regressions:
+            print("Regression: {}".format(regression))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
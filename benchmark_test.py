@@ -0,0 +1,90 @@
+import tracemalloc
+
+from assertpy import assert_that
+
+from benchmark import StageResult
+from benchmark import find_regressions
+from benchmark import run_benchmark
+from constraints import build_constraints
+from constraints_test import small_input
+from data import CBC_BACKEND
+from data import ModelOptions
+from data import NO_OVERLAP_CONFLICTS
+from data import OCCUPANCY_CONFLICTS
+from generate import InstanceOptions
+from generate import generate_input
+from variables import build_variables
+
+
+def test_run_benchmark_records_each_stage():
+    results = run_benchmark(small_input(), solve_time_limit=10)
+
+    assert_that([result.name for result in results]).is_equal_to([
+        'build_variables',
+        'build_uniqueness_constraints',
+        'build_meeting_consistency_constraints',
+        'build_lab_room_constraints',
+        'build_conflict_constraints',
+        'build_constraint_matrix',
+        'load_cbc_model',
+        'solve_cbc',
+        'solve_cp_sat',
+    ])
+    assert_that(results[0].count).is_positive()
+    assert_that(results[0].peak_bytes).is_positive()
+    assert_that(results[-2].count).is_equal_to(3)
+    assert_that(results[-1].count).is_equal_to(3)
+
+
+def test_run_benchmark_builds_the_solved_constraints():
+    model_input = small_input()
+    options = ModelOptions(conflict_formulation=NO_OVERLAP_CONFLICTS)
+    variables = build_variables(model_input, options)
+
+    results = run_benchmark(
+        model_input, options, solve_time_limit=10, trace_memory=False)
+
+    assert_that([result.name for result in results]).does_not_contain(
+        'build_conflict_constraints', 'build_occupancy_constraints',
+        'load_cbc_model', 'solve_cbc')
+    assert_that(sum(
+        result.count for result in results
+        if result.name.endswith('_constraints'))).is_equal_to(
+        len(build_constraints(model_input, variables, options)))
+
+
+def test_run_benchmark_leaves_tracing_to_the_caller():
+    tracemalloc.start()
+    try:
+        run_benchmark(small_input(), solve_time_limit=0)
+        assert_that(tracemalloc.is_tracing()).is_true()
+    finally:
+        tracemalloc.stop()
+
+
+def test_run_benchmark_keeps_cbc_to_the_time_limit():
+    # CBC does not check its own time limit while solving the root LP of
+    # this model.
+    model_input = generate_input(
+        InstanceOptions(num_courses=60, num_rooms=12, seed=2))
+    options = ModelOptions(conflict_formulation=OCCUPANCY_CONFLICTS)
+
+    results = run_benchmark(
+        model_input, options, solve_time_limit=2, trace_memory=False,
+        backends=[CBC_BACKEND])
+
+    assert_that(results[-1].name).is_equal_to('solve_cbc')
+    assert_that(results[-1].seconds).is_less_than(2.5)
+
+
+def test_find_regressions():
+    baseline = {
+        'build_variables': StageResult('build_variables', 1.0, 1000, 5).as_dict(),
+    }
+
+    assert_that(find_regressions(
+        [StageResult('build_variables', 1.2, 1100, 5)], baseline, 1.5)
+    ).is_empty()
+    assert_that(find_regressions(
+        [StageResult('build_variables', 2.0, 2000, 6)], baseline, 1.5)
+    ).is_length(3)
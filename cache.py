@@ -0,0 +1,133 @@
+""" A module for caching built models and solutions on disk.
+
+Entries are keyed by a fingerprint of the canonical serialization of the
+model input and options they were built from, so that a repeat run with
+identical input returns the cached schedule, and a run where only the
+solver options changed reuses the cached model. The least recently used
+entries are evicted once the cache grows beyond its size limit.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from data import BaseDataclass
+from data import ModelBuilderInput
+
+
+DEFAULT_CACHE_DIR = '.model_cache'
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def canonical_input(model_input: ModelBuilderInput) -> dict:
+    """ A JSON-serializable representation of the model input, which is
+    identical for identical inputs. """
+    day_range = model_input.day_range
+    return {
+        'courses': [course.as_dict() for course in model_input.courses],
+        'rooms': [room.as_dict() for room in model_input.rooms],
+        'blocks': [
+            {
+                'block_id': block.block_id,
+                'start_time': str(block.start_time),
+                'end_time': str(block.end_time),
+                'start_grid_minutes': block.start_grid_minutes,
+                'start_times': [str(time) for time in block.start_times],
+            }
+            for block in model_input.blocks
+        ],
+        'day_range': {
+            'start_time': str(day_range.start_time),
+            'num_slots': day_range.num_slots,
+            'increment_minutes': day_range.increment_minutes,
+        },
+        'occupied_times': [
+            {
+                'room_name': occupied_time.room_name,
+                'days': str(occupied_time.days),
+                'start_time': str(occupied_time.start_time),
+                'end_time': str(occupied_time.end_time),
+            }
+            for occupied_time in model_input.occupied_times
+        ],
+    }
+
+
+def fingerprint(model_input: ModelBuilderInput, *options: BaseDataclass) -> str:
+    """ A hash of the model input and the given options dataclasses. """
+    canonical = {
+        'model_input': canonical_input(model_input),
+        'options': [
+            [type(option).__name__, option.as_dict()] for option in options
+        ],
+    }
+    serialized = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+class ModelCache:
+    """ A directory of pickled entries, with least recently used eviction
+    once their total size exceeds max_bytes. """
+
+    def __init__(
+            self,
+            cache_dir: str = DEFAULT_CACHE_DIR,
+            max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, kind: str, key: str) -> str:
+        return os.path.join(self.cache_dir, '{}-{}.pickle'.format(kind, key))
+
+    def get(self, kind: str, key: str):
+        """ The entry of the given kind and key, or None if missing. """
+        path = self.path(kind, key)
+        try:
+            with open(path, 'rb') as infile:
+                value = pickle.load(infile)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+        # Mark the entry as recently used.
+        os.utime(path)
+        print("Loaded cached {} {}".format(kind, key[:12]))
+        return value
+
+    def put(self, kind: str, key: str, value):
+        """ Store the entry, unless it is larger than max_bytes, evicting
+        other entries to make room for it. """
+        # Write to a temporary file first, so that concurrent runs never
+        # see a partially written entry, and an entry which can never fit
+        # is dropped before it replaces or evicts anything.
+        (fd, temp_path) = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(fd, 'wb') as outfile:
+            pickle.dump(value, outfile, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(temp_path)
+        if size > self.max_bytes:
+            os.remove(temp_path)
+            print("Not caching {} {} of {} bytes, over the cache limit".format(
+                kind, key[:12], size))
+            return
+        path = self.path(kind, key)
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+
+    def evict(self, keep: str = None):
+        """ Remove the least recently used entries, other than the one at
+        keep, until the cache fits in max_bytes. """
+        entries = []
+        total_bytes = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.pickle'):
+                stat = entry.stat()
+                total_bytes += stat.st_size
+                if entry.path != keep:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        for (_, size, path) in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            os.remove(path)
+            total_bytes -= size
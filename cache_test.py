@@ -0,0 +1,86 @@
+from assertpy import assert_that
+from dataclasses import replace
+import os
+import time
+
+from cache import ModelCache
+from cache import fingerprint
+from constraints_test import small_input
+from data import ModelOptions
+from data import OCCUPANCY_CONFLICTS
+from data import SolverOptions
+from solve import solve_model
+
+
+def test_fingerprint_depends_on_input_and_options():
+    model_input = small_input()
+    (mth1, mth2) = model_input.courses
+    key = fingerprint(model_input, ModelOptions())
+
+    assert_that(fingerprint(small_input(), ModelOptions())).is_equal_to(key)
+    assert_that(fingerprint(
+        model_input, ModelOptions(conflict_formulation=OCCUPANCY_CONFLICTS))
+    ).is_not_equal_to(key)
+    assert_that(fingerprint(
+        replace(model_input, courses=[replace(mth1, enrollment=1), mth2]),
+        ModelOptions())
+    ).is_not_equal_to(key)
+    assert_that(fingerprint(model_input, ModelOptions(), SolverOptions())
+                ).is_not_equal_to(key)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ModelCache(str(tmp_path), max_bytes=10**6)
+    cache.put('model', 'a', b'x' * 400000)
+    cache.put('model', 'b', b'x' * 400000)
+    os.utime(cache.path('model', 'a'), (0, 0))
+    os.utime(cache.path('model', 'b'), (1, 1))
+    assert_that(cache.get('model', 'a')).is_not_none()
+
+    cache.put('model', 'c', b'x' * 400000)
+
+    assert_that(cache.get('model', 'b')).is_none()
+    assert_that(cache.get('model', 'a')).is_not_none()
+    assert_that(cache.get('model', 'c')).is_not_none()
+
+
+def test_cache_skips_entries_larger_than_the_limit(tmp_path):
+    cache = ModelCache(str(tmp_path), max_bytes=10**6)
+    cache.put('model', 'a', b'x' * 400000)
+
+    cache.put('model', 'b', b'x' * 2 * 10**6)
+
+    assert_that(cache.get('model', 'b')).is_none()
+    assert_that(cache.get('model', 'a')).is_not_none()
+    assert_that(os.listdir(str(tmp_path))).is_length(1)
+
+
+def test_cache_keeps_the_entry_just_written(tmp_path):
+    cache = ModelCache(str(tmp_path), max_bytes=10**6)
+    cache.put('model', 'a', b'x' * 400000)
+    cache.put('model', 'b', b'x' * 400000)
+    # Entries used later than now, e.g. by a run on a host whose clock is
+    # ahead, are more recent than the entry being written.
+    future = time.time() + 3600
+    os.utime(cache.path('model', 'a'), (future, future))
+    os.utime(cache.path('model', 'b'), (future + 1, future + 1))
+
+    cache.put('model', 'c', b'x' * 400000)
+
+    assert_that(cache.get('model', 'c')).is_not_none()
+    assert_that(cache.get('model', 'a')).is_none()
+
+
+def test_solve_model_reuses_cached_model_and_schedule(tmp_path):
+    cache = ModelCache(str(tmp_path))
+    model_input = small_input()
+
+    schedule = solve_model(model_input, cache=cache)
+    assert_that(os.listdir(str(tmp_path))).is_length(2)
+
+    cached = solve_model(model_input, cache=cache)
+    assert_that(cached).is_equal_to(schedule)
+
+    solve_model(model_input, solver_options=SolverOptions(backend='cp-sat'),
+                cache=cache)
+    assert_that(os.listdir(str(tmp_path))).is_length(3)
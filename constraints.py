@@ -1,39 +1,47 @@
 """ A module for building and representing constraints. """
 
+from collections import defaultdict
 from dataclasses import dataclass
-from datetime import timedelta
+from dataclasses import field
 from itertools import chain
+from typing import Iterable
 from typing import List
-from typing import Set
+from typing import Tuple
+
+import numpy as np
 
 from variables import ClassStartVariable
 from variables import VariableIndexes
-from data import CourseDay
-from data import TimeRange
-from data import DayRoomTime
+from variables import day_mask
+import metrics
+from data import BIG_M_CONFLICTS
+from data import DayPattern
 from data import ModelBuilderInput
-from data import TimeRange
+from data import ModelOptions
+from data import NO_OVERLAP_CONFLICTS
+from data import OCCUPANCY_CONFLICTS
+from data import Room
 
 
 @dataclass
 class UniquenessConstraint:
     """ A constraint that requires every class be offered exactly once
     on the day required. """
-    start_variables: Set[ClassStartVariable]
+    variables: VariableIndexes = field(repr=False, compare=False)
+    start_ids: np.ndarray
 
-    def to_solver_constraint(self, solver, variable_to_solver_var):
-        constraint = solver.Constraint(1, 1, str(self))
-        for variable in self.start_variables:
-            solver_var = variable_to_solver_var[variable]
-            constraint.SetCoefficient(solver_var, 1)
+    @property
+    def start_variables(self) -> List[ClassStartVariable]:
+        return [self.variables[i] for i in self.start_ids]
 
-        return constraint
+    def to_coefficients(self):
+        return (1, 1, self.start_ids, np.ones(len(self.start_ids)))
 
     def __str__(self):
-        first_var = self.start_variables[0]
+        first_var = self.variables[self.start_ids[0]]
         return "Uniqueness_{}_{}".format(
             first_var.unique_class_key(),
-            first_var.day,
+            first_var.days,
         )
 
 
@@ -52,27 +60,31 @@ class MeetingConsistencyConstraint:
     These constraints have the form(e.g., for 3) X + Y + Z = 3 W,
     where W is the branching variable and X, Y, Z are forced variables.
     """
-    branching_variable: ClassStartVariable
-    forced_variables: Set[ClassStartVariable]
+    variables: VariableIndexes = field(repr=False, compare=False)
+    branching_id: int
+    forced_ids: np.ndarray
 
-    def to_solver_constraint(self, solver, variable_to_solver_var):
-        C = len(self.forced_variables)
-        constraint = solver.Constraint(0, 0, str(self))
-        branching_solver_var = variable_to_solver_var[self.branching_variable]
+    @property
+    def branching_variable(self) -> ClassStartVariable:
+        return self.variables[self.branching_id]
 
-        constraint.SetCoefficient(branching_solver_var, -C)
-        for variable in self.forced_variables:
-            solver_var = variable_to_solver_var[variable]
-            constraint.SetCoefficient(solver_var, 1)
+    @property
+    def forced_variables(self) -> List[ClassStartVariable]:
+        return [self.variables[i] for i in self.forced_ids]
 
-        return constraint
+    def to_coefficients(self):
+        C = len(self.forced_ids)
+        columns = np.concatenate(([self.branching_id], self.forced_ids))
+        coefficients = np.ones(C + 1)
+        coefficients[0] = -C
+        return (0, 0, columns, coefficients)
 
     def __str__(self):
         first_var = self.branching_variable
         return "MeetingConsistency_{}_{}_{}_{}".format(
             first_var.unique_class_key(),
-            first_var.day,
-            first_var.time,
+            first_var.days,
+            first_var.slot,
             first_var.room,
         )
 
@@ -86,42 +98,111 @@ class ConflictConstraint:
     variable, and the variables that may not be positive if X=1 are the
     "blocked" variables.
     """
-    branching_variable: ClassStartVariable
-    blocked_variables: Set[ClassStartVariable]
+    variables: VariableIndexes = field(repr=False, compare=False)
+    branching_id: int
+    blocked_ids: np.ndarray
 
-    def to_solver_constraint(self, solver, variable_to_solver_var):
-        C = len(self.blocked_variables)
-        constraint = solver.Constraint(0, C, str(self))
-        branching_solver_var = variable_to_solver_var[self.branching_variable]
+    @property
+    def branching_variable(self) -> ClassStartVariable:
+        return self.variables[self.branching_id]
 
-        constraint.SetCoefficient(branching_solver_var, C)
-        for variable in self.blocked_variables:
-            solver_var = variable_to_solver_var[variable]
-            constraint.SetCoefficient(solver_var, 1)
+    @property
+    def blocked_variables(self) -> List[ClassStartVariable]:
+        return [self.variables[i] for i in self.blocked_ids]
 
-        return constraint
+    def to_coefficients(self):
+        C = len(self.blocked_ids)
+        columns = np.concatenate(([self.branching_id], self.blocked_ids))
+        coefficients = np.ones(C + 1)
+        coefficients[0] = C
+        return (0, C, columns, coefficients)
 
     def __str__(self):
         branching_var = self.branching_variable
         return "Conflict_{}_{}_{}_{}".format(
             branching_var.unique_class_key(),
-            branching_var.day,
+            branching_var.days,
             branching_var.room,
-            branching_var.time,
+            branching_var.slot,
+        )
+
+
+@dataclass
+class OccupancyConstraint:
+    """ A constraint that ensures at most one class is in session in room r
+    on day d at the time of slot t, or at most r.capacity classes if r is
+    a class of interchangeable rooms.
+
+    The occupying_ids are the ids of the ClassStartVariables that, if 1,
+    would have a class in session at that slot.
+
+    These constraints have the form X + Y + Z <= 1, and replace the
+    ConflictConstraints when using the OCCUPANCY_CONFLICTS formulation.
+    """
+    variables: VariableIndexes = field(repr=False, compare=False)
+    day: str
+    room: Room
+    slot: int
+    occupying_ids: np.ndarray
+
+    @property
+    def occupying_variables(self) -> List[ClassStartVariable]:
+        return [self.variables[i] for i in self.occupying_ids]
+
+    def to_coefficients(self):
+        return (0, self.room.capacity, self.occupying_ids,
+                np.ones(len(self.occupying_ids)))
+
+    def __str__(self):
+        return "Occupancy_{}_{}_{:03d}".format(
+            self.day,
+            self.room.room_name,
+            self.slot,
         )
 
 
+@dataclass
+class RoomCapacityConstraint:
+    """ A cut that requires the classes in room r on day d fit in the day.
+
+    Classes in the same room may not overlap, so the slots they occupy,
+    including the slot at the end of each class, add up to at most the
+    span from the earliest start to the latest end of any class in the
+    room, times the room's capacity. The conflict and occupancy constraints
+    imply this, but it is much smaller, see lazy.py.
+    """
+    variables: VariableIndexes = field(repr=False, compare=False)
+    day: str
+    room: Room
+    occupying_ids: np.ndarray
+    occupied_slots: np.ndarray
+    available_slots: int
+
+    def to_coefficients(self):
+        return (0, self.available_slots, self.occupying_ids,
+                self.occupied_slots)
+
+    def __str__(self):
+        return "RoomCapacity_{}_{}".format(self.day, self.room.room_name)
+
+
 @dataclass
 class Constraints:
     uniqueness_constraints: List[UniquenessConstraint]
     conflict_constraints: List[ConflictConstraint]
     meeting_consistency_constraints: List[MeetingConsistencyConstraint]
+    occupancy_constraints: List[OccupancyConstraint] = field(
+        default_factory=list)
+    lab_room_constraints: List[OccupancyConstraint] = field(
+        default_factory=list)
 
     def __len__(self):
         return (
             len(self.uniqueness_constraints)
             + len(self.conflict_constraints)
             + len(self.meeting_consistency_constraints)
+            + len(self.occupancy_constraints)
+            + len(self.lab_room_constraints)
         )
 
     def all_constraints(self):
@@ -129,6 +210,8 @@ class Constraints:
             self.uniqueness_constraints,
             self.conflict_constraints,
             self.meeting_consistency_constraints,
+            self.occupancy_constraints,
+            self.lab_room_constraints,
         )
 
 
@@ -136,103 +219,400 @@ def build_uniqueness_constraints(
         model_input: ModelBuilderInput,
         variable_indexes: VariableIndexes) -> List[UniquenessConstraint]:
     constraints = []
+    first_day_of = variable_indexes.first_day_of
 
     for course in model_input.courses:
+        course_index = variable_indexes.course_index.get(course)
+        if course_index is None:
+            continue
         for day in course.day_pattern:
-            course_day = CourseDay(course=course, day=day)
-            relevant_vars = variable_indexes.by_course_day[course_day]
+            day_index = DayPattern.valid_chars.index(day)
+            relevant_ids = variable_indexes.course_day_ids(
+                course_index, day_index)
+            if len(relevant_ids) and first_day_of[relevant_ids[0]] != day_index:
+                # Variables covering several days only need to be
+                # unique on the first of them.
+                continue
+
             constraints.append(UniquenessConstraint(
-                start_variables=relevant_vars))
+                variables=variable_indexes, start_ids=relevant_ids))
 
     print("Built {} uniqueness constraints".format(len(constraints)))
+    metrics.count('uniqueness_constraints', len(constraints))
     return constraints
 
 
-def build_conflict_constraints(
+def room_slots_of(
         model_input: ModelBuilderInput,
-        variable_indexes: VariableIndexes) -> List[ConflictConstraint]:
-    constraints = []
+        variable_indexes: VariableIndexes) -> np.ndarray:
+    """ The number of slots each interned course is in session in its room
+    per day, which includes its lab unless it has a lab room. """
+    day_range = model_input.day_range
+    return np.array([
+        day_range.duration_slots(course.room_minutes_per_day)
+        for course in variable_indexes.courses
+    ], dtype=np.int32)
+
+
+def find_crowded_slots(
+        starts: List[int],
+        ends: List[int],
+        ids: List[int],
+        capacity: int) -> List[Tuple[int, List[int]]]:
+    """ Sweep over the intervals from starts to ends inclusive, given in
+    order of start, and return (slot, ids in session) at each start slot
+    where more than capacity intervals are in session.
+
+    Any set of pairwise overlapping intervals are all in session at the
+    start slot of the latest one, so it suffices to check each start slot.
+    If no interval has ended since the previous crowded slot, the previous
+    one is a subset of the new one and is dropped.
+    """
+    crowded = []
+    in_session = []  # (end slot, id) pairs
+    previous_is_subset = False
+    position = 0
 
-    for class_start_var in variable_indexes.variables:
-        course = class_start_var.course
-        day = class_start_var.day
-        room = class_start_var.room
-        time = class_start_var.time
+    while position < len(starts):
+        slot = starts[position]
+        still_in_session = [
+            (end_slot, var) for (end_slot, var) in in_session
+            if end_slot >= slot
+        ]
+        if len(still_in_session) < len(in_session):
+            previous_is_subset = False
+        in_session = still_in_session
 
-        blocked_time_range = model_input.day_range.sub_range(
-            start_time=time,
-            end_time=time + timedelta(minutes=course.lecture_minutes_per_day)
-        )
+        while position < len(starts) and starts[position] == slot:
+            in_session.append((ends[position], ids[position]))
+            position += 1
+
+        if len(in_session) <= capacity:
+            continue
 
-        blocked_vars = []
-        for blocked_time in blocked_time_range.values():
-            day_room_time = DayRoomTime(
-                day=day, room=room, time=blocked_time
-            )
-            blocked_vars.extend(
-                variable_indexes.by_day_room_time[day_room_time]
-            )
+        if previous_is_subset:
+            crowded.pop()
+        crowded.append((slot, [var for (_, var) in in_session]))
+        previous_is_subset = True
+
+    return crowded
+
+
+def build_conflict_constraints(
+        model_input: ModelBuilderInput,
+        variable_indexes: VariableIndexes,
+        branching_ids: Iterable[int] = None,
+) -> List[ConflictConstraint]:
+    """ Build a conflict constraint for each of the branching_ids, which
+    defaults to every variable. """
+    if branching_ids is None:
+        branching_ids = range(len(variable_indexes))
+
+    constraints = []
+    room_slots = room_slots_of(model_input, variable_indexes)
+    course_of = variable_indexes.course_of.tolist()
+    mask_of = variable_indexes.mask_of.tolist()
+    slot_of = variable_indexes.slot_of.tolist()
+    room_of = variable_indexes.room_of.tolist()
+    mask_day_indexes = [
+        [day for day in range(len(DayPattern.valid_chars)) if mask & (1 << day)]
+        for mask in range(1 << len(DayPattern.valid_chars))
+    ]
+
+    for branching_id in branching_ids:
+        start_slot = slot_of[branching_id]
+
+        # The slot at the end of the class is blocked as well, so that
+        # classes in the same room are never scheduled back-to-back.
+        end_slot = start_slot + room_slots[course_of[branching_id]]
+
+        blocked_ids = [
+            variable_indexes.day_room_slot_ids(
+                day, room_of[branching_id], start_slot, end_slot)
+            for day in mask_day_indexes[mask_of[branching_id]]
+        ]
+        blocked_ids = blocked_ids[0] if len(blocked_ids) == 1 else (
+            # A variable covering several days may block the same variable
+            # on more than one of them, so deduplicate while keeping order.
+            np.array(list(dict.fromkeys(np.concatenate(blocked_ids).tolist())),
+                     dtype=np.int32))
 
         constraints.append(ConflictConstraint(
-            branching_variable=class_start_var,
-            blocked_variables=blocked_vars,
+            variables=variable_indexes,
+            branching_id=branching_id,
+            blocked_ids=blocked_ids[blocked_ids != branching_id],
         ))
 
     print("Built {} conflict constraints".format(len(constraints)))
+    metrics.count('conflict_constraints', len(constraints))
     return constraints
 
 
-def build_meeting_consistency_constraints(
+def build_occupancy_constraints(
+        model_input: ModelBuilderInput,
+        variable_indexes: VariableIndexes,
+        day_rooms: Iterable[Tuple[str, Room]] = None,
+) -> List[OccupancyConstraint]:
+    """ Build the occupancy constraints by sweeping over the start slots
+    of each (day, room) in day_rooms, which defaults to every (day, room).
+
+    A class starting at slot s occupies slots s through s + room_slots,
+    inclusive, see find_crowded_slots.
+    """
+    constraints = []
+    room_slots = room_slots_of(model_input, variable_indexes)
+    course_of = variable_indexes.course_of
+    slot_of = variable_indexes.slot_of
+
+    if day_rooms is None:
+        day_rooms = [
+            (day, room)
+            for day in DayPattern.valid_chars
+            for room in variable_indexes.rooms
+        ]
+
+    for (day, room) in day_rooms:
+        room_index = variable_indexes.room_index.get(room)
+        if room_index is None:
+            continue
+        day_index = DayPattern.valid_chars.index(day)
+        ids = variable_indexes.day_room_slot_ids(
+            day_index, room_index, 0, np.iinfo(np.int32).max)
+        starts = slot_of[ids]
+        ends = starts + room_slots[course_of[ids]]
+
+        for (slot, occupying_ids) in find_crowded_slots(
+                starts.tolist(), ends.tolist(), ids.tolist(), room.capacity):
+            constraints.append(OccupancyConstraint(
+                variables=variable_indexes,
+                day=day,
+                room=room,
+                slot=slot,
+                occupying_ids=np.array(occupying_ids, dtype=np.int32),
+            ))
+
+    print("Built {} occupancy constraints".format(len(constraints)))
+    metrics.count('occupancy_constraints', len(constraints))
+    return constraints
+
+
+def build_lab_room_constraints(
         model_input: ModelBuilderInput,
-        variable_indexes: VariableIndexes) -> List[MeetingConsistencyConstraint]:
+        variable_indexes: VariableIndexes) -> List[OccupancyConstraint]:
+    """ Build occupancy constraints for the lab rooms, keyed by (day, lab
+    room, slot) like those of the lecture rooms.
+
+    A course with a lab room is in its lab room from the end of its
+    lecture until the end of its lab, and the lab windows of the courses
+    sharing a lab room are swept like classes in a room. No variables are
+    added, since each lab starts a fixed time after its lecture.
+
+    A lab room which is also one of the rooms is swept together with the
+    classes in that room, and only the crowded slots with a lab in session
+    are kept, since the others are covered by the conflict constraints.
+    A course with its lecture and lab in the same room is in it for a
+    single window.
+    """
     constraints = []
+    room_slots = room_slots_of(model_input, variable_indexes)
+    rooms_by_name = {
+        room.room_name: (room_index, room)
+        for (room_index, room) in enumerate(variable_indexes.rooms)
+    }
+    lab_courses = defaultdict(list)
+    for (course_index, course) in enumerate(variable_indexes.courses):
+        if course.has_lab_room:
+            lab_courses[course.lab_room].append(course_index)
+
+    for (lab_room_name, course_indexes) in lab_courses.items():
+        (room_index, lab_room) = rooms_by_name.get(
+            lab_room_name, (None, Room(room_name=lab_room_name, seats=0)))
+        lab_slots = {
+            course_index: variable_indexes.courses[course_index].lab_slots(
+                model_input.day_range)
+            for course_index in course_indexes
+        }
+
+        for (day_index, day) in enumerate(DayPattern.valid_chars):
+            # id -> (first, last) slot in the lab room.
+            windows = {}
+            for course_index in course_indexes:
+                (first, last) = lab_slots[course_index]
+                ids = variable_indexes.course_day_ids(course_index, day_index)
+                for (variable_id, slot) in zip(
+                        ids.tolist(), variable_indexes.slot_of[ids].tolist()):
+                    windows[variable_id] = (slot + first, slot + last)
+            lab_ids = set(windows)
+            if room_index is not None:
+                class_ids = variable_indexes.day_room_slot_ids(
+                    day_index, room_index, 0, np.iinfo(np.int32).max)
+                for (variable_id, slot, course_index) in zip(
+                        class_ids.tolist(),
+                        variable_indexes.slot_of[class_ids].tolist(),
+                        variable_indexes.course_of[class_ids].tolist()):
+                    (first, last) = windows.get(variable_id, (slot, slot))
+                    windows[variable_id] = (
+                        min(first, slot),
+                        max(last, slot + int(room_slots[course_index])))
+            if len(windows) <= lab_room.capacity:
+                continue
+
+            order = sorted(windows, key=lambda i: (windows[i][0], i))
+            for (slot, occupying_ids) in find_crowded_slots(
+                    [windows[i][0] for i in order],
+                    [windows[i][1] for i in order],
+                    order, lab_room.capacity):
+                if lab_ids.isdisjoint(occupying_ids):
+                    continue
+                constraints.append(OccupancyConstraint(
+                    variables=variable_indexes,
+                    day=day,
+                    room=lab_room,
+                    slot=slot,
+                    occupying_ids=np.array(occupying_ids, dtype=np.int32),
+                ))
+
+    print("Built {} lab room constraints".format(len(constraints)))
+    metrics.count('lab_room_constraints', len(constraints))
+    return constraints
 
-    for variable in variable_indexes.variables:
-        course = variable.course
-        other_days = [c for c in course.day_pattern if c != variable.day]
-
-        """ It makes sense to build these variables here instead
-        of looking up an index, because the variable _is_ the
-        index in this case. THe @dataclass will ensure the
-        variable built here is the same as a lookup, though
-        this does require us to change this instantiation in the
-        case that we add another index to ClassStartVariable.
-        In such a case, it may make sense to migrate this to a
-        lookup.
-        """
-        other_vars = set(
-            ClassStartVariable(
-                course=course,
-                day=other_day,
-                time=variable.time,
-                room=variable.room,
-            )
-            for other_day in other_days
-        )
 
+def build_room_capacity_constraints(
+        model_input: ModelBuilderInput,
+        variable_indexes: VariableIndexes) -> List[RoomCapacityConstraint]:
+    """ Build a room capacity cut for each (day, room), skipping those
+    which can never bind. """
+    constraints = []
+    room_slots = room_slots_of(model_input, variable_indexes)
+    course_of = variable_indexes.course_of
+    slot_of = variable_indexes.slot_of
+
+    for (day_index, day) in enumerate(DayPattern.valid_chars):
+        for (room_index, room) in enumerate(variable_indexes.rooms):
+            occupying_ids = variable_indexes.day_room_slot_ids(
+                day_index, room_index, 0, np.iinfo(np.int32).max)
+            if not len(occupying_ids):
+                continue
+            starts = slot_of[occupying_ids]
+            occupied_slots = room_slots[course_of[occupying_ids]] + 1
+            available_slots = room.capacity * int(
+                (starts + occupied_slots).max() - starts.min())
+            if occupied_slots.sum() <= available_slots:
+                continue
+            constraints.append(RoomCapacityConstraint(
+                variables=variable_indexes,
+                day=day,
+                room=room,
+                occupying_ids=occupying_ids,
+                occupied_slots=occupied_slots,
+                available_slots=available_slots,
+            ))
+
+    print("Built {} room capacity constraints".format(len(constraints)))
+    metrics.count('room_capacity_constraints', len(constraints))
+    return constraints
+
+
+def build_meeting_consistency_constraints(
+        model_input: ModelBuilderInput,
+        variable_indexes: VariableIndexes,
+        branching_ids: Iterable[int] = None,
+) -> List[MeetingConsistencyConstraint]:
+    """ Build a meeting consistency constraint for each of the
+    branching_ids, which defaults to every variable.
+
+    The forced variables of each constraint are looked up all at once by
+    their (course, day, slot, room), across every branching variable.
+    """
+    if branching_ids is None:
+        branching_ids = np.arange(len(variable_indexes))
+    branching_ids = np.asarray(branching_ids, dtype=np.int64)
+
+    course_of = variable_indexes.course_of[branching_ids]
+    mask_of = variable_indexes.mask_of[branching_ids]
+    pattern_masks = np.array([
+        day_mask(course.day_pattern) for course in variable_indexes.courses
+    ], dtype=np.uint8)
+    other_masks = pattern_masks[course_of] & ~mask_of
+
+    # One (branching position, forced day) pair per forced variable.
+    (positions, other_days) = np.nonzero(
+        other_masks[:, None] & (1 << np.arange(len(DayPattern.valid_chars))))
+    forced_ids = variable_indexes.find_ids(
+        course_of[positions],
+        1 << other_days,
+        variable_indexes.slot_of[branching_ids][positions],
+        variable_indexes.room_of[branching_ids][positions])
+    if (forced_ids < 0).any():
+        missing = branching_ids[positions[forced_ids < 0][0]]
+        raise KeyError("No variable on {} for {}".format(
+            DayPattern.valid_chars[other_days[forced_ids < 0][0]],
+            variable_indexes[missing]))
+
+    constraints = []
+    boundaries = np.searchsorted(positions, np.arange(len(branching_ids) + 1))
+    for (position, branching_id) in enumerate(branching_ids.tolist()):
+        (start, end) = (boundaries[position], boundaries[position + 1])
+        if start == end:
+            # The variable already covers the whole day pattern.
+            continue
         constraints.append(MeetingConsistencyConstraint(
-            branching_variable=variable,
-            forced_variables=other_vars,
+            variables=variable_indexes,
+            branching_id=branching_id,
+            forced_ids=forced_ids[start:end].astype(np.int32),
         ))
 
     print("Built {} meeting consistency constraints".format(
         len(constraints)))
+    metrics.count('meeting_consistency_constraints', len(constraints))
     return constraints
 
 
+def check_options(options: ModelOptions):
+    """ Raise a ValueError unless every constraint builder supports the
+    options. """
+    if options.conflict_formulation not in (
+            BIG_M_CONFLICTS, OCCUPANCY_CONFLICTS, NO_OVERLAP_CONFLICTS):
+        raise ValueError("Unknown conflict formulation {}".format(
+            options.conflict_formulation))
+    if options.room_classes and (
+            options.conflict_formulation == BIG_M_CONFLICTS):
+        raise ValueError("Room classes are not supported by {}".format(
+            BIG_M_CONFLICTS))
+    if options.lazy_conflicts and (
+            options.room_classes
+            or options.conflict_formulation != BIG_M_CONFLICTS):
+        raise ValueError("Lazy conflicts require {} without room classes"
+                         .format(BIG_M_CONFLICTS))
+
+
 def build_constraints(
         model_input: ModelBuilderInput,
-        variables: VariableIndexes) -> Constraints:
+        variables: VariableIndexes,
+        options: ModelOptions = ModelOptions()) -> Constraints:
     """ Build all constraints for the model. """
     uniqueness_constraints = build_uniqueness_constraints(
             model_input, variables)
-    conflict_constraints = build_conflict_constraints(
-            model_input, variables)
     meeting_consistency_constraints = build_meeting_consistency_constraints(
             model_input, variables)
+    lab_room_constraints = build_lab_room_constraints(model_input, variables)
+
+    check_options(options)
+    conflict_constraints = []
+    occupancy_constraints = []
+    if options.conflict_formulation == BIG_M_CONFLICTS:
+        conflict_constraints = build_conflict_constraints(
+                model_input, variables)
+    elif options.conflict_formulation == OCCUPANCY_CONFLICTS:
+        occupancy_constraints = build_occupancy_constraints(
+                model_input, variables)
+    elif options.conflict_formulation == NO_OVERLAP_CONFLICTS:
+        print("Leaving conflict constraints to the solver backend")
 
     return Constraints(
         uniqueness_constraints=uniqueness_constraints,
         conflict_constraints=conflict_constraints,
         meeting_consistency_constraints=meeting_consistency_constraints,
+        occupancy_constraints=occupancy_constraints,
+        lab_room_constraints=lab_room_constraints,
     )
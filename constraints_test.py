@@ -0,0 +1,160 @@
+from assertpy import assert_that
+from dataclasses import replace
+from itertools import combinations
+
+from constraints import build_constraints
+from constraints import build_lab_room_constraints
+from constraints import build_occupancy_constraints
+from data import Block
+from data import Course
+from data import DayPattern
+from data import ModelBuilderInput
+from data import ModelOptions
+from data import Room
+from data import Time
+from data import TimeRange
+from variables import build_variables
+
+
+def small_input():
+    day_range = TimeRange(
+        start_time=Time(hour=8, minute=0),
+        end_time=Time(hour=10, minute=0),
+        increment_minutes=5)
+    blocks = [
+        Block(block_id=0, start_time=Time(hour=8, minute=0), end_time=Time(hour=9, minute=0)),
+    ]
+    rooms = [Room(room_name='A', seats=30), Room(room_name='B', seats=10)]
+    courses = [
+        Course(
+            course_id='MTH 1', course_name='0', day_pattern=DayPattern.parse('MW'),
+            desired_block=0, enrollment=20, lecture_minutes_per_day=50,
+            lab_minutes_per_week=0),
+        Course(
+            course_id='MTH 2', course_name='0', day_pattern=DayPattern.parse('W'),
+            desired_block=0, enrollment=5, lecture_minutes_per_day=30,
+            lab_minutes_per_week=0),
+    ]
+    return ModelBuilderInput(
+        courses=courses, rooms=rooms, blocks=blocks, day_range=day_range)
+
+
+def overlaps(model_input, x, y):
+    day_range = model_input.day_range
+    if x.room != y.room or x.course == y.course:
+        return False
+    if not set(x.days) & set(y.days):
+        return False
+    if x.slot > y.slot:
+        x, y = y, x
+    return y.slot <= x.slot + day_range.duration_slots(
+        x.course.lecture_minutes_per_day)
+
+
+def test_occupancy_constraints_cover_every_overlap():
+    model_input = small_input()
+    variables = build_variables(model_input)
+    constraints = build_occupancy_constraints(model_input, variables)
+
+    covered = set()
+    for constraint in constraints:
+        for (x, y) in combinations(constraint.occupying_variables, 2):
+            covered.add(frozenset([x, y]))
+
+    for (x, y) in combinations(variables, 2):
+        if overlaps(model_input, x, y):
+            assert_that(covered).contains(frozenset([x, y]))
+
+
+def test_occupancy_constraints_only_contain_overlaps():
+    model_input = small_input()
+    variables = build_variables(model_input)
+    constraints = build_occupancy_constraints(model_input, variables)
+
+    for constraint in constraints:
+        for (x, y) in combinations(constraint.occupying_variables, 2):
+            assert_that(
+                x.course == y.course or overlaps(model_input, x, y)
+            ).is_true()
+
+
+def test_collapsed_day_patterns_need_no_meeting_consistency():
+    model_input = small_input()
+    options = ModelOptions(collapse_day_patterns=True)
+    variables = build_variables(model_input, options)
+    constraints = build_constraints(model_input, variables, options)
+
+    assert_that(constraints.meeting_consistency_constraints).is_empty()
+    assert_that(constraints.uniqueness_constraints).is_length(
+        len(model_input.courses))
+    for variable in variables:
+        assert_that(variable.days).is_equal_to(variable.course.day_pattern)
+
+
+def test_labs_widen_conflicts_without_variables():
+    model_input = small_input()
+    (mth1, mth2) = model_input.courses
+    # 50 lab minutes on W, in the lecture room.
+    lab_input = replace(model_input, courses=[
+        mth1, replace(mth2, lab_minutes_per_week=50)])
+    variables = build_variables(model_input)
+    lab_variables = build_variables(lab_input)
+    assert_that(lab_variables).is_length(len(variables))
+
+    conflicts = build_constraints(model_input, variables).conflict_constraints
+    lab_conflicts = build_constraints(
+        lab_input, lab_variables).conflict_constraints
+    assert_that(sum(len(c.blocked_ids) for c in lab_conflicts)).is_greater_than(
+        sum(len(c.blocked_ids) for c in conflicts))
+
+
+def test_lab_room_constraints_only_contain_overlapping_labs():
+    model_input = small_input()
+    day_range = model_input.day_range
+    courses = [
+        replace(course, lab_minutes_per_week=30 * len(course.day_pattern),
+                lab_room='LAB')
+        for course in model_input.courses
+    ]
+    model_input = replace(model_input, courses=courses)
+    variables = build_variables(model_input)
+    constraints = build_lab_room_constraints(model_input, variables)
+
+    def lab_window(x):
+        lab_start = x.slot + (
+            x.course.lecture_minutes_per_day // day_range.increment_minutes)
+        return (lab_start, x.slot + day_range.duration_slots(
+            x.course.lecture_minutes_per_day + x.course.lab_minutes_per_day))
+
+    assert_that(constraints).is_not_empty()
+    for constraint in constraints:
+        assert_that(constraint.room.room_name).is_equal_to('LAB')
+        for (x, y) in combinations(constraint.occupying_variables, 2):
+            ((x_start, x_end), (y_start, y_end)) = (lab_window(x), lab_window(y))
+            assert_that(x_start <= y_end and y_start <= x_end).is_true()
+
+
+def test_labs_in_a_room_conflict_with_its_classes():
+    model_input = small_input()
+    day_range = model_input.day_range
+    (mth1, mth2) = model_input.courses
+    mth2 = replace(mth2, lab_minutes_per_week=30, lab_room='A')
+    model_input = replace(model_input, courses=[mth1, mth2])
+    variables = build_variables(model_input)
+    constraints = build_lab_room_constraints(model_input, variables)
+
+    covered = set()
+    for constraint in constraints:
+        assert_that(constraint.room.room_name).is_equal_to('A')
+        for (x, y) in combinations(constraint.occupying_variables, 2):
+            covered.add(frozenset([x, y]))
+
+    (lab_first, lab_last) = mth2.lab_slots(day_range)
+    for x in variables:
+        if x.course != mth1 or x.room.room_name != 'A' or 'W' not in x.days:
+            continue
+        x_end = x.slot + day_range.duration_slots(mth1.room_minutes_per_day)
+        for y in variables:
+            if (y.course == mth2 and x.slot <= y.slot + lab_last
+                    and y.slot + lab_first <= x_end):
+                assert_that(covered).contains(frozenset([x, y]))
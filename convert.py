@@ -0,0 +1,138 @@
+""" Conversion of sheet rows to our internal representation. """
+from datetime import datetime
+
+from data import Block
+from data import Course
+from data import DayPattern
+from data import ModelBuilderInput
+from data import OccupiedTime
+from data import Room
+from data import Time
+from data import TimeRange
+
+
+def convert_course(row):
+    """ Convert a row of the courses sheet to our internal representation.
+
+    Schema:
+
+    [0]: course_id: int
+    [1]: course_name: str
+    [2]: day_pattern: str
+    [3]: block: int
+    [4]: enrollment: int
+    [5]: lecture hours per week: int
+    [6]: lab hours per week: int
+    [7]: num weeks: float
+    [8]: min minutes per day: int
+    [9]: total lecture minutes per week: int
+    [10]: total lab minutes per week: int
+    [11]: lab room: str, optional
+    [12]: start grid minutes: int, optional
+    """
+    return Course(
+        course_id=str(row[0]),
+        course_name=str(row[1]),
+        day_pattern=DayPattern.parse(row[2]),
+        desired_block=int(row[3]),
+        enrollment=int(row[4]),
+        lecture_minutes_per_day=int(row[8]),
+        lab_minutes_per_week=int(row[10]),
+        lab_room=str(row[11]) if len(row) > 11 and row[11] else None,
+        start_grid_minutes=int(row[12]) if len(row) > 12 and row[12] else None,
+    )
+
+
+def str_to_time(timestr: str) -> Time:
+    time = datetime.strptime(timestr, "%H:%M").time()
+    return Time(hour=time.hour, minute=time.minute)
+
+
+def convert_block(row):
+    """ Convert a row of the blocks sheet to our internal representation.
+
+    Schema:
+
+    [0]: id: int
+    [1]: start_time: str
+    [2]: end_time: str
+    [3]: start grid minutes: int, optional
+    [4]: start times: str, optional, e.g. "8:00 9:30 11:00"
+    """
+    return Block(
+        block_id=int(row[0]),
+        start_time=str_to_time(row[1]),
+        end_time=str_to_time(row[2]),
+        start_grid_minutes=int(row[3]) if len(row) > 3 and row[3] else None,
+        start_times=tuple(
+            str_to_time(timestr) for timestr in row[4].split())
+        if len(row) > 4 else (),
+    )
+
+
+def convert_room(row):
+    """ Convert a row of the rooms sheet to our internal representation.
+
+    Schema:
+
+    [0]: room name: str
+    [1]: seats: int
+    """
+    return Room(
+        room_name=row[0],
+        seats=int(row[1]),
+    )
+
+
+def convert_occupied_time(row):
+    """ Convert a row of the occupied times sheet to our internal
+    representation.
+
+    Schema:
+
+    [0]: room name: str
+    [1]: day pattern: str
+    [2]: start_time: str
+    [3]: end_time: str
+    """
+    return OccupiedTime(
+        room_name=row[0],
+        days=DayPattern.parse(row[1]),
+        start_time=str_to_time(row[2]),
+        end_time=str_to_time(row[3]),
+    )
+
+
+def build_day_range():
+    start_time = Time(hour=7, minute=0)  # 7:00 AM
+    end_time = Time(hour=20, minute=30)  # 8:30 PM
+
+    return TimeRange(
+        start_time=start_time,
+        end_time=end_time,
+        increment_minutes=5
+    )
+
+
+def convert_all_sheets(sheets):
+    converters = {
+        'courses': convert_course,
+        'rooms': convert_room,
+        'blocks': convert_block,
+        'occupied_times': convert_occupied_time,
+    }
+
+    converted = {}
+
+    for key, converter in converters.items():
+        converted[key] = [
+            converter(row) for row in sheets[key]
+        ]
+
+    return ModelBuilderInput(
+        blocks=converted['blocks'],
+        courses=converted['courses'],
+        rooms=converted['rooms'],
+        day_range=build_day_range(),
+        occupied_times=converted['occupied_times'],
+    )
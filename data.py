@@ -3,10 +3,12 @@
 
 from dataclasses import dataclass
 from dataclasses import asdict
-from datetime import datetime
+from dataclasses import field
 from datetime import time
 from datetime import timedelta
 from typing import List
+from typing import Sequence
+from typing import Tuple
 
 
 class DayPattern(str):
@@ -30,6 +32,9 @@ class DayPattern(str):
         ))
 
 
+MINUTES_PER_DAY = 24 * 60
+
+
 class Time(time):
     """ A subclass of time that forces 5-minute intervals. """
     def __new__(cls, **kwargs):
@@ -44,10 +49,19 @@ class Time(time):
 
         return time.__new__(cls, **hour_minute)
 
+    @staticmethod
+    def from_minutes(minutes: int):
+        """ Build a Time from a number of minutes since the start of the day. """
+        minutes = minutes % MINUTES_PER_DAY
+        return Time(hour=minutes // 60, minute=minutes % 60)
+
+    def minutes(self) -> int:
+        """ The number of minutes since the start of the day. """
+        return 60 * self.hour + self.minute
+
     def __add__(self, td: timedelta):
         """ Add a timedelta to self. """
-        t = (datetime.combine(datetime.today(), self) + td).time()
-        return Time(hour=t.hour, minute=t.minute)
+        return Time.from_minutes(self.minutes() + td // timedelta(minutes=1))
 
     def add_minutes(self, minutes: int):
         return self + timedelta(minutes=minutes)
@@ -66,6 +80,11 @@ class Time(time):
     def __deepcopy__(self, memo):
         return Time(hour=self.hour, minute=self.minute)
 
+    """Likewise for pickling, which is needed to send Times to worker
+    processes. """
+    def __reduce_ex__(self, protocol):
+        return (Time.from_minutes, (self.minutes(),))
+
 
 class TimeRange:
     """ A class representing a range of 5-minute intervals.
@@ -74,22 +93,56 @@ class TimeRange:
     and those indexes can be converted back and forth between human-readable dates
     and solver-readable intervals.
 
+    The model itself only ever deals with the integer indexes ("slots"); Time
+    objects are only needed when reading input and printing output.
+
     Attriutes:
+     - start_time: the Time corresponding to slot 0.
+     - increment_minutes: the number of minutes between consecutive slots.
+     - num_slots: the number of slots in this TimeRange.
      - times: the list of Time objects represented in this TimeRange.
     """
 
     def __init__(self, start_time: Time, end_time: Time, increment_minutes: int):
-        times = [start_time]
-        while times[-1] < end_time:
-            t = times[-1]
-            times.append(t.add_minutes(increment_minutes))
+        span = end_time.minutes() - start_time.minutes()
 
+        self.start_time = start_time
         self.increment_minutes = increment_minutes
-        self.times = dict(enumerate(times))
-        self.time_to_index = {v: k for (k, v) in self.times.items()}
-
-    def index(self, t: Time):
-        return self.time_to_index[t]
+        # The last slot is the first one at or after end_time.
+        self.num_slots = 1 + max(0, -(-span // increment_minutes))
+        self.times = {slot: self.time(slot) for slot in self.slots()}
+
+    def contains(self, t: Time) -> bool:
+        """ Whether t is the time of one of the slots of this range. """
+        offset = t.minutes() - self.start_time.minutes()
+        return not offset % self.increment_minutes and 0 <= offset < (
+            self.num_slots * self.increment_minutes)
+
+    def index(self, t: Time) -> int:
+        if not self.contains(t):
+            raise KeyError(t)
+        offset = t.minutes() - self.start_time.minutes()
+        return offset // self.increment_minutes
+
+    def time(self, slot: int) -> Time:
+        """ Convert a slot index back to a human-readable Time. """
+        return Time.from_minutes(
+            self.start_time.minutes() + slot * self.increment_minutes)
+
+    def slots(self) -> range:
+        return range(self.num_slots)
+
+    def slots_between(self, start_time: Time, end_time: Time) -> range:
+        """ The slots of this range strictly between start_time and end_time. """
+        start_offset = start_time.minutes() - self.start_time.minutes()
+        end_offset = end_time.minutes() - self.start_time.minutes()
+        first = start_offset // self.increment_minutes + 1
+        last = -(-end_offset // self.increment_minutes) - 1
+        return range(max(first, 0), min(last + 1, self.num_slots))
+
+    def duration_slots(self, minutes: int) -> int:
+        """ The number of slots needed to cover the given number of minutes. """
+        return -(-minutes // self.increment_minutes)
 
     def items(self):
         return self.times.items()
@@ -120,18 +173,58 @@ class BaseDataclass:
 class Block(BaseDataclass):
     """ A class representing a block of time. Used to make rigorous the specification
     that a course must be scheduled in the 'afternoon'.
+
+    Classes may start at any slot strictly inside the block, unless it has
+    a start_grid_minutes, in which case only at times that are a multiple
+    of that many minutes past midnight, or start_times, in which case only
+    at those of them strictly inside the block. Start times take precedence
+    over any grid, of the block or of its courses.
     """
     block_id: int
     start_time: Time
     end_time: Time
+    start_grid_minutes: int = None
+    start_times: Tuple[Time, ...] = ()
 
     def contains(self, time: Time) -> bool:
         return self.start_time < time < self.end_time
 
+    def start_slots(
+            self,
+            day_range: TimeRange,
+            course: 'Course' = None) -> Sequence[int]:
+        """ The slots at which a class of the course may start in this block.
+        The course's start grid, if any, replaces the block's, unless the
+        block has start times. Conflicts are still checked at every slot of
+        the day range. """
+        slots = day_range.slots_between(self.start_time, self.end_time)
+        if self.start_times:
+            return sorted(
+                day_range.index(time) for time in set(self.start_times)
+                if day_range.contains(time)
+                and day_range.index(time) in slots)
+        grid = (course and course.start_grid_minutes) or self.start_grid_minutes
+        if grid:
+            day_start = day_range.start_time.minutes()
+            increment = day_range.increment_minutes
+            slots = [
+                slot for slot in slots
+                if (day_start + slot * increment) % grid == 0
+            ]
+        return slots
+
 
 @dataclass(eq=True, frozen=True)
 class Course(BaseDataclass):
-    """A dataclass representing a course. """
+    """A dataclass representing a course.
+
+    Its lab minutes are split evenly over the days of its day pattern, and
+    immediately follow its lecture minutes on each day. They are spent in
+    the lecture room, unless a lab_room is given, in which case the lab
+    room is a second resource that courses with labs compete for.
+
+    A start_grid_minutes replaces that of the course's block, see Block.
+    """
     course_id: str
     course_name: str
     day_pattern: DayPattern
@@ -139,6 +232,34 @@ class Course(BaseDataclass):
     enrollment: int
     lecture_minutes_per_day: int
     lab_minutes_per_week: int
+    lab_room: str = None
+    start_grid_minutes: int = None
+
+    @property
+    def lab_minutes_per_day(self) -> int:
+        """ The lab minutes per day, rounded up to 5 minutes. """
+        meeting_minutes = 5 * max(1, len(self.day_pattern))
+        return 5 * -(-self.lab_minutes_per_week // meeting_minutes)
+
+    @property
+    def room_minutes_per_day(self) -> int:
+        """ The minutes per day the course is in session in its room. """
+        if self.lab_room:
+            return self.lecture_minutes_per_day
+        return self.lecture_minutes_per_day + self.lab_minutes_per_day
+
+    @property
+    def has_lab_room(self) -> bool:
+        """ Whether the course spends its lab minutes in a lab room. """
+        return bool(self.lab_room) and self.lab_minutes_per_week > 0
+
+    def lab_slots(self, day_range: TimeRange) -> Tuple[int, int]:
+        """ The first and last slot the course is in its lab room on each of
+        its days, counted from the start slot of its lecture. """
+        return (
+            self.lecture_minutes_per_day // day_range.increment_minutes,
+            day_range.duration_slots(
+                self.lecture_minutes_per_day + self.lab_minutes_per_day))
 
 
 @dataclass(eq=True, frozen=True)
@@ -147,16 +268,88 @@ class Room(BaseDataclass):
     room_name: str  # unique
     seats: int
 
+    @property
+    def capacity(self) -> int:
+        """ The number of classes that can be in session in this room at
+        once, which is more than one for a RoomClass. """
+        return 1
+
+    def contains(self, room) -> bool:
+        """ Whether the given room is this room, or one of the rooms of
+        this RoomClass. """
+        return self == room
+
     def can_fit(self, course: Course) -> bool:
         return self.seats > course.enrollment
 
 
+@dataclass(eq=True, frozen=True)
+class OccupiedTime(BaseDataclass):
+    """ A time when a room is unavailable on each of the given days, for
+    example because it is booked by another department. """
+    room_name: str
+    days: DayPattern
+    start_time: Time
+    end_time: Time
+
+    def slots(self, day_range: TimeRange) -> Tuple[int, int]:
+        """ The first and last slot of the day range the room is occupied,
+        from the one at or before the start time to the one at or after the
+        end time. The first may be negative. """
+        day_start = day_range.start_time.minutes()
+        increment = day_range.increment_minutes
+        return (
+            (self.start_time.minutes() - day_start) // increment,
+            -(-(self.end_time.minutes() - day_start) // increment))
+
+
 @dataclass(eq=True, frozen=True)
 class ModelBuilderInput(BaseDataclass):
     courses: List[Course]
     rooms: List[Room]
     blocks: List[Block]
     day_range: TimeRange
+    occupied_times: List[OccupiedTime] = field(default_factory=list)
+
+
+""" Formulations for the constraints preventing two classes from being in
+session in the same room at the same time.
+
+ - BIG_M_CONFLICTS: one big-M constraint per class start variable, forcing
+   all conflicting starts to zero when the variable is 1.
+ - OCCUPANCY_CONFLICTS: one "at most one class in session" constraint per
+   (day, room, slot), which is sparser and has a tighter LP relaxation.
+ - NO_OVERLAP_CONFLICTS: no conflict constraints are built, and the solver
+   backend enforces them natively. Only supported by the CP-SAT backend.
+"""
+BIG_M_CONFLICTS = 'big-m'
+OCCUPANCY_CONFLICTS = 'occupancy'
+NO_OVERLAP_CONFLICTS = 'no-overlap'
+CONFLICT_FORMULATIONS = [
+    BIG_M_CONFLICTS, OCCUPANCY_CONFLICTS, NO_OVERLAP_CONFLICTS]
+
+
+@dataclass(eq=True, frozen=True)
+class ModelOptions(BaseDataclass):
+    """ Options controlling how the model is formulated.
+
+    Attributes:
+     - conflict_formulation: one of CONFLICT_FORMULATIONS.
+     - collapse_day_patterns: if True, build a single variable per
+       (course, time, room) covering every day of the course's day pattern,
+       instead of one variable per day tied together by meeting consistency
+       constraints.
+     - room_classes: if True, build variables for classes of interchangeable
+       rooms instead of individual rooms, and assign concrete rooms after
+       solving. Not supported by BIG_M_CONFLICTS.
+     - lazy_conflicts: if True, only build the conflict constraints violated
+       by a solution without them, and re-solve until none are violated,
+       see lazy.py. Only supported by BIG_M_CONFLICTS.
+    """
+    conflict_formulation: str = BIG_M_CONFLICTS
+    collapse_day_patterns: bool = False
+    room_classes: bool = False
+    lazy_conflicts: bool = False
 
 
 """ Index classes. """
@@ -165,10 +358,51 @@ class ModelBuilderInput(BaseDataclass):
 class DayRoomTime(BaseDataclass):
     day: str
     room: Room
-    time: Time
+    slot: int
 
 
 @dataclass(eq=True, frozen=True)
 class CourseDay(BaseDataclass):
     course: Course
     day: str
+
+
+""" Solver backends, see backends.py. """
+CBC_BACKEND = 'cbc'
+CP_SAT_BACKEND = 'cp-sat'
+SOLVER_BACKENDS = [CBC_BACKEND, CP_SAT_BACKEND]
+
+
+@dataclass(eq=True, frozen=True)
+class SolverOptions(BaseDataclass):
+    """ Options controlling how the model is solved.
+
+    Attributes:
+     - backend: one of SOLVER_BACKENDS.
+     - num_workers: the number of parallel search workers, for backends
+       that support it. 0 uses every core.
+     - debug_names: if True, give the solver's variables and constraints
+       human-readable names, which is slow for large models.
+     - time_limit_seconds: if set, stop solving after this wall time and
+       return the best schedule found so far, if any.
+     - relative_gap: if set, stop solving once the objective is within this
+       fraction of the best bound.
+     - greedy_hint: if True, pass the solver a greedily constructed
+       schedule as a hint, see greedy.py. Not supported by the CBC backend,
+       which ignores hints.
+     - greedy_only: if True, return the greedy schedule without solving if
+       it places every course, and otherwise solve with it as a hint.
+     - local_search: if True, search for a schedule by local search instead
+       of building and solving the model, for time_limit_seconds or
+       search.DEFAULT_BUDGET_SECONDS, see search.py.
+     - seed: the random seed of the local search.
+    """
+    backend: str = CBC_BACKEND
+    num_workers: int = 0
+    debug_names: bool = False
+    time_limit_seconds: float = None
+    relative_gap: float = None
+    greedy_hint: bool = False
+    greedy_only: bool = False
+    local_search: bool = False
+    seed: int = 0
@@ -1,9 +1,15 @@
+from dataclasses import replace
+
 from assertpy import assert_that
 from itertools import combinations
+import pickle
 import pytest
 
+from data import Block
+from data import Course
 from data import Time
 from data import DayPattern
+from data import OccupiedTime
 from data import TimeRange
 
 
@@ -43,3 +49,89 @@ def test_day_range_index():
     dr = TimeRange(start_time=Time(hour=7, minute=30), end_time=Time(hour=20, minute=30), increment_minutes=5)
     time = dr.times[37]
     assert_that(dr.index(time)).is_equal_to(37)
+
+
+def test_time_add_minutes():
+    time = Time(hour=7, minute=55).add_minutes(75)
+    assert_that(time).is_equal_to(Time(hour=9, minute=10))
+    assert_that(time).is_instance_of(Time)
+
+
+def test_day_range_time_round_trip():
+    dr = TimeRange(start_time=Time(hour=7, minute=30), end_time=Time(hour=20, minute=30), increment_minutes=5)
+    for slot in dr.slots():
+        assert_that(dr.index(dr.time(slot))).is_equal_to(slot)
+    assert_that(dr.time(6)).is_equal_to(Time(hour=8, minute=0))
+
+
+def test_day_range_slots_between_matches_block_contains():
+    dr = TimeRange(start_time=Time(hour=7, minute=0), end_time=Time(hour=20, minute=30), increment_minutes=5)
+    block = Block(block_id=0, start_time=Time(hour=12, minute=0), end_time=Time(hour=15, minute=0))
+    expected = [slot for (slot, time) in dr.items() if block.contains(time)]
+    assert_that(list(dr.slots_between(block.start_time, block.end_time))).is_equal_to(expected)
+
+
+def test_block_start_slots_follow_grid_and_start_times():
+    dr = TimeRange(start_time=Time(hour=7, minute=0), end_time=Time(hour=20, minute=30), increment_minutes=5)
+    block = Block(block_id=0, start_time=Time(hour=12, minute=0), end_time=Time(hour=13, minute=0),
+                  start_grid_minutes=15)
+    assert_that([dr.time(slot) for slot in block.start_slots(dr)]).is_equal_to(
+        [Time(hour=12, minute=15), Time(hour=12, minute=30), Time(hour=12, minute=45)])
+
+    course = Course(
+        course_id='MTH 1', course_name='0', day_pattern=DayPattern.parse('MW'),
+        desired_block=0, enrollment=20, lecture_minutes_per_day=50,
+        lab_minutes_per_week=0, start_grid_minutes=30)
+    assert_that(block.start_slots(dr, course)).is_equal_to([dr.index(Time(hour=12, minute=30))])
+
+    standard = Block(block_id=1, start_time=Time(hour=8, minute=0), end_time=Time(hour=12, minute=0),
+                     start_times=(Time(hour=8, minute=0), Time(hour=9, minute=30), Time(hour=12, minute=0)))
+    assert_that([dr.time(slot) for slot in standard.start_slots(dr)]).is_equal_to(
+        [Time(hour=9, minute=30)])
+
+
+def test_block_start_times_take_precedence_over_grids():
+    dr = TimeRange(start_time=Time(hour=7, minute=0), end_time=Time(hour=20, minute=30), increment_minutes=5)
+    block = Block(block_id=0, start_time=Time(hour=8, minute=0), end_time=Time(hour=9, minute=0),
+                  start_times=(Time(hour=8, minute=15), Time(hour=8, minute=45)))
+    course = Course(
+        course_id='MTH 1', course_name='0', day_pattern=DayPattern.parse('MW'),
+        desired_block=0, enrollment=20, lecture_minutes_per_day=50,
+        lab_minutes_per_week=0, start_grid_minutes=30)
+    expected = [dr.index(Time(hour=8, minute=15)), dr.index(Time(hour=8, minute=45))]
+
+    assert_that(block.start_slots(dr)).is_equal_to(expected)
+    assert_that(replace(block, start_grid_minutes=30).start_slots(dr)).is_equal_to(expected)
+    assert_that(block.start_slots(dr, course)).is_equal_to(expected)
+
+
+def test_block_start_times_follow_the_block_boundaries():
+    dr = TimeRange(start_time=Time(hour=7, minute=0), end_time=Time(hour=20, minute=30), increment_minutes=5)
+    block = Block(block_id=0, start_time=Time(hour=8, minute=0), end_time=Time(hour=9, minute=0))
+    every_slot = replace(block, start_times=tuple(dr.values()))
+    assert_that(every_slot.start_slots(dr)).is_equal_to(list(block.start_slots(dr)))
+    assert_that(block.start_slots(dr)).does_not_contain(dr.index(block.start_time))
+    # Start times off the day range's grid are left out.
+    dr = TimeRange(start_time=Time(hour=7, minute=0), end_time=Time(hour=20, minute=30), increment_minutes=15)
+    off_grid = replace(block, start_times=(Time(hour=8, minute=5), Time(hour=8, minute=30)))
+    assert_that(off_grid.start_slots(dr)).is_equal_to([dr.index(Time(hour=8, minute=30))])
+
+
+def test_day_range_duration_slots():
+    dr = TimeRange(start_time=Time(hour=7, minute=0), end_time=Time(hour=20, minute=30), increment_minutes=5)
+    assert_that(dr.duration_slots(75)).is_equal_to(15)
+    assert_that(dr.duration_slots(52)).is_equal_to(11)
+
+
+def test_occupied_time_slots_cover_partial_slots():
+    dr = TimeRange(start_time=Time(hour=7, minute=0), end_time=Time(hour=20, minute=30), increment_minutes=15)
+    occupied = OccupiedTime(room_name='A', days='MW', start_time=Time(hour=8, minute=5), end_time=Time(hour=9, minute=20))
+    assert_that(occupied.slots(dr)).is_equal_to((4, 10))
+    early = replace(occupied, start_time=Time(hour=6, minute=0))
+    assert_that(early.slots(dr)).is_equal_to((-4, 10))
+
+
+def test_time_pickle_round_trip():
+    time = Time(hour=13, minute=35)
+    assert_that(pickle.loads(pickle.dumps(time))).is_equal_to(time)
+    assert_that(pickle.loads(pickle.dumps(time))).is_instance_of(Time)
@@ -0,0 +1,168 @@
+""" A module for splitting the model into independent subproblems.
+
+Two courses can only constrain each other if they could use the same room,
+on the same day, at overlapping times. The connected components of that
+interaction graph can be solved as separate models, in parallel, and their
+schedules merged.
+"""
+from collections import defaultdict
+from dataclasses import replace
+import time
+from typing import List
+
+from backends import FEASIBLE
+from backends import INFEASIBLE
+from backends import OPTIMAL
+from backends import UNKNOWN
+from data import ModelBuilderInput
+from data import ModelOptions
+from data import SolverOptions
+from pool import quiet
+from pool import worker_pool
+from solve import Schedule
+from solve import solve_model
+
+
+class UnionFind:
+    """ A disjoint-set forest over the integers 0, ..., size - 1. """
+    def __init__(self, size: int):
+        self.parents = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parents[i] != i:
+            self.parents[i] = self.parents[self.parents[i]]
+            i = self.parents[i]
+        return i
+
+    def union(self, i: int, j: int):
+        self.parents[self.find(i)] = self.find(j)
+
+
+def find_components(model_input: ModelBuilderInput) -> List[ModelBuilderInput]:
+    """ Split the model input into inputs whose courses can never compete
+    for a room at the same time, or for a lab room, ordered by their first
+    course.
+
+    Each course may be in session from the first legal start slot of its
+    block until the lecture starting at the last legal start slot ends, and
+    similarly in its lab room. For each (day, room), sweeping over these
+    windows in order of their start joins the courses with overlapping
+    windows. A lab room which is also a room is swept with it.
+    """
+    courses = model_input.courses
+    day_range = model_input.day_range
+    blocks_by_id = {b.block_id: b for b in model_input.blocks}
+
+    windows_by_day_room = defaultdict(list)
+    for (course_index, course) in enumerate(courses):
+        block = blocks_by_id[course.desired_block]
+        slots = block.start_slots(day_range, course)
+        # A course without legal starts is left to be reported by
+        # solve_model, on its own.
+        if not slots:
+            continue
+        room_slots = day_range.duration_slots(course.room_minutes_per_day)
+        room_windows = [
+            (room.room_name, slots[0], slots[-1] + room_slots)
+            for room in model_input.rooms if room.can_fit(course)
+        ]
+        if course.has_lab_room:
+            (lab_first, lab_last) = course.lab_slots(day_range)
+            room_windows.append(
+                (course.lab_room, slots[0] + lab_first, slots[-1] + lab_last))
+        for (room_name, first, last) in room_windows:
+            for day in course.day_pattern:
+                windows_by_day_room[(day, room_name)].append(
+                    (first, last, course_index))
+
+    union_find = UnionFind(len(courses))
+    for day_room_windows in windows_by_day_room.values():
+        day_room_windows.sort()
+        (_, cluster_end, cluster_course) = day_room_windows[0]
+        for (start, end, course_index) in day_room_windows[1:]:
+            if start <= cluster_end:
+                union_find.union(course_index, cluster_course)
+                cluster_end = max(cluster_end, end)
+            else:
+                (cluster_end, cluster_course) = (end, course_index)
+
+    component_courses = defaultdict(list)
+    for (course_index, course) in enumerate(courses):
+        component_courses[union_find.find(course_index)].append(course)
+
+    return [
+        ModelBuilderInput(
+            courses=component,
+            rooms=[
+                room for room in model_input.rooms
+                if any(room.can_fit(course) for course in component)
+            ],
+            blocks=model_input.blocks,
+            day_range=day_range,
+            occupied_times=model_input.occupied_times,
+        )
+        for component in component_courses.values()
+    ]
+
+
+@quiet
+def _solve_component(component_input, options, solver_options, deadline):
+    if deadline is not None:
+        # The deadline is a wall clock time, since it is shared across
+        # processes.
+        time_left = deadline - time.time()
+        if time_left <= 0:
+            return Schedule(status=UNKNOWN, class_starts=[])
+        solver_options = replace(solver_options, time_limit_seconds=time_left)
+    return solve_model(component_input, options, solver_options)
+
+
+def merge_statuses(statuses: List[str]) -> str:
+    """ The status of a schedule merged from schedules with these statuses. """
+    for status in (INFEASIBLE, UNKNOWN, FEASIBLE):
+        if status in statuses:
+            return status
+    return OPTIMAL
+
+
+def solve_decomposed(
+        model_input: ModelBuilderInput,
+        options: ModelOptions = ModelOptions(),
+        solver_options: SolverOptions = SolverOptions(),
+        max_workers: int = None) -> Schedule:
+    """ Solve each independent component of the model in a pool of
+    max_workers processes, and merge the resulting schedules.
+
+    The solver's time limit, if any, is a deadline for every component,
+    counted from the start of this function, so components waiting for a
+    worker only get the time left. Components not started by then are
+    UNKNOWN.
+    """
+    time_limit = solver_options.time_limit_seconds
+    deadline = None if time_limit is None else time.time() + time_limit
+    components = find_components(model_input)
+    print("Found {} independent components".format(len(components)))
+
+    if len(components) == 1:
+        return solve_model(model_input, options, solver_options)
+
+    with worker_pool(max_workers) as executor:
+        schedules = list(executor.map(
+            _solve_component,
+            components,
+            [options] * len(components),
+            [solver_options] * len(components),
+            [deadline] * len(components)))
+
+    for (i, (component, schedule)) in enumerate(zip(components, schedules)):
+        print("Component {}: {} courses, {} rooms, status={}".format(
+            i, len(component.courses), len(component.rooms), schedule.status))
+
+    return Schedule(
+        status=merge_statuses([schedule.status for schedule in schedules]),
+        class_starts=[
+            class_start
+            for schedule in schedules
+            for class_start in schedule.class_starts
+        ],
+    )
@@ -0,0 +1,98 @@
+from dataclasses import replace
+import time
+
+from assertpy import assert_that
+
+from backends import OPTIMAL
+from backends import UNKNOWN
+from data import Block
+from data import Course
+from data import DayPattern
+from data import ModelBuilderInput
+from data import ModelOptions
+from data import Room
+from data import SolverOptions
+from data import Time
+from data import TimeRange
+from decompose import _solve_component
+from decompose import find_components
+
+
+def course(course_id, day_pattern, block, enrollment=20):
+    return Course(
+        course_id=course_id, course_name='0',
+        day_pattern=DayPattern.parse(day_pattern), desired_block=block,
+        enrollment=enrollment, lecture_minutes_per_day=50,
+        lab_minutes_per_week=0)
+
+
+def model_input(courses):
+    return ModelBuilderInput(
+        courses=courses,
+        rooms=[Room(room_name='small', seats=30), Room(room_name='big', seats=100)],
+        blocks=[
+            Block(block_id=0, start_time=Time(hour=8, minute=0), end_time=Time(hour=10, minute=0)),
+            Block(block_id=1, start_time=Time(hour=9, minute=0), end_time=Time(hour=12, minute=0)),
+            Block(block_id=2, start_time=Time(hour=14, minute=0), end_time=Time(hour=17, minute=0)),
+        ],
+        day_range=TimeRange(
+            start_time=Time(hour=7, minute=0),
+            end_time=Time(hour=20, minute=30),
+            increment_minutes=5))
+
+
+def component_ids(components):
+    return sorted(
+        sorted(c.course_id for c in component.courses)
+        for component in components)
+
+
+def test_different_days_are_independent():
+    components = find_components(model_input([
+        course('A', 'MW', 0), course('B', 'TR', 0)]))
+    assert_that(component_ids(components)).is_equal_to([['A'], ['B']])
+
+
+def test_overlapping_blocks_on_a_shared_day_interact():
+    components = find_components(model_input([
+        course('A', 'MW', 0), course('B', 'W', 1), course('C', 'MW', 2)]))
+    assert_that(component_ids(components)).is_equal_to([['A', 'B'], ['C']])
+
+
+def test_courses_interact_through_a_shared_room_only():
+    components = find_components(model_input([
+        course('A', 'M', 0, enrollment=50), course('B', 'M', 0, enrollment=50),
+        course('C', 'T', 0), course('D', 'T', 0, enrollment=50)]))
+    assert_that(component_ids(components)).is_equal_to([['A', 'B'], ['C', 'D']])
+    for component in components:
+        assert_that(component.rooms).is_not_empty()
+
+
+def test_labs_interact_with_classes_in_their_lab_room():
+    lab_course = replace(
+        course('A', 'M', 0, enrollment=50), lab_minutes_per_week=300)
+    components = find_components(model_input([lab_course, course('B', 'M', 2)]))
+    assert_that(component_ids(components)).is_equal_to([['A', 'B']])
+
+    components = find_components(model_input([
+        replace(lab_course, lab_room='LAB'), course('B', 'M', 2)]))
+    assert_that(component_ids(components)).is_equal_to([['A'], ['B']])
+
+    components = find_components(model_input([
+        replace(lab_course, lab_room='small'), course('B', 'M', 2)]))
+    assert_that(component_ids(components)).is_equal_to([['A', 'B']])
+
+
+def test_components_share_the_time_limit():
+    component = model_input([course('A', 'M', 0)])
+    solver_options = SolverOptions(time_limit_seconds=60)
+
+    schedule = _solve_component(
+        component, ModelOptions(), solver_options, time.time() + 60)
+    assert_that(schedule.status).is_equal_to(OPTIMAL)
+
+    # A component whose worker frees up after the deadline is not solved.
+    schedule = _solve_component(
+        component, ModelOptions(), solver_options, time.time() - 1)
+    assert_that(schedule.status).is_equal_to(UNKNOWN)
+    assert_that(schedule.class_starts).is_empty()
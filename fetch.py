@@ -1,28 +1,38 @@
-from datetime import datetime
+import json
+import os
+from typing import Dict
+from typing import List
+
 from googleapiclient.discovery import build
 from httplib2 import Http
 from oauth2client import file, client, tools
 
-from data import Block
-from data import Course
-from data import DayPattern
-from data import ModelBuilderInput
-from data import Room
-from data import Time
-from data import TimeRange
+from convert import convert_all_sheets
 
 
-# If modifying these scopes, delete the file token.json.
-SCOPES = 'https://www.googleapis.com/auth/spreadsheets.readonly'
+# The authorization flow is run again if token.json lacks any of these scopes.
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets.readonly',
+    # To read the spreadsheet's version without fetching its values.
+    'https://www.googleapis.com/auth/drive.metadata.readonly',
+]
 
 # The ID and range of a sample spreadsheet.
 SPREADSHEET_ID = '11PsAQoazA3Jr799Nj4BPON4mANbjSsKjVizXh1cKK1M'
-COURSES_TO_SCHEDULE_RANGE = 'Courses to Schedule!A2:K'
+COURSES_TO_SCHEDULE_RANGE = 'Courses to Schedule!A2:M'
 ROOMS_RANGE = 'Rooms!A2:B'
-BLOCKS_RANGE = 'Blocks!A2:C'
+BLOCKS_RANGE = 'Blocks!A2:E'
 OCCUPIED_TIMES_RANGE = 'Occupied Times!A2:D'
 CONFIG_RANGE = 'Config!A2:B'
 
+SHEET_RANGES = {
+    'courses': COURSES_TO_SCHEDULE_RANGE,
+    'rooms': ROOMS_RANGE,
+    'blocks': BLOCKS_RANGE,
+    'occupied_times': OCCUPIED_TIMES_RANGE,
+    'config': CONFIG_RANGE,
+}
+
 
 class SheetsApi:
     def __init__(self, spreadsheet_id):
@@ -31,150 +41,132 @@ class SheetsApi:
         # time.
         store = file.Storage('token.json')
         creds = store.get()
-        if not creds or creds.invalid:
+        if not creds or creds.invalid or not creds.has_scopes(SCOPES):
             flow = client.flow_from_clientsecrets('credentials.json', SCOPES)
             creds = tools.run_flow(flow, store)
-        service = build('sheets', 'v4', http=creds.authorize(Http()))
+        self.http = creds.authorize(Http())
 
-        self.api = service.spreadsheets()
+        self.api = build('sheets', 'v4', http=self.http).spreadsheets()
+        self.drive_api = None
         self.spreadsheet_id = spreadsheet_id
 
-    def get(self, range_expr):
-        print("Fetching '{}'".format(range_expr))
-        values = self.api.values().get(
+    def revision(self) -> str:
+        """ The spreadsheet's version, which increases on every edit. """
+        # Only runs with a snapshot need the Drive API.
+        if self.drive_api is None:
+            self.drive_api = build('drive', 'v3', http=self.http).files()
+        return self.drive_api.get(
+            fileId=self.spreadsheet_id,
+            fields='version'
+        ).execute()['version']
+
+    def batch_get(self, range_exprs: List[str]) -> List[List]:
+        """ Fetch the values of several ranges in a single request. """
+        for range_expr in range_exprs:
+            print("Fetching '{}'".format(range_expr))
+        value_ranges = self.api.values().batchGet(
             spreadsheetId=self.spreadsheet_id,
-            range=range_expr
-        ).execute().get('values', [])
-
-        if not values:
-            raise Exception("Could not find values for {}".format(range_expr))
-
-        return values
-
-
-def get_sheets():
-    """ Query Google Sheets and return each sheet in a different dict entry. """
-    sheets_api = SheetsApi(SPREADSHEET_ID)
-
-    courses_rows = sheets_api.get(COURSES_TO_SCHEDULE_RANGE)
-    rooms_rows = sheets_api.get(ROOMS_RANGE)
-    blocks_rows = sheets_api.get(BLOCKS_RANGE)
-    occupied_times_rows = sheets_api.get(OCCUPIED_TIMES_RANGE)
-    config_rows = sheets_api.get(CONFIG_RANGE)
-
-    return {
-        'courses': courses_rows,
-        'rooms': rooms_rows,
-        'blocks': blocks_rows,
-        'occupied_times': occupied_times_rows,
-        'config': config_rows,
-    }
-
-
-def convert_course(row):
-    """ Convert a row of the courses sheet to our internal representation.
-
-    Schema:
-
-    [0]: course_id: int
-    [1]: course_name: str
-    [2]: day_pattern: str
-    [3]: block: int
-    [4]: enrollment: int
-    [5]: lecture hours per week: int
-    [6]: lab hours per week: int
-    [7]: num weeks: float
-    [8]: min minutes per day: int
-    [9]: total lecture minutes per week: int
-    [10]: total lab minutes per week: int
-    """
-    return Course(
-        course_id=str(row[0]),
-        course_name=str(row[1]),
-        day_pattern=DayPattern.parse(row[2]),
-        desired_block=int(row[3]),
-        enrollment=int(row[4]),
-        lecture_minutes_per_day=int(row[8]),
-        lab_minutes_per_week=int(row[10]),
-    )
-
-
-def str_to_time(timestr: str) -> Time:
-    time = datetime.strptime(timestr, "%H:%M").time()
-    return Time(hour=time.hour, minute=time.minute)
-
+            ranges=range_exprs
+        ).execute().get('valueRanges', [])
+        if len(value_ranges) != len(range_exprs):
+            raise Exception("Expected {} ranges but got {}".format(
+                len(range_exprs), len(value_ranges)))
+
+        return [
+            check_values(range_expr, value_range.get('values', []))
+            for (range_expr, value_range) in zip(range_exprs, value_ranges)
+        ]
 
-def convert_block(row):
-    """ Convert a row of the blocks sheet to our internal representation.
+    def get(self, range_expr):
+        return self.batch_get([range_expr])[0]
+
+
+class LocalSheetsApi:
+    """ A stand-in for SheetsApi serving fixed sheets, keyed like the
+    result of get_sheets, for testing and benchmarking without network
+    access. """
+    def __init__(self, sheets: Dict[str, List], revision: str = '1'):
+        self.values = {
+            SHEET_RANGES[key]: rows for (key, rows) in sheets.items()
+        }
+        self.revision_id = revision
+        self.num_requests = 0
+
+    def revision(self) -> str:
+        return self.revision_id
+
+    def batch_get(self, range_exprs: List[str]) -> List[List]:
+        self.num_requests += 1
+        return [
+            check_values(range_expr, self.values.get(range_expr, []))
+            for range_expr in range_exprs
+        ]
 
-    Schema:
+    def get(self, range_expr):
+        return self.batch_get([range_expr])[0]
 
-    [0]: id: int
-    [1]: start_time: str
-    [2]: end_time: str
-    """
-    return Block(
-        block_id=int(row[0]),
-        start_time=str_to_time(row[1]),
-        end_time=str_to_time(row[2]),
-    )
 
+def check_values(range_expr, values):
+    if not values:
+        raise Exception("Could not find values for {}".format(range_expr))
+    return values
 
-def convert_room(row):
-    """ Convert a row of the rooms sheet to our internal representation.
 
-    Schema:
+def load_snapshot(path: str) -> Dict:
+    """ The snapshot saved by save_snapshot, as a dict with keys
+    'revision' and 'sheets', or None if there is none. """
+    if not os.path.exists(path):
+        return None
+    with open(path) as infile:
+        return json.load(infile)
 
-    [0]: room name: str
-    [1]: seats: int
-    """
-    return Room(
-        room_name=row[0],
-        seats=int(row[1]),
-    )
 
+def save_snapshot(path: str, revision: str, sheets: Dict[str, List]):
+    with open(path, 'w') as outfile:
+        json.dump({'revision': revision, 'sheets': sheets}, outfile)
 
-def convert_occupied_time(row):
-    # TODO: add hard-blockers occupying rooms at certain times
-    pass
 
+def get_sheets(sheets_api=None, snapshot_path: str = None, offline=False):
+    """ Query Google Sheets and return each sheet in a different dict entry.
 
-def build_day_range():
-    start_time = Time(hour=7, minute=0)  # 7:00 AM
-    end_time = Time(hour=20, minute=30)  # 8:30 PM
+    If a snapshot_path is given, the sheets are saved there along with the
+    spreadsheet's revision, and later calls load them from the snapshot
+    instead if the spreadsheet has not been edited since. If offline is
+    True, the sheets are only loaded from the snapshot.
+    """
+    snapshot = load_snapshot(snapshot_path) if snapshot_path else None
 
-    return TimeRange(
-        start_time=start_time,
-        end_time=end_time,
-        increment_minutes=5
-    )
+    if offline:
+        if snapshot is None:
+            raise Exception("Could not find a snapshot at {}".format(
+                snapshot_path))
+        print("Loading sheets from snapshot {} (revision {})".format(
+            snapshot_path, snapshot['revision']))
+        return snapshot['sheets']
 
+    sheets_api = sheets_api or SheetsApi(SPREADSHEET_ID)
 
-def convert_all_sheets(sheets):
-    converters = {
-        'courses': convert_course,
-        'rooms': convert_room,
-        'blocks': convert_block,
-        'occupied_times': convert_occupied_time,
-    }
+    revision = None
+    if snapshot_path:
+        revision = sheets_api.revision()
+        if snapshot is not None and snapshot['revision'] == revision:
+            print("Spreadsheet unchanged since snapshot (revision {})".format(
+                revision))
+            return snapshot['sheets']
 
-    converted = {}
+    sheets = dict(zip(
+        SHEET_RANGES.keys(),
+        sheets_api.batch_get(list(SHEET_RANGES.values()))))
 
-    for key, converter in converters.items():
-        converted[key] = [
-            converter(row) for row in sheets[key]
-        ]
+    if snapshot_path:
+        save_snapshot(snapshot_path, revision, sheets)
 
-    return ModelBuilderInput(
-        blocks=converted['blocks'],
-        courses=converted['courses'],
-        rooms=converted['rooms'],
-        day_range=build_day_range(),
-    )
+    return sheets
 
 
-def fetch_and_convert_data():
-    return convert_all_sheets(get_sheets())
+def fetch_and_convert_data(snapshot_path: str = None, offline=False):
+    return convert_all_sheets(
+        get_sheets(snapshot_path=snapshot_path, offline=offline))
 
 
 def print_rows(sheet):
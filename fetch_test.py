@@ -0,0 +1,86 @@
+from assertpy import assert_that
+import pytest
+
+from convert import convert_all_sheets
+from data import Time
+from fetch import LocalSheetsApi
+from fetch import SheetsApi
+from fetch import get_sheets
+
+
+SHEETS = {
+    'courses': [
+        ['1', 'MTH 1', 'MW', '0', '30', '3', '0', '15', '90', '180', '0'],
+    ],
+    'rooms': [['A', '30']],
+    'blocks': [['0', '8:00', '12:00', '30', '8:00 9:30 11:00']],
+    'occupied_times': [['A', 'MW', '8:00', '9:00']],
+    'config': [['increment', '5']],
+}
+
+
+def test_get_sheets_fetches_every_range_in_one_request():
+    sheets_api = LocalSheetsApi(SHEETS)
+
+    sheets = get_sheets(sheets_api)
+
+    assert_that(sheets).is_equal_to(SHEETS)
+    assert_that(sheets_api.num_requests).is_equal_to(1)
+    model_input = convert_all_sheets(sheets)
+    assert_that(model_input.rooms).is_length(1)
+    assert_that(model_input.occupied_times[0].days).is_equal_to('MW')
+    assert_that(model_input.occupied_times[0].end_time).is_equal_to(
+        Time(hour=9, minute=0))
+    assert_that(model_input.blocks[0].start_grid_minutes).is_equal_to(30)
+    assert_that(model_input.blocks[0].start_times).is_length(3)
+
+
+def test_get_sheets_reuses_snapshot_until_revision_changes(tmp_path):
+    snapshot_path = str(tmp_path / 'snapshot.json')
+    sheets_api = LocalSheetsApi(SHEETS, revision='1')
+
+    get_sheets(sheets_api, snapshot_path)
+    assert_that(get_sheets(sheets_api, snapshot_path)).is_equal_to(SHEETS)
+    assert_that(sheets_api.num_requests).is_equal_to(1)
+
+    sheets_api.revision_id = '2'
+    get_sheets(sheets_api, snapshot_path)
+    assert_that(sheets_api.num_requests).is_equal_to(2)
+
+
+def test_get_sheets_offline(tmp_path):
+    snapshot_path = str(tmp_path / 'snapshot.json')
+    with pytest.raises(Exception):
+        get_sheets(snapshot_path=snapshot_path, offline=True)
+
+    get_sheets(LocalSheetsApi(SHEETS), snapshot_path)
+
+    assert_that(get_sheets(snapshot_path=snapshot_path, offline=True)
+                ).is_equal_to(SHEETS)
+
+
+class FakeSpreadsheets:
+    """ Answers every batchGet with the given value ranges. """
+    def __init__(self, value_ranges):
+        self.value_ranges = value_ranges
+
+    def values(self):
+        return self
+
+    def batchGet(self, spreadsheetId, ranges):
+        return self
+
+    def execute(self):
+        return {'valueRanges': self.value_ranges}
+
+
+def test_batch_get_rejects_missing_ranges():
+    # Skip __init__, which runs the authorization flow.
+    sheets_api = SheetsApi.__new__(SheetsApi)
+    sheets_api.spreadsheet_id = 'id'
+    sheets_api.api = FakeSpreadsheets([{'values': [['A', '30']]}])
+
+    assert_that(sheets_api.batch_get(['Rooms!A2:B'])).is_equal_to(
+        [[['A', '30']]])
+    with pytest.raises(Exception):
+        sheets_api.batch_get(['Rooms!A2:B', 'Blocks!A2:E'])
@@ -0,0 +1,108 @@
+""" A module for generating synthetic model inputs of any size.
+
+Instances are generated from a seed, so the same options always give the
+same instance, from the size of the README example up to a whole campus.
+"""
+from dataclasses import dataclass
+import random
+from typing import List
+from typing import Tuple
+
+from convert import build_day_range
+from data import BaseDataclass
+from data import Block
+from data import Course
+from data import DayPattern
+from data import ModelBuilderInput
+from data import Room
+from data import Time
+from data import TimeRange
+
+
+# Weekly lecture minutes, split evenly over the days of each course.
+LECTURE_MINUTES_PER_WEEK = 150
+
+# Room sizes, each followed by its relative frequency.
+ROOM_SEATS = ((20, 3), (30, 4), (40, 3), (60, 2), (100, 1), (150, 1))
+
+
+@dataclass(frozen=True)
+class InstanceOptions(BaseDataclass):
+    """ The size and shape of a generated instance.
+
+    The day is split into num_blocks consecutive blocks of equal length,
+    and each course is given a random block and day pattern, and an
+    enrollment that fits in at least one room.
+
+    The README example has 20 sections in 9 rooms, a campus has around
+    2000 sections in 300 rooms.
+    """
+    num_courses: int = 20
+    num_rooms: int = 9
+    num_blocks: int = 4
+    day_patterns: Tuple[str, ...] = ('MW', 'TR', 'MWF', 'MTR', 'MTWR')
+    seed: int = 0
+
+
+PRESETS = {
+    # The size of the example run in the README.
+    'readme': InstanceOptions(),
+    'department': InstanceOptions(num_courses=200, num_rooms=30),
+    'campus': InstanceOptions(num_courses=2000, num_rooms=300),
+}
+
+
+def generate_blocks(num_blocks: int, day_range: TimeRange) -> List[Block]:
+    increment = day_range.increment_minutes
+    day_minutes = (day_range.num_slots - 1) * increment
+    block_minutes = day_minutes // num_blocks // increment * increment
+    start_minutes = day_range.start_time.minutes()
+
+    return [
+        Block(
+            block_id=i,
+            start_time=Time.from_minutes(start_minutes + i * block_minutes),
+            end_time=Time.from_minutes(
+                start_minutes + (i + 1) * block_minutes
+                if i < num_blocks - 1 else start_minutes + day_minutes),
+        )
+        for i in range(num_blocks)
+    ]
+
+
+def generate_input(
+        options: InstanceOptions = InstanceOptions()) -> ModelBuilderInput:
+    """ Generate a ModelBuilderInput from the options. """
+    rng = random.Random(options.seed)
+    day_range = build_day_range()
+    blocks = generate_blocks(options.num_blocks, day_range)
+
+    (seat_choices, seat_weights) = zip(*ROOM_SEATS)
+    rooms = [
+        Room(room_name='R{:03d}'.format(i), seats=seats)
+        for (i, seats) in enumerate(rng.choices(
+            seat_choices, seat_weights, k=options.num_rooms))
+    ]
+
+    courses = []
+    for i in range(options.num_courses):
+        day_pattern = DayPattern.parse(rng.choice(options.day_patterns))
+        lecture_minutes = LECTURE_MINUTES_PER_WEEK / len(day_pattern)
+        room = rng.choice(rooms)
+        courses.append(Course(
+            course_id='SYN {}'.format(i),
+            course_name='{}'.format(i),
+            day_pattern=day_pattern,
+            desired_block=rng.randrange(options.num_blocks),
+            # Sized for a random room, so that every course fits somewhere.
+            enrollment=rng.randint(room.seats // 2, room.seats - 1),
+            lecture_minutes_per_day=5 * round(lecture_minutes / 5),
+            lab_minutes_per_week=0,
+        ))
+
+    return ModelBuilderInput(
+        courses=courses,
+        rooms=rooms,
+        blocks=blocks,
+        day_range=day_range,
+    )
@@ -0,0 +1,28 @@
+from assertpy import assert_that
+
+from generate import InstanceOptions
+from generate import generate_input
+
+
+def test_generate_input_is_seeded():
+    options = InstanceOptions(num_courses=50, num_rooms=10, seed=3)
+    (first, second) = (generate_input(options), generate_input(options))
+
+    assert_that(first.courses).is_equal_to(second.courses)
+    assert_that(first.rooms).is_equal_to(second.rooms)
+    assert_that(first.courses).is_not_equal_to(
+        generate_input(InstanceOptions(num_courses=50, seed=4)).courses)
+
+
+def test_generate_input_sizes():
+    model_input = generate_input(
+        InstanceOptions(num_courses=50, num_rooms=10, num_blocks=3))
+
+    assert_that(model_input.courses).is_length(50)
+    assert_that(model_input.rooms).is_length(10)
+    assert_that(model_input.blocks).is_length(3)
+    for (block, next_block) in zip(model_input.blocks, model_input.blocks[1:]):
+        assert_that(block.end_time).is_equal_to(next_block.start_time)
+    for course in model_input.courses:
+        assert_that(any(room.can_fit(course) for room in model_input.rooms)
+                    ).is_true()
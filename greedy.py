@@ -0,0 +1,173 @@
+""" A module for constructing a schedule greedily, without a solver.
+
+Courses are placed one at a time, hardest first: those with the fewest
+legal room times, then those with the largest enrollment. Each is given the
+earliest start slot in its block, and then the smallest room, at which
+neither its room nor its lab room is full on any of its days. Whether a
+room is full is kept in a per-(day, room) occupancy index, which is
+updated as each course is placed. Lab rooms which are not one of the rooms
+are indexed after them, and labs held in one of the rooms fill that room.
+
+The schedule satisfies every constraint of the model, but a course with no
+free room time left is not placed, so it may be incomplete. Either way it
+is a good hint for the solver, and a complete one may be used as is when an
+optimal schedule is not needed, since the model has no objective.
+"""
+from typing import List
+from typing import Tuple
+
+import numpy as np
+
+from data import Course
+from data import DayPattern
+from data import ModelBuilderInput
+from data import Room
+from data import TimeRange
+from variables import VariableIndexes
+
+
+class OccupancyIndex:
+    """ The number of classes in session in each (day, room, slot), with the
+    number of full slots before each slot, so that whether a room is full
+    anywhere from one slot to another is a difference of two counts. """
+    def __init__(self, num_rooms: int, num_slots: int, capacities: np.ndarray):
+        num_days = len(DayPattern.valid_chars)
+        self.capacities = capacities
+        self.in_session = np.zeros((num_days, num_rooms, num_slots), np.int32)
+        self.full_before = np.zeros(
+            (num_days, num_rooms, num_slots + 1), np.int32)
+
+    def is_full(
+            self,
+            day: int,
+            rooms: np.ndarray,
+            firsts: np.ndarray,
+            lasts: np.ndarray) -> np.ndarray:
+        """ Whether each room is full at any slot from first to last
+        inclusive on the day. """
+        full_before = self.full_before[day]
+        return full_before[rooms, lasts + 1] > full_before[rooms, firsts]
+
+    def add(self, day: int, room: int, first: int, last: int):
+        in_session = self.in_session[day, room]
+        in_session[first:last + 1] += 1
+        self.full_before[day, room, 1:] = np.cumsum(
+            in_session >= self.capacities[room])
+
+
+class RoomWindows:
+    """ The windows of slots each course is in session in its room and in
+    its lab room, if any, for schedules built without the model.
+
+    Rooms are indexed as given, followed by the lab rooms which are not one
+    of them, which hold one class at a time.
+    """
+    def __init__(
+            self,
+            day_range: TimeRange,
+            rooms: List[Room],
+            courses: List[Course]):
+        self.room_names = [room.room_name for room in rooms]
+        self.room_names.extend(sorted({
+            course.lab_room for course in courses if course.has_lab_room
+        } - set(self.room_names)))
+        self.capacities = np.array(
+            [room.capacity for room in rooms]
+            + [1] * (len(self.room_names) - len(rooms)))
+        self.room_slots = np.array([
+            day_range.duration_slots(course.room_minutes_per_day)
+            for course in courses
+        ], dtype=np.int32)
+        # The lab room index, first and last slot after the start, if any.
+        self.labs = [
+            (self.room_names.index(course.lab_room),
+             *course.lab_slots(day_range))
+            if course.has_lab_room else None
+            for course in courses
+        ]
+        # Room for the last slot of a class starting at the last slot.
+        self.num_slots = day_range.num_slots + int(max(
+            self.room_slots.max(initial=0),
+            max((lab[2] for lab in self.labs if lab), default=0))) + 1
+
+    def windows(
+            self,
+            course: int,
+            slot: int,
+            room: int) -> List[Tuple[int, int, int]]:
+        """ The (room, first slot, last slot) the course is in session in at
+        the slot and room. A lab in the lecture room makes a single window
+        in it. """
+        end = slot + int(self.room_slots[course])
+        lab = self.labs[course]
+        if lab is None:
+            return [(room, slot, end)]
+        (lab_room, first, last) = lab
+        if lab_room == room:
+            return [(room, slot, max(end, slot + last))]
+        return [(room, slot, end), (lab_room, slot + first, slot + last)]
+
+
+def construct_greedily(
+        model_input: ModelBuilderInput,
+        variables: VariableIndexes) -> Tuple[List[int], List[Course]]:
+    """ Return the ids of the variables which are 1 in the greedy schedule,
+    and the courses it could not place. """
+    courses = variables.courses
+    room_windows = RoomWindows(
+        model_input.day_range, variables.rooms, courses)
+    rooms = OccupancyIndex(
+        len(room_windows.room_names), room_windows.num_slots,
+        room_windows.capacities)
+    seats = np.array([room.seats for room in variables.rooms])
+
+    # The ids of each course's variables, and its distinct (slot, room).
+    num_rooms = len(variables.rooms)
+    order = np.argsort(variables.course_of, kind='stable')
+    bounds = np.searchsorted(
+        variables.course_of[order], np.arange(len(courses) + 1))
+    course_ids = [order[bounds[i]:bounds[i + 1]] for i in range(len(courses))]
+    room_times = [
+        np.unique(
+            variables.slot_of[ids].astype(np.int64) * num_rooms
+            + variables.room_of[ids], return_inverse=True)
+        for ids in course_ids
+    ]
+
+    chosen_ids = []
+    unplaced = []
+    for course_index in sorted(
+            range(len(courses)),
+            key=lambda i: (len(room_times[i][0]), -courses[i].enrollment)):
+        course = courses[course_index]
+        (keys, inverse) = room_times[course_index]
+        (slots, room_indexes) = np.divmod(keys, num_rooms)
+        days = [DayPattern.valid_chars.index(day) for day in course.day_pattern]
+        ends = slots + room_windows.room_slots[course_index]
+        lab = room_windows.labs[course_index]
+
+        blocked = np.zeros(len(keys), dtype=bool)
+        for day in days:
+            blocked |= rooms.is_full(day, room_indexes, slots, ends)
+            if lab is not None:
+                (lab_room, lab_first, lab_last) = lab
+                blocked |= rooms.is_full(
+                    day, np.full(len(keys), lab_room),
+                    slots + lab_first, slots + lab_last)
+
+        free = np.flatnonzero(~blocked)
+        if not len(free):
+            unplaced.append(course)
+            continue
+        best = free[np.lexsort((
+            room_indexes[free], seats[room_indexes[free]], slots[free]))[0]]
+        (slot, room) = (int(slots[best]), int(room_indexes[best]))
+        for day in days:
+            for (window_room, first, last) in room_windows.windows(
+                    course_index, slot, room):
+                rooms.add(day, window_room, first, last)
+        chosen_ids.extend(course_ids[course_index][inverse == best].tolist())
+
+    print("Greedily placed {} of {} courses".format(
+        len(courses) - len(unplaced), len(courses)))
+    return (chosen_ids, unplaced)
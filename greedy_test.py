@@ -0,0 +1,81 @@
+from dataclasses import replace
+
+from assertpy import assert_that
+
+from backends import FEASIBLE
+from constraints_test import small_input
+from data import CP_SAT_BACKEND
+from data import ModelOptions
+from data import NO_OVERLAP_CONFLICTS
+from data import SolverOptions
+from generate import InstanceOptions
+from generate import generate_input
+from greedy import construct_greedily
+from lazy import find_overlapping_ids
+from solve import solve_model
+from variables import build_variables
+
+
+def test_greedy_schedule_places_every_course_without_overlaps():
+    model_input = generate_input(InstanceOptions())
+    variables = build_variables(model_input)
+
+    (chosen_ids, unplaced) = construct_greedily(model_input, variables)
+
+    assert_that(unplaced).is_empty()
+    assert_that(find_overlapping_ids(model_input, variables, chosen_ids)
+                ).is_empty()
+    assert_that(chosen_ids).is_length(sum(
+        len(course.day_pattern) for course in model_input.courses))
+    # Each course meets at the same time in the same room on every day.
+    assert_that({
+        (variables[i].course, variables[i].slot, variables[i].room)
+        for i in chosen_ids
+    }).is_length(len(model_input.courses))
+
+
+def test_greedy_schedule_leaves_out_courses_without_a_free_room():
+    model_input = generate_input(InstanceOptions(num_courses=60, num_rooms=2))
+
+    (_, unplaced) = construct_greedily(
+        model_input, build_variables(model_input))
+
+    assert_that(unplaced).is_not_empty()
+
+
+def test_greedy_schedule_keeps_labs_clear_of_classes_in_their_room():
+    model_input = small_input()
+    (mth1, mth2) = model_input.courses
+    model_input = replace(model_input, courses=[
+        mth1, replace(mth2, lab_minutes_per_week=30, lab_room='A')])
+    variables = build_variables(model_input)
+
+    (chosen_ids, _) = construct_greedily(model_input, variables)
+
+    # MTH 1 is in A until slot 11, and MTH 2's lab starts 6 slots after it.
+    starts = {(variables[i].course.course_id, variables[i].room.room_name,
+               variables[i].slot) for i in chosen_ids}
+    assert_that(starts).is_equal_to({('MTH 1', 'A', 1), ('MTH 2', 'B', 6)})
+
+
+def test_fast_mode_returns_greedy_schedule():
+    model_input = generate_input(InstanceOptions())
+
+    schedule = solve_model(
+        model_input, ModelOptions(), SolverOptions(greedy_only=True))
+
+    assert_that(schedule.status).is_equal_to(FEASIBLE)
+    assert_that(schedule.class_starts).is_length(sum(
+        len(course.day_pattern) for course in model_input.courses))
+
+
+def test_greedy_hint_needs_a_backend_that_uses_hints():
+    model_input = generate_input(InstanceOptions())
+
+    assert_that(solve_model).raises(ValueError).when_called_with(
+        model_input, ModelOptions(), SolverOptions(greedy_hint=True))
+
+    schedule = solve_model(
+        model_input, ModelOptions(conflict_formulation=NO_OVERLAP_CONFLICTS),
+        SolverOptions(backend=CP_SAT_BACKEND, greedy_hint=True))
+    assert_that(schedule.has_solution()).is_true()
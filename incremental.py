@@ -0,0 +1,205 @@
+""" A module for re-solving the model after small edits to its input.
+
+The input and schedule of each run are saved to a state file. The next run
+diffs its input against the saved one, and starts from the saved schedule:
+it is passed to the solver as a hint, and the courses unaffected by the
+edits can be fixed to their previous start time and room, so that only the
+variables and constraints of the affected courses are really rebuilt.
+"""
+from dataclasses import dataclass
+from dataclasses import field
+import os
+import pickle
+from timeit import default_timer as timer
+from typing import Callable
+from typing import Set
+
+from backends import make_backend
+from data import Course
+from data import ModelBuilderInput
+from data import ModelOptions
+from data import SolverOptions
+from solve import Schedule
+from solve import WarmStart
+from solve import solve_model
+from solve import solve_unpinned
+
+
+@dataclass
+class SavedState:
+    model_input: ModelBuilderInput
+    schedule: Schedule
+
+
+@dataclass
+class InputDiff:
+    """ The differences between two model inputs.
+
+    Attributes:
+     - changed_courses: courses of the new input not in the old one,
+       including edited courses.
+     - removed_courses: courses of the old input not in the new one.
+     - changed_rooms: names of rooms added, removed or resized.
+     - changed_blocks: ids of blocks added, removed or moved.
+     - changed_day_range: whether the day range changed, which affects
+       every course.
+    """
+    changed_courses: Set[Course] = field(default_factory=set)
+    removed_courses: Set[Course] = field(default_factory=set)
+    changed_rooms: Set[str] = field(default_factory=set)
+    changed_blocks: Set[int] = field(default_factory=set)
+    changed_day_range: bool = False
+
+    def __str__(self):
+        return ("{} changed courses, {} removed courses, {} changed rooms, "
+                "{} changed blocks, day range {}").format(
+            len(self.changed_courses),
+            len(self.removed_courses),
+            len(self.changed_rooms),
+            len(self.changed_blocks),
+            "changed" if self.changed_day_range else "unchanged")
+
+
+def diff_inputs(old: ModelBuilderInput, new: ModelBuilderInput) -> InputDiff:
+    old_courses = set(old.courses)
+    new_courses = set(new.courses)
+    old_rooms = {room.room_name: room for room in old.rooms}
+    new_rooms = {room.room_name: room for room in new.rooms}
+    old_occupied = {
+        name: {o for o in old.occupied_times if o.room_name == name}
+        for name in old_rooms}
+    new_occupied = {
+        name: {o for o in new.occupied_times if o.room_name == name}
+        for name in new_rooms}
+    old_blocks = {block.block_id: block for block in old.blocks}
+    new_blocks = {block.block_id: block for block in new.blocks}
+
+    return InputDiff(
+        changed_courses=new_courses - old_courses,
+        removed_courses=old_courses - new_courses,
+        changed_rooms={
+            name for name in old_rooms.keys() | new_rooms.keys()
+            if old_rooms.get(name) != new_rooms.get(name)
+            or old_occupied.get(name) != new_occupied.get(name)
+        },
+        changed_blocks={
+            block_id for block_id in old_blocks.keys() | new_blocks.keys()
+            if old_blocks.get(block_id) != new_blocks.get(block_id)
+        },
+        changed_day_range=(
+            old.day_range.start_time != new.day_range.start_time
+            or old.day_range.num_slots != new.day_range.num_slots
+            or old.day_range.increment_minutes
+            != new.day_range.increment_minutes),
+    )
+
+
+def affected_courses(
+        model_input: ModelBuilderInput,
+        diff: InputDiff,
+        previous: Schedule) -> Set[Course]:
+    """ The courses of model_input whose previous start time and room may
+    no longer be legal: the changed courses, the courses in changed blocks,
+    and the courses previously scheduled in a changed room.
+
+    Courses which could fit in an added or enlarged room are not affected,
+    since their previous room is still legal.
+    """
+    if diff.changed_day_range:
+        return set(model_input.courses)
+
+    affected = set(diff.changed_courses)
+
+    for course in model_input.courses:
+        if course.desired_block in diff.changed_blocks:
+            affected.add(course)
+
+    for class_start in previous.class_starts:
+        if class_start.room.room_name in diff.changed_rooms:
+            affected.add(class_start.course)
+
+    return affected
+
+
+def load_state(path: str) -> SavedState:
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as infile:
+        return pickle.load(infile)
+
+
+def save_state(path: str, model_input: ModelBuilderInput, schedule: Schedule):
+    with open(path, 'wb') as outfile:
+        pickle.dump(SavedState(model_input=model_input, schedule=schedule),
+                    outfile)
+
+
+def solve_incremental(
+        model_input: ModelBuilderInput,
+        state_path: str,
+        options: ModelOptions = ModelOptions(),
+        solver_options: SolverOptions = SolverOptions(),
+        pin_unaffected: bool = False,
+        build_workers: int = 1,
+        on_schedule: Callable[[Schedule], None] = None) -> Schedule:
+    """ Solve the model starting from the schedule saved in state_path,
+    if any, and save the new schedule there.
+
+    The saved schedule is passed to the solver as a hint. If the backend does
+    not support hints and nothing is pinned, the saved schedule is not used,
+    and the model is solved from scratch, which is logged.
+
+    If pin_unaffected is True, the courses unaffected by the changes since
+    the saved run keep their previous start time and room. If that turns
+    out to be infeasible, the model is solved again without pinning. The
+    solver's time limit, if any, is shared by both solves, counted from the
+    start of this function.
+
+    The on_schedule callback is passed to solve_model.
+    """
+    start = timer()
+    state = load_state(state_path)
+
+    if state is None:
+        print("No saved state found, solving from scratch")
+        schedule = solve_model(
+            model_input, options, solver_options, build_workers=build_workers,
+            on_schedule=on_schedule)
+    else:
+        diff = diff_inputs(state.model_input, model_input)
+        print("Changes since the saved run: {}".format(diff))
+
+        current_courses = set(model_input.courses)
+        class_starts = [
+            class_start for class_start in state.schedule.class_starts
+            if class_start.course in current_courses
+        ]
+        fixed_courses = set()
+        if pin_unaffected:
+            fixed_courses = current_courses - affected_courses(
+                model_input, diff, state.schedule)
+            print("Pinning {} unaffected courses".format(len(fixed_courses)))
+
+        warm_start = WarmStart(
+            class_starts=class_starts, fixed_courses=fixed_courses)
+        if not fixed_courses and not make_backend(
+                solver_options).supports_hints:
+            print("The {} backend ignores hints, so without pinning the "
+                  "saved schedule is not used, solving from scratch".format(
+                      solver_options.backend))
+            warm_start = None
+
+        schedule = solve_model(
+            model_input, options, solver_options,
+            build_workers=build_workers, warm_start=warm_start,
+            on_schedule=on_schedule)
+
+        if fixed_courses and not schedule.has_solution():
+            schedule = solve_unpinned(
+                model_input, options, solver_options, class_starts, start,
+                build_workers=build_workers, on_schedule=on_schedule)
+
+    if schedule.has_solution():
+        save_state(state_path, model_input, schedule)
+
+    return schedule
@@ -0,0 +1,86 @@
+from assertpy import assert_that
+from dataclasses import replace
+from timeit import default_timer as timer
+
+from backends import OPTIMAL
+from backends import UNKNOWN
+from constraints_test import small_input
+from data import CP_SAT_BACKEND
+from data import ModelOptions
+from data import Room
+from data import SolverOptions
+from incremental import affected_courses
+from incremental import diff_inputs
+from incremental import solve_incremental
+from solve import Schedule
+from solve import solve_unpinned
+from variables import ClassStartVariable
+
+
+def test_diff_inputs_finds_edited_course_and_room():
+    old = small_input()
+    (mth1, mth2) = old.courses
+    edited = replace(mth1, enrollment=25)
+    new = replace(
+        old,
+        courses=[edited, mth2],
+        rooms=[Room(room_name='A', seats=30), Room(room_name='B', seats=12)])
+
+    diff = diff_inputs(old, new)
+
+    assert_that(diff.changed_courses).is_equal_to({edited})
+    assert_that(diff.removed_courses).is_equal_to({mth1})
+    assert_that(diff.changed_rooms).is_equal_to({'B'})
+    assert_that(diff.changed_blocks).is_empty()
+    assert_that(diff.changed_day_range).is_false()
+
+
+def test_affected_courses_include_courses_in_changed_rooms():
+    old = small_input()
+    (mth1, mth2) = old.courses
+    (room_a, room_b) = old.rooms
+    new = replace(old, rooms=[room_a, Room(room_name='B', seats=1)])
+    previous = Schedule(status='OPTIMAL', class_starts=[
+        ClassStartVariable(course=mth1, days='MW', slot=1, room=room_a),
+        ClassStartVariable(course=mth2, days='W', slot=3, room=room_b),
+    ])
+
+    affected = affected_courses(new, diff_inputs(old, new), previous)
+
+    assert_that(affected).is_equal_to({mth2})
+
+
+def test_solve_unpinned_shares_the_time_limit():
+    model_input = small_input()
+    solver_options = SolverOptions(time_limit_seconds=60)
+
+    schedule = solve_unpinned(
+        model_input, ModelOptions(), solver_options, [], timer())
+    assert_that(schedule.status).is_equal_to(OPTIMAL)
+
+    schedule = solve_unpinned(
+        model_input, ModelOptions(), solver_options, [], timer() - 60)
+    assert_that(schedule.status).is_equal_to(UNKNOWN)
+
+
+def test_solve_incremental_says_when_the_hint_is_ignored(tmp_path, capsys):
+    model_input = small_input()
+    state_path = str(tmp_path / 'state.pickle')
+    solve_incremental(model_input, state_path)
+    capsys.readouterr()
+
+    schedule = solve_incremental(model_input, state_path)
+    assert_that(schedule.status).is_equal_to(OPTIMAL)
+    assert_that(capsys.readouterr().out).contains(
+        'The cbc backend ignores hints')
+
+    schedule = solve_incremental(
+        model_input, state_path, pin_unaffected=True)
+    assert_that(schedule.status).is_equal_to(OPTIMAL)
+    assert_that(capsys.readouterr().out).does_not_contain('ignores hints')
+
+    schedule = solve_incremental(
+        model_input, state_path,
+        solver_options=SolverOptions(backend=CP_SAT_BACKEND))
+    assert_that(schedule.status).is_equal_to(OPTIMAL)
+    assert_that(capsys.readouterr().out).does_not_contain('ignores hints')
@@ -0,0 +1,170 @@
+""" A module for building the conflict constraints lazily.
+
+Most conflict constraints never bind, since most (day, room) pairs are
+uncontested. Instead of building them all up front, the model is first
+solved with only the uniqueness and meeting consistency constraints and a
+room capacity cut per (day, room). The solution is swept for classes that
+overlap in a room, the conflict constraints of every variable in the rooms
+and days where they overlap are added, and the model is re-solved from the
+previous solution, until no classes overlap.
+
+The solver's time limit is for the whole loop, so each round is only given
+the time left until the loop's deadline.
+"""
+from dataclasses import replace
+from itertools import chain
+from timeit import default_timer as timer
+from typing import List
+
+import numpy as np
+
+from backends import SolverBackend
+from backends import SolveResult
+from backends import UNKNOWN
+from constraints import build_conflict_constraints
+from constraints import build_lab_room_constraints
+from constraints import build_meeting_consistency_constraints
+from constraints import build_room_capacity_constraints
+from constraints import build_uniqueness_constraints
+from constraints import check_options
+from constraints import room_slots_of
+from data import DayPattern
+from data import ModelBuilderInput
+from data import ModelOptions
+from matrix import build_rows
+from matrix import concatenate_rows
+import metrics
+from timer import Timer
+from variables import VariableIndexes
+
+
+def find_overlapping_ids(
+        model_input: ModelBuilderInput,
+        variables: VariableIndexes,
+        chosen_ids: np.ndarray) -> List[int]:
+    """ Sweep the chosen variables of each (day, room) in order of start
+    slot, and return the ids of those in session when a later one starts.
+    Their conflict constraints cut off the chosen variables. """
+    chosen_ids = np.asarray(chosen_ids, dtype=np.int64)
+    ends = (variables.slot_of[chosen_ids]
+            + room_slots_of(model_input, variables)[
+                variables.course_of[chosen_ids]]).tolist()
+
+    # One (chosen position, day) pair per day of each chosen variable.
+    (positions, days) = np.nonzero(
+        variables.mask_of[chosen_ids][:, None]
+        & (1 << np.arange(len(DayPattern.valid_chars))))
+    keys = (days * len(variables.rooms)
+            + variables.room_of[chosen_ids][positions])
+    starts = variables.slot_of[chosen_ids][positions]
+    order = np.lexsort((starts, keys))
+
+    overlapping = {}
+    previous_key = None
+    (latest_end, latest_position) = (None, None)
+    for (key, start, position) in zip(
+            keys[order].tolist(), starts[order].tolist(),
+            positions[order].tolist()):
+        if key != previous_key or start > latest_end:
+            (latest_end, latest_position) = (ends[position], position)
+        else:
+            overlapping[int(chosen_ids[latest_position])] = None
+            if ends[position] > latest_end:
+                (latest_end, latest_position) = (ends[position], position)
+        previous_key = key
+
+    return list(overlapping)
+
+
+def day_room_ids(
+        variables: VariableIndexes, variable_ids: List[int]) -> List[int]:
+    """ The ids of every variable starting in the same room on the first
+    day of any of variable_ids. Adding the conflict constraints of a whole
+    contested (day, room) at once keeps the solver from moving overlapping
+    classes around it one slot at a time. """
+    day_rooms = dict.fromkeys(zip(
+        variables.first_day_of[variable_ids].tolist(),
+        variables.room_of[variable_ids].tolist()))
+    return np.concatenate([
+        variables.day_room_slot_ids(day, room, 0, np.iinfo(np.int32).max)
+        for (day, room) in day_rooms
+    ]).tolist()
+
+
+def solve_lazily(
+        model_input: ModelBuilderInput,
+        variables: VariableIndexes,
+        backend: SolverBackend,
+        options: ModelOptions = ModelOptions(),
+        hint: List[int] = None) -> SolveResult:
+    """ Solve the model, adding conflict constraints until the solution has
+    no overlapping classes. The returned result's wall_time is the total
+    over every round.
+
+    The backend's time limit, if any, is a deadline for the whole loop,
+    counted from the start of this function. If it passes before a round
+    finds a solution without overlaps, the result is UNKNOWN, since the
+    solutions found so far have overlaps.
+    """
+    check_options(replace(options, lazy_conflicts=True))
+    time_limit = backend.options.time_limit_seconds
+    deadline = None if time_limit is None else timer() + time_limit
+
+    with Timer("Building constraints without conflicts"):
+        row_blocks = [build_rows(chain(
+            build_uniqueness_constraints(model_input, variables),
+            build_meeting_consistency_constraints(model_input, variables),
+            build_room_capacity_constraints(model_input, variables),
+            build_lab_room_constraints(model_input, variables),
+        ))]
+
+    added_ids = set()
+    wall_time = 0
+    round_number = 0
+    while True:
+        round_backend = backend
+        if deadline is not None:
+            time_left = deadline - timer()
+            if time_left <= 0:
+                print("Ran out of time after {} rounds".format(round_number))
+                result = SolveResult(
+                    status=UNKNOWN, values=np.zeros(len(variables)),
+                    wall_time=0)
+                break
+            round_backend = type(backend)(replace(
+                backend.options, time_limit_seconds=time_left))
+
+        round_number += 1
+        with metrics.span('lazy_round'):
+            matrix = concatenate_rows(variables, row_blocks)
+            result = round_backend.solve(
+                model_input, variables, matrix, hint=hint)
+            wall_time += result.wall_time
+            if not result.has_solution():
+                break
+
+            chosen_ids = np.flatnonzero(result.values > 0.5)
+            overlapping_ids = find_overlapping_ids(
+                model_input, variables, chosen_ids)
+            print("Round {} found {} overlapping classes".format(
+                round_number, len(overlapping_ids)))
+            if not overlapping_ids:
+                break
+
+            branching_ids = [
+                variable_id
+                for variable_id in day_room_ids(variables, overlapping_ids)
+                if variable_id not in added_ids
+            ]
+            row_blocks.append(build_rows(build_conflict_constraints(
+                model_input, variables, branching_ids=branching_ids)))
+            added_ids.update(branching_ids)
+            hint = chosen_ids.tolist()
+
+    print("Used {} of {} conflict constraints in {} rounds".format(
+        len(added_ids), len(variables), round_number))
+    metrics.record('lazy.rounds', round_number)
+    metrics.record('lazy.conflict_constraints', len(added_ids))
+    result.wall_time = wall_time
+    result.statistics['rounds'] = round_number
+    return result
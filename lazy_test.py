@@ -0,0 +1,103 @@
+from assertpy import assert_that
+
+from backends import CbcBackend
+from backends import OPTIMAL
+from backends import UNKNOWN
+from data import ModelOptions
+from data import SolverOptions
+from generate import InstanceOptions
+from generate import generate_input
+from constraints_test import small_input
+from lazy import find_overlapping_ids
+from lazy import solve_lazily
+from metrics import Metrics
+from metrics import activate
+from solve import solve_model
+from variables import build_variables
+
+
+def test_find_overlapping_ids():
+    model_input = small_input()
+    variables = build_variables(model_input)
+    (mth1, mth2) = model_input.courses
+
+    def variable_id(course, day, slot, room_name='A'):
+        return next(
+            variable_id for (variable_id, variable) in enumerate(variables)
+            if variable.course == course and variable.days == day
+            and variable.slot == slot and variable.room.room_name == room_name)
+
+    assert_that(find_overlapping_ids(model_input, variables, [
+        variable_id(mth1, 'W', 1), variable_id(mth2, 'W', 5),
+    ])).is_equal_to([variable_id(mth1, 'W', 1)])
+    # The slot at the end of a lecture is occupied as well.
+    assert_that(find_overlapping_ids(model_input, variables, [
+        variable_id(mth1, 'W', 1), variable_id(mth2, 'W', 11),
+    ])).is_length(1)
+    assert_that(find_overlapping_ids(model_input, variables, [
+        variable_id(mth1, 'W', 1), variable_id(mth2, 'W', 1, 'B'),
+    ])).is_empty()
+    assert_that(find_overlapping_ids(model_input, variables, [
+        variable_id(mth1, 'M', 1), variable_id(mth2, 'W', 1),
+    ])).is_empty()
+
+
+def test_lazy_conflicts_solve_without_overlaps():
+    model_input = generate_input(InstanceOptions())
+    run_metrics = Metrics()
+    previous = activate(run_metrics)
+    try:
+        schedule = solve_model(model_input, ModelOptions(lazy_conflicts=True))
+    finally:
+        activate(previous)
+
+    assert_that(run_metrics.totals()['conflict_constraints']).is_less_than(
+        len(build_variables(model_input)))
+
+    assert_that(schedule.status).is_equal_to(OPTIMAL)
+    assert_that(schedule.class_starts).is_length(sum(
+        len(course.day_pattern) for course in model_input.courses))
+    by_day_room = {}
+    for class_start in schedule.class_starts:
+        end = class_start.slot + model_input.day_range.duration_slots(
+            class_start.course.lecture_minutes_per_day)
+        for day in class_start.days:
+            by_day_room.setdefault((day, class_start.room), []).append(
+                (class_start.slot, end))
+    for intervals in by_day_room.values():
+        intervals.sort()
+        for ((_, end), (next_start, _)) in zip(intervals, intervals[1:]):
+            assert_that(next_start).is_greater_than(end)
+
+
+class RecordingBackend(CbcBackend):
+    time_limits = []
+
+    def solve(self, *args, **kwargs):
+        self.time_limits.append(self.options.time_limit_seconds)
+        return super().solve(*args, **kwargs)
+
+
+def test_lazy_rounds_share_the_time_limit():
+    model_input = generate_input(InstanceOptions())
+    variables = build_variables(model_input)
+    backend = RecordingBackend(SolverOptions(time_limit_seconds=60))
+
+    result = solve_lazily(model_input, variables, backend)
+
+    assert_that(result.statistics['rounds']).is_greater_than(1)
+    time_limits = RecordingBackend.time_limits
+    assert_that(time_limits).is_length(result.statistics['rounds'])
+    assert_that(time_limits[0]).is_less_than(60)
+    assert_that(time_limits).is_equal_to(sorted(time_limits, reverse=True))
+
+
+def test_lazy_conflicts_stop_at_the_deadline():
+    model_input = generate_input(InstanceOptions())
+    variables = build_variables(model_input)
+    backend = CbcBackend(SolverOptions(time_limit_seconds=1e-6))
+
+    result = solve_lazily(model_input, variables, backend)
+
+    assert_that(result.status).is_equal_to(UNKNOWN)
+    assert_that(result.statistics['rounds']).is_equal_to(0)
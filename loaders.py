@@ -0,0 +1,199 @@
+""" A module for loading the model input from local CSV or JSON lines files.
+
+Each file holds the rows of one sheet, with the same columns as the sheet:
+CSV files start with a header row, and each line of a JSON lines file is a
+JSON list. Rows are converted one at a time as they are read, so only the
+converted rows are ever held in memory, and rows which fail to convert or
+validate are rejected with a message instead of aborting the load.
+"""
+import csv
+import glob
+import itertools
+import json
+import os
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Set
+
+from convert import build_day_range
+from convert import convert_block
+from convert import convert_course
+from convert import convert_occupied_time
+from convert import convert_room
+from data import Block
+from data import Course
+from data import ModelBuilderInput
+from data import OccupiedTime
+from data import Room
+
+
+CSV_SUFFIX = '.csv'
+JSONL_SUFFIX = '.jsonl'
+
+
+class RowError(Exception):
+    """ A row which is well-formed but not a valid input. """
+
+
+def iter_rows(path: str) -> Iterator[List]:
+    """ Yield the rows of a CSV or JSON lines file, skipping blank lines and
+    the CSV header. """
+    if path.endswith(CSV_SUFFIX):
+        with open(path, newline='') as infile:
+            reader = csv.reader(infile)
+            next(reader, None)
+            for row in reader:
+                if row:
+                    yield row
+    elif path.endswith(JSONL_SUFFIX):
+        with open(path) as infile:
+            for line in infile:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        raise ValueError("Unknown input file type {}".format(path))
+
+
+def convert_rows(
+        paths: Iterable[str],
+        converter: Callable,
+        validator: Callable = None,
+        strict: bool = False) -> Iterator:
+    """ Yield the converted rows of each file in paths which pass the
+    validator. Invalid rows are skipped, or raise if strict is True. """
+    for path in paths:
+        # CSV rows are numbered from the header, like spreadsheet rows.
+        first_row = 2 if path.endswith(CSV_SUFFIX) else 1
+        for (row_number, row) in enumerate(iter_rows(path), first_row):
+            try:
+                converted = converter(row)
+                if validator is not None:
+                    validator(converted)
+            except (IndexError, TypeError, ValueError, RowError) as e:
+                message = "Rejecting row {} of {}: {}".format(
+                    row_number, path, e)
+                if strict:
+                    raise ValueError(message) from e
+                print(message)
+                continue
+            yield converted
+
+
+def validate_block(block: Block):
+    if block.end_time <= block.start_time:
+        raise RowError("block {} ends before it starts".format(block.block_id))
+    if block.start_grid_minutes is not None and block.start_grid_minutes <= 0:
+        raise RowError("block {} has no start grid".format(block.block_id))
+
+
+def unique_room_validator():
+    room_names = set()
+
+    def validate_room(room: Room):
+        if room.room_name in room_names:
+            raise RowError("duplicate room {}".format(room.room_name))
+        if room.seats <= 0:
+            raise RowError("room {} has no seats".format(room.room_name))
+        room_names.add(room.room_name)
+
+    return validate_room
+
+
+def occupied_time_validator(room_names: Set[str]):
+    def validate_occupied_time(occupied_time: OccupiedTime):
+        if occupied_time.room_name not in room_names:
+            raise RowError("unknown room {}".format(occupied_time.room_name))
+        if occupied_time.end_time <= occupied_time.start_time:
+            raise RowError("occupied time ends before it starts")
+        if not occupied_time.days:
+            raise RowError("empty day pattern")
+
+    return validate_occupied_time
+
+
+def course_validator(block_ids: Set[int]):
+    def validate_course(course: Course):
+        if course.desired_block not in block_ids:
+            raise RowError("unknown block {}".format(course.desired_block))
+        if course.enrollment < 0:
+            raise RowError("negative enrollment")
+        if course.lecture_minutes_per_day <= 0:
+            raise RowError("no lecture minutes")
+        if course.lab_minutes_per_week < 0:
+            raise RowError("negative lab minutes")
+        if (course.start_grid_minutes is not None
+                and course.start_grid_minutes <= 0):
+            raise RowError("no start grid")
+        if not course.day_pattern:
+            raise RowError("empty day pattern")
+
+    return validate_course
+
+
+def load_input(
+        courses_paths: List[str],
+        rooms_path: str,
+        blocks_path: str,
+        strict: bool = False,
+        occupied_times_path: str = None) -> ModelBuilderInput:
+    """ Load the model input from files of course, room and block rows, and
+    optionally of occupied time rows.
+
+    Several courses files, e.g. one per term, are concatenated.
+    """
+    blocks = list(convert_rows([blocks_path], convert_block, validate_block,
+                               strict=strict))
+    rooms = list(convert_rows([rooms_path], convert_room,
+                              unique_room_validator(), strict=strict))
+    courses = list(convert_rows(
+        courses_paths,
+        convert_course,
+        course_validator({block.block_id for block in blocks}),
+        strict=strict))
+    occupied_times = []
+    if occupied_times_path is not None:
+        occupied_times = list(convert_rows(
+            [occupied_times_path],
+            convert_occupied_time,
+            occupied_time_validator({room.room_name for room in rooms}),
+            strict=strict))
+    print("Loaded {} courses, {} rooms, {} blocks and {} occupied times"
+          .format(len(courses), len(rooms), len(blocks), len(occupied_times)))
+
+    return ModelBuilderInput(
+        courses=courses,
+        rooms=rooms,
+        blocks=blocks,
+        day_range=build_day_range(),
+        occupied_times=occupied_times,
+    )
+
+
+def find_input_file(input_dir: str, name: str) -> List[str]:
+    """ The files in input_dir named name or name followed by a suffix,
+    e.g. courses.csv, courses_fall.csv and courses_spring.jsonl. """
+    return sorted(itertools.chain.from_iterable(
+        glob.glob(os.path.join(input_dir, glob.escape(name) + pattern))
+        for pattern in (
+            CSV_SUFFIX, JSONL_SUFFIX, '_*' + CSV_SUFFIX, '_*' + JSONL_SUFFIX)
+    ))
+
+
+def load_input_dir(input_dir: str, strict: bool = False) -> ModelBuilderInput:
+    """ Load the model input from the courses, rooms and blocks files, and
+    the optional occupied_times file, in input_dir. There may be several
+    courses files but only one of each other. """
+    paths = {}
+    for name in ('courses', 'rooms', 'blocks', 'occupied_times'):
+        paths[name] = find_input_file(input_dir, name)
+        if not paths[name] and name != 'occupied_times':
+            raise ValueError("Could not find {} in {}".format(name, input_dir))
+        if name != 'courses' and len(paths[name]) > 1:
+            raise ValueError("Found several {} files in {}: {}".format(
+                name, input_dir, paths[name]))
+
+    return load_input(
+        paths['courses'], paths['rooms'][0], paths['blocks'][0], strict=strict,
+        occupied_times_path=next(iter(paths['occupied_times']), None))
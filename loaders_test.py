@@ -0,0 +1,49 @@
+from assertpy import assert_that
+import json
+import pytest
+
+from loaders import load_input
+from loaders import load_input_dir
+
+
+COURSE_HEADER = ('id,name,days,block,enrollment,lecture hours,lab hours,'
+                 'weeks,minutes per day,lecture minutes,lab minutes\n')
+
+
+def write_input(input_dir, courses_rows):
+    (input_dir / 'rooms.csv').write_text('name,seats\nA,30\nB,20\nA,10\n')
+    (input_dir / 'blocks.jsonl').write_text(
+        json.dumps([0, '8:00', '12:00']) + '\n\n'
+        + json.dumps([1, '13:00', '12:00']) + '\n')
+    (input_dir / 'courses_fall.csv').write_text(COURSE_HEADER + courses_rows)
+    (input_dir / 'courses_spring.jsonl').write_text(json.dumps(
+        ['2', 'MTH 2', 'TR', '0', '15', '3', '0', '15', '75', '150', '0']))
+
+
+def test_load_input_dir_skips_invalid_rows(tmp_path):
+    write_input(tmp_path, (
+        '1,MTH 1,MW,0,30,3,0,15,90,180,0\n'
+        '3,MTH 3,MX,0,30,3,0,15,90,180,0\n'
+        '4,MTH 4,MW,1,30,3,0,15,90,180,0\n'
+        '5,MTH 5,MW,0,thirty,3,0,15,90,180,0\n'
+        '6,MTH 6,MW,0\n'))
+
+    model_input = load_input_dir(str(tmp_path))
+
+    assert_that([course.course_id for course in model_input.courses]
+                ).is_equal_to(['1', '2'])
+    assert_that([room.room_name for room in model_input.rooms]
+                ).is_equal_to(['A', 'B'])
+    assert_that([block.block_id for block in model_input.blocks]
+                ).is_equal_to([0])
+
+
+def test_load_input_strict_raises_on_invalid_row(tmp_path):
+    write_input(tmp_path, '3,MTH 3,MX,0,30,3,0,15,90,180,0\n')
+
+    with pytest.raises(ValueError):
+        load_input(
+            [str(tmp_path / 'courses_fall.csv')],
+            str(tmp_path / 'rooms.csv'),
+            str(tmp_path / 'blocks.jsonl'),
+            strict=True)
@@ -0,0 +1,165 @@
+""" A module for converting the model to arrays and loading them into
+a solver in bulk.
+
+Every constraint class provides a to_coefficients() method returning a
+tuple (lower_bound, upper_bound, columns, coefficients), where columns are
+an array of the variable ids from VariableIndexes. Each variable id may
+appear at most once per constraint.
+"""
+from dataclasses import dataclass
+from typing import Iterable
+from typing import List
+from typing import Tuple
+
+import numpy as np
+from ortools.linear_solver import linear_solver_pb2
+
+from constraints import Constraints
+import metrics
+from variables import VariableIndexes
+
+
+@dataclass
+class ConstraintMatrix:
+    """ The model's constraints as a sparse matrix in COO format, with one
+    row per constraint and one column per variable id.
+
+    Attributes:
+     - rows, cols, coefficients: the nonzero entries of the matrix, sorted
+       by row.
+     - lower_bounds, upper_bounds: the bounds of each row.
+     - variable_lower_bounds, variable_upper_bounds: the bounds of each column.
+    """
+    rows: np.ndarray
+    cols: np.ndarray
+    coefficients: np.ndarray
+    lower_bounds: np.ndarray
+    upper_bounds: np.ndarray
+    variable_lower_bounds: np.ndarray
+    variable_upper_bounds: np.ndarray
+
+    @property
+    def num_rows(self):
+        return len(self.lower_bounds)
+
+    @property
+    def num_cols(self):
+        return len(self.variable_lower_bounds)
+
+    def __len__(self):
+        return len(self.coefficients)
+
+    def row_boundaries(self):
+        """ The offsets into cols/coefficients where each row starts, plus
+        a final entry for the end of the last row. """
+        return np.searchsorted(self.rows, np.arange(self.num_rows + 1))
+
+
+def build_rows(constraints: Iterable) -> Tuple:
+    """ Convert constraints to arrays
+
+        (row_lengths, cols, coefficients, lower_bounds, upper_bounds)
+
+    with one entry of row_lengths and the bounds per constraint.
+    """
+    row_lengths = []
+    cols = []
+    coefficients = []
+    lower_bounds = []
+    upper_bounds = []
+
+    for constraint in constraints:
+        (lower_bound, upper_bound, row_cols, row_coefficients) = (
+            constraint.to_coefficients())
+        row_lengths.append(len(row_cols))
+        cols.append(row_cols)
+        coefficients.append(row_coefficients)
+        lower_bounds.append(lower_bound)
+        upper_bounds.append(upper_bound)
+
+    return (
+        np.array(row_lengths, dtype=np.int32),
+        np.concatenate(cols).astype(np.int32) if cols
+        else np.zeros(0, dtype=np.int32),
+        np.concatenate(coefficients).astype(np.float64) if coefficients
+        else np.zeros(0, dtype=np.float64),
+        np.array(lower_bounds, dtype=np.float64),
+        np.array(upper_bounds, dtype=np.float64),
+    )
+
+
+def concatenate_rows(
+        variables: VariableIndexes,
+        row_blocks: List[Tuple]) -> ConstraintMatrix:
+    """ Build the constraint matrix from blocks of rows returned by
+    build_rows, in the given order. """
+    (row_lengths, cols, coefficients, lower_bounds, upper_bounds) = (
+        np.concatenate(arrays) for arrays in zip(*row_blocks))
+    metrics.count('rows', len(row_lengths))
+    metrics.count('nonzeros', len(coefficients))
+
+    return ConstraintMatrix(
+        rows=np.repeat(
+            np.arange(len(row_lengths), dtype=np.int32), row_lengths),
+        cols=cols,
+        coefficients=coefficients,
+        lower_bounds=lower_bounds,
+        upper_bounds=upper_bounds,
+        # Every variable is a binary ClassStartVariable.
+        variable_lower_bounds=np.zeros(len(variables), dtype=np.float64),
+        variable_upper_bounds=np.ones(len(variables), dtype=np.float64),
+    )
+
+
+def build_constraint_matrix(
+        variables: VariableIndexes,
+        constraints: Constraints) -> ConstraintMatrix:
+    """ Build the COO constraint matrix from the model's constraints. """
+    return concatenate_rows(variables, [
+        build_rows(constraints.all_constraints())
+    ])
+
+
+def to_model_proto(
+        matrix: ConstraintMatrix,
+        variables: VariableIndexes = None,
+        constraints: Constraints = None) -> linear_solver_pb2.MPModelProto:
+    """ Convert the matrix to an MPModelProto, which can be loaded into
+    a pywraplp.Solver with LoadModelFromProto.
+
+    Variable and constraint names are only generated if the variables and
+    constraints are passed, which is only useful for debugging.
+    """
+    proto = linear_solver_pb2.MPModelProto()
+    proto.maximize = True
+
+    for (lower_bound, upper_bound) in zip(
+            matrix.variable_lower_bounds.tolist(),
+            matrix.variable_upper_bounds.tolist()):
+        proto.variable.add(
+            lower_bound=lower_bound,
+            upper_bound=upper_bound,
+            is_integer=True,
+        )
+
+    boundaries = matrix.row_boundaries().tolist()
+    cols = matrix.cols.tolist()
+    coefficients = matrix.coefficients.tolist()
+    for (row, (lower_bound, upper_bound)) in enumerate(zip(
+            matrix.lower_bounds.tolist(), matrix.upper_bounds.tolist())):
+        start, end = boundaries[row], boundaries[row + 1]
+        constraint = proto.constraint.add(
+            lower_bound=lower_bound, upper_bound=upper_bound)
+        constraint.var_index.extend(cols[start:end])
+        constraint.coefficient.extend(coefficients[start:end])
+
+    if variables is not None:
+        for (variable_proto, variable) in zip(proto.variable, variables):
+            variable_proto.name = str(variable)
+
+    if constraints is not None:
+        for (constraint_proto, constraint) in zip(
+                proto.constraint, constraints.all_constraints()):
+            constraint_proto.name = str(constraint)
+
+    return proto
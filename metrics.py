@@ -0,0 +1,264 @@
+""" A module for recording where a run spends its time and memory.
+
+A Metrics holds a tree of named spans, each with its wall time, the
+process's peak RSS when it ended, optionally its peak traced memory and
+the source lines whose allocations grew the most during it, and any
+counters and values recorded while it was the innermost open span.
+The builders and backends record into the active Metrics through the
+module functions span, count, observe and record, so it does not have to
+be passed around. Until a Metrics is activated, the active one is a
+NullMetrics, which records nothing, so that processes which never export
+their metrics, such as library callers and pool workers, do not grow a
+span tree with every solve.
+"""
+from contextlib import contextmanager
+import cProfile
+from dataclasses import dataclass
+from dataclasses import field
+import json
+import resource
+import sys
+from timeit import default_timer as timer
+import tracemalloc
+from typing import Any
+from typing import Dict
+from typing import List
+
+
+@dataclass
+class Span:
+    """ A named stage of a run.
+
+    Attributes:
+     - seconds: the wall time of the span.
+     - peak_rss_bytes: the peak resident set size of the process when the
+       span ended.
+     - traced_peak_bytes: the peak memory allocated by Python during the
+       span, if memory was traced.
+     - top_allocations: the TOP_ALLOCATIONS source lines whose allocated
+       memory grew the most from the start to the end of the span, with
+       the growth in bytes and blocks, if memory was traced.
+     - counters: totals of count calls.
+     - distributions: summaries (count, total, min, max) of observe calls.
+     - values: the last value of record calls.
+    """
+    name: str
+    seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    traced_peak_bytes: int = None
+    top_allocations: List[Dict[str, Any]] = None
+    counters: Dict[str, int] = field(default_factory=dict)
+    distributions: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    values: Dict[str, Any] = field(default_factory=dict)
+    children: List['Span'] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        result = {'name': self.name, 'seconds': self.seconds,
+                  'peak_rss_bytes': self.peak_rss_bytes}
+        if self.traced_peak_bytes is not None:
+            result['traced_peak_bytes'] = self.traced_peak_bytes
+        if self.top_allocations is not None:
+            result['top_allocations'] = self.top_allocations
+        for key in ('counters', 'distributions', 'values'):
+            if getattr(self, key):
+                result[key] = getattr(self, key)
+        if self.children:
+            result['children'] = [child.to_dict() for child in self.children]
+        return result
+
+
+# The number of source lines listed in each span's top_allocations.
+TOP_ALLOCATIONS = 10
+
+# Allocations made by tracemalloc itself and by imports are not listed.
+ALLOCATION_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+]
+
+
+def top_allocations(
+        start: tracemalloc.Snapshot,
+        end: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+    """ The TOP_ALLOCATIONS source lines whose allocated memory grew the
+    most from the start snapshot to the end one. """
+    differences = end.filter_traces(ALLOCATION_FILTERS).compare_to(
+        start.filter_traces(ALLOCATION_FILTERS), 'lineno')
+    grown = [
+        difference for difference in differences if difference.size_diff > 0]
+    return [
+        {
+            'location': '{}:{}'.format(
+                difference.traceback[0].filename,
+                difference.traceback[0].lineno),
+            'size_diff_bytes': difference.size_diff,
+            'count_diff': difference.count_diff,
+        }
+        for difference in grown[:TOP_ALLOCATIONS]
+    ]
+
+
+def peak_rss_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Metrics:
+    """ A tree of spans, rooted at a span named 'run'.
+
+    If trace_memory is True, tracemalloc is started to record the peak
+    traced memory of each span, and a snapshot is taken at its start and
+    end to record its top allocations, which slows everything down. If a
+    profile_span is given, the first span with that name is profiled with
+    cProfile and its stats dumped to profile_path, for use with pstats or
+    snakeviz.
+    """
+    def __init__(
+            self,
+            trace_memory: bool = False,
+            profile_span: str = None,
+            profile_path: str = 'profile.pstats'):
+        self.root = Span(name='run')
+        self.open_spans = [self.root]
+        self.trace_memory = trace_memory
+        self.profile_span = profile_span
+        self.profile_path = profile_path
+        self.running_peaks = [0]
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.start = timer()
+
+    @property
+    def current(self) -> Span:
+        return self.open_spans[-1]
+
+    @contextmanager
+    def span(self, name: str):
+        span = Span(name=name)
+        self.current.children.append(span)
+        self.open_spans.append(span)
+
+        start_snapshot = None
+        if self.trace_memory:
+            start_snapshot = tracemalloc.take_snapshot()
+            # The peak is reset for the child, so fold the parent's peak so
+            # far into the parent first.
+            self.running_peaks[-1] = max(
+                self.running_peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self.running_peaks.append(0)
+
+        profiler = None
+        if name == self.profile_span:
+            self.profile_span = None
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        start = timer()
+        try:
+            yield span
+        finally:
+            span.seconds = timer() - start
+            span.peak_rss_bytes = peak_rss_bytes()
+
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(self.profile_path)
+
+            if self.trace_memory:
+                span.traced_peak_bytes = max(
+                    self.running_peaks.pop(),
+                    tracemalloc.get_traced_memory()[1])
+                self.running_peaks[-1] = max(
+                    self.running_peaks[-1], span.traced_peak_bytes)
+                span.top_allocations = top_allocations(
+                    start_snapshot, tracemalloc.take_snapshot())
+
+            self.open_spans.pop()
+
+    def count(self, name: str, value: int = 1):
+        counters = self.current.counters
+        counters[name] = counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        summary = self.current.distributions.setdefault(
+            name, {'count': 0, 'total': 0, 'min': value, 'max': value})
+        summary['count'] += 1
+        summary['total'] += value
+        summary['min'] = min(summary['min'], value)
+        summary['max'] = max(summary['max'], value)
+
+    def record(self, name: str, value: Any):
+        self.current.values[name] = value
+
+    def totals(self) -> Dict[str, int]:
+        """ The sum of each counter over every span. """
+        totals = {}
+        spans = [self.root]
+        while spans:
+            span = spans.pop()
+            for (name, value) in span.counters.items():
+                totals[name] = totals.get(name, 0) + value
+            spans.extend(span.children)
+        return totals
+
+    def to_dict(self) -> Dict:
+        self.root.seconds = timer() - self.start
+        self.root.peak_rss_bytes = peak_rss_bytes()
+        if self.trace_memory:
+            self.root.traced_peak_bytes = max(
+                self.running_peaks[0], tracemalloc.get_traced_memory()[1])
+        return {'totals': self.totals(), 'spans': self.root.to_dict()}
+
+    def export_json(self, path: str):
+        with open(path, 'w') as outfile:
+            json.dump(self.to_dict(), outfile, indent=2)
+
+
+class NullMetrics:
+    """ A Metrics which records nothing. """
+    @contextmanager
+    def span(self, name: str):
+        yield Span(name=name)
+
+    def count(self, name: str, value: int = 1):
+        pass
+
+    def observe(self, name: str, value: float):
+        pass
+
+    def record(self, name: str, value: Any):
+        pass
+
+
+_active = NullMetrics()
+
+
+def active_metrics() -> Metrics:
+    return _active
+
+
+def activate(metrics: Metrics) -> Metrics:
+    """ Make metrics the active Metrics, and return the previous one, which
+    may be a NullMetrics, to activate again once done. """
+    global _active
+    previous = _active
+    _active = metrics
+    return previous
+
+
+def span(name: str):
+    return _active.span(name)
+
+
+def count(name: str, value: int = 1):
+    _active.count(name, value)
+
+
+def observe(name: str, value: float):
+    _active.observe(name, value)
+
+
+def record(name: str, value: Any):
+    _active.record(name, value)
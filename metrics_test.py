@@ -0,0 +1,64 @@
+from assertpy import assert_that
+import json
+
+from constraints_test import small_input
+from metrics import Metrics
+from metrics import NullMetrics
+from metrics import activate
+from metrics import active_metrics
+from solve import solve_model
+
+
+def test_spans_nest_and_counters_total():
+    run_metrics = Metrics(trace_memory=True)
+    with run_metrics.span('outer'):
+        run_metrics.count('rows', 2)
+        with run_metrics.span('inner'):
+            run_metrics.count('rows', 3)
+            run_metrics.observe('per_course', 4)
+            run_metrics.observe('per_course', 6)
+            data = [0] * 100000
+
+    result = run_metrics.to_dict()
+    outer = result['spans']['children'][0]
+    inner = outer['children'][0]
+
+    assert_that(result['totals']).is_equal_to({'rows': 5})
+    assert_that(outer['counters']).is_equal_to({'rows': 2})
+    assert_that(inner['distributions']['per_course']).is_equal_to(
+        {'count': 2, 'total': 10, 'min': 4, 'max': 6})
+    assert_that(inner['traced_peak_bytes']).is_greater_than(len(data) * 8)
+    assert_that(outer['traced_peak_bytes']).is_greater_than_or_equal_to(
+        inner['traced_peak_bytes'])
+    top = inner['top_allocations'][0]
+    assert_that(top['location']).contains('metrics_test.py')
+    assert_that(top['size_diff_bytes']).is_greater_than_or_equal_to(
+        len(data) * 8)
+
+
+def test_solve_model_records_into_active_metrics(tmp_path):
+    run_metrics = Metrics(profile_span='Solving model',
+                          profile_path=str(tmp_path / 'solve.pstats'))
+    previous = activate(run_metrics)
+    try:
+        solve_model(small_input())
+    finally:
+        activate(previous)
+
+    run_metrics.export_json(str(tmp_path / 'metrics.json'))
+    with open(str(tmp_path / 'metrics.json')) as infile:
+        result = json.load(infile)
+
+    assert_that(result['totals']).contains_key(
+        'variables', 'uniqueness_constraints', 'nonzeros')
+    assert_that(result['spans']['values']).contains_key(
+        'solver.status', 'solver.nodes', 'solver.gap')
+    assert_that((tmp_path / 'solve.pstats').exists()).is_true()
+
+
+def test_nothing_is_recorded_until_metrics_are_activated():
+    assert_that(active_metrics()).is_instance_of(NullMetrics)
+
+    solve_model(small_input())
+
+    assert_that(active_metrics()).is_instance_of(NullMetrics)
@@ -2,50 +2,339 @@
 
 Uses the MIP solver detailed at
 https://developers.google.com/optimization/mip/integer_opt
+or the CP-SAT solver detailed at
+https://developers.google.com/optimization/cp/cp_solver
 """
-from ortools.linear_solver import pywraplp
+import argparse
+from dataclasses import replace
+import sys
+from typing import List
 
+from cache import DEFAULT_MAX_BYTES
+from cache import ModelCache
+
+from data import CONFLICT_FORMULATIONS
 from data import ModelBuilderInput
+from data import ModelOptions
+from data import SOLVER_BACKENDS
+from data import SolverOptions
+from backends import default_conflict_formulation
+from backends import make_backend
+from constraints import check_options
+from decompose import solve_decomposed
 from fetch import fetch_and_convert_data
-from variables import build_variables
-from constraints import build_constraints
+from incremental import solve_incremental
+from loaders import load_input_dir
+from metrics import Metrics
+from metrics import activate
+from output import ScheduleFile
+from output import schedule_rows
+from output import write_rows
+from scenarios import format_comparison
+from scenarios import load_scenarios
+from scenarios import solve_scenarios
+from solve import Schedule
+from solve import solve_model
 from timer import Timer
 
 
-def build_model(model_input: ModelBuilderInput):
-    """ Build the course scheduler model. """
-    with Timer("Building internal representation"):
-        variables = build_variables(model_input)
-        constraints = build_constraints(model_input, variables)
+def print_schedule(model_input: ModelBuilderInput, schedule: Schedule):
+    write_rows(sys.stdout, schedule_rows(model_input, schedule))
+
+
+def with_start_grid(
+        model_input: ModelBuilderInput, minutes: int) -> ModelBuilderInput:
+    """ Give every block without a start grid one of the given minutes.
+    Blocks with start times keep them, see Block. """
+    return replace(model_input, blocks=[
+        replace(block, start_grid_minutes=block.start_grid_minutes or minutes)
+        for block in model_input.blocks
+    ])
+
+
+def build_model(
+        model_input: ModelBuilderInput,
+        options: ModelOptions = ModelOptions(),
+        solver_options: SolverOptions = SolverOptions(),
+        build_workers: int = 1,
+        decompose: bool = False,
+        state_path: str = None,
+        pin_unaffected: bool = False,
+        cache: ModelCache = None,
+        output_path: str = None):
+    """ Build the course scheduler model, solve it and print the schedule.
+
+    If build_workers is more than 1, the constraint matrix is built in a
+    pool of that many processes.
+
+    If decompose is True, the model is split into independent components
+    which are solved in parallel instead.
+
+    If a state_path is given, the model is solved incrementally from the
+    schedule saved there, see incremental.py.
+
+    If a cache is given, a previously built model or schedule for the same
+    input and options is reused, see cache.py.
+
+    If an output_path is given, each improved schedule is written there as
+    soon as it is found, so that a run stopped by its time limit still
+    leaves the best schedule found. Decomposed models only write their
+    merged schedule.
+    """
+    on_schedule = None
+    if output_path:
+        on_schedule = ScheduleFile(output_path, model_input)
+    if state_path:
+        schedule = solve_incremental(
+            model_input, state_path, options, solver_options,
+            pin_unaffected=pin_unaffected, build_workers=build_workers,
+            on_schedule=on_schedule)
+    elif decompose:
+        schedule = solve_decomposed(model_input, options, solver_options)
+        if on_schedule and schedule.has_solution():
+            on_schedule(schedule)
+    else:
+        schedule = solve_model(
+            model_input, options, solver_options,
+            build_workers=build_workers, cache=cache, on_schedule=on_schedule)
+    print_schedule(model_input, schedule)
+    return schedule
 
-    with Timer("Converting to ortools model"):
-        solver = pywraplp.Solver(
-            'SolveIntegerProblem',
-            pywraplp.Solver.CBC_MIXED_INTEGER_PROGRAMMING
-        )
 
-        variable_to_solver_var = {
-            var: var.to_solver_var(solver) for var in variables
-        }
+def solver_options_of(args: argparse.Namespace) -> SolverOptions:
+    return SolverOptions(
+        backend=args.backend,
+        num_workers=args.num_workers,
+        debug_names=args.debug_names,
+        time_limit_seconds=args.time_limit,
+        relative_gap=args.relative_gap,
+        greedy_hint=args.greedy_hint,
+        greedy_only=args.fast,
+        local_search=args.local_search,
+        seed=args.seed,
+    )
 
-        for constraint in constraints.all_constraints():
-            constraint.to_solver_constraint(solver, variable_to_solver_var)
 
-        objective = solver.Objective()
-        objective.SetMaximization()
+def model_options_of(
+        args: argparse.Namespace,
+        solver_options: SolverOptions) -> ModelOptions:
+    """ The model options given by args, with the default conflict
+    formulation for them and the solver options if none is given. """
+    options = ModelOptions(
+        collapse_day_patterns=args.collapse_day_patterns,
+        room_classes=args.room_classes,
+        lazy_conflicts=args.lazy_conflicts,
+    )
+    return replace(
+        options,
+        conflict_formulation=(
+            args.conflict_formulation
+            or default_conflict_formulation(options, solver_options)))
 
-    with Timer("Soving model"):
-        result_status = solver.Solve()
 
-    print("Finished solve, status={}.".format(result_status))
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    """ Parse the command line, exiting with an error if the model and
+    solver options it gives do not go together. """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--backend',
+        choices=SOLVER_BACKENDS,
+        default=SolverOptions.backend,
+        help='The solver to send the model to.')
+    parser.add_argument(
+        '--num-workers',
+        type=int,
+        default=SolverOptions.num_workers,
+        help='The number of parallel search workers, 0 to use every core.')
+    parser.add_argument(
+        '--time-limit',
+        type=float,
+        metavar='SECONDS',
+        help='Stop solving after SECONDS and keep the best schedule found.')
+    parser.add_argument(
+        '--relative-gap',
+        type=float,
+        help=('Stop solving once the objective is within this fraction of '
+              'the best bound.'))
+    parser.add_argument(
+        '--greedy-hint',
+        action='store_true',
+        help=('Start the solver from a greedily constructed schedule. '
+              'Not supported by the cbc backend.'))
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        help=('Return a greedily constructed schedule without solving, '
+              'unless it leaves courses unplaced.'))
+    parser.add_argument(
+        '--local-search',
+        action='store_true',
+        help=('Search for a schedule by local search for --time-limit '
+              'seconds, instead of building and solving the model.'))
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=SolverOptions.seed,
+        help='The random seed of --local-search.')
+    parser.add_argument(
+        '--output',
+        metavar='SCHEDULE_FILE',
+        help=('Write each improved schedule to SCHEDULE_FILE, a .csv or '
+              '.jsonl file, as soon as it is found.'))
+    parser.add_argument(
+        '--build-workers',
+        type=int,
+        default=1,
+        help='The number of processes to build the model with.')
+    parser.add_argument(
+        '--room-classes',
+        action='store_true',
+        help=('Model classes of interchangeable rooms instead of individual '
+              'rooms, and assign concrete rooms after solving.'))
+    parser.add_argument(
+        '--decompose',
+        action='store_true',
+        help=('Solve independent groups of courses as separate models in '
+              'parallel.'))
+    parser.add_argument(
+        '--incremental',
+        metavar='STATE_FILE',
+        help=('Start from the schedule saved in STATE_FILE by a previous '
+              'run, and save the new schedule there.'))
+    parser.add_argument(
+        '--pin-unaffected',
+        action='store_true',
+        help=('With --incremental or --scenarios, keep the previous or base '
+              'start time and room of courses unaffected by changes to the '
+              'input.'))
+    parser.add_argument(
+        '--scenarios',
+        metavar='SCENARIOS_FILE',
+        help=('Solve the input and each what-if scenario in the JSON file '
+              'SCENARIOS_FILE in parallel, and print a comparison table.'))
+    parser.add_argument(
+        '--start-grid',
+        type=int,
+        metavar='MINUTES',
+        help=('Only start classes at multiples of MINUTES past midnight in '
+              'blocks without a start grid of their own.'))
+    parser.add_argument(
+        '--input-dir',
+        metavar='DIR',
+        help=('Load the courses, rooms and blocks from CSV or JSON lines '
+              'files in DIR instead of Google Sheets.'))
+    parser.add_argument(
+        '--snapshot',
+        metavar='SNAPSHOT_FILE',
+        help=('Save the fetched sheets to SNAPSHOT_FILE, and load them from '
+              'there if the spreadsheet has not changed since.'))
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='With --snapshot, only load the sheets from SNAPSHOT_FILE.')
+    parser.add_argument(
+        '--cache-dir',
+        metavar='DIR',
+        help=('Reuse models and schedules built by previous runs with the '
+              'same input and options, cached in DIR.'))
+    parser.add_argument(
+        '--cache-max-mb',
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help=('The size of the cache beyond which the least recently used '
+              'entries are evicted.'))
+    parser.add_argument(
+        '--conflict-formulation',
+        choices=CONFLICT_FORMULATIONS,
+        help=('How to prevent two classes from sharing a room at once. '
+              'Defaults to the best formulation for the backend that '
+              'supports the other options.'))
+    parser.add_argument(
+        '--lazy-conflicts',
+        action='store_true',
+        help=('With the big-m conflict formulation, only add the conflict '
+              'constraints of rooms where a solution has overlapping classes, '
+              'and re-solve until none do.'))
+    parser.add_argument(
+        '--collapse-day-patterns',
+        action='store_true',
+        help=('Use one variable per (course, time, room) covering every day '
+              'of the course, instead of one variable per day.'))
+    parser.add_argument(
+        '--metrics',
+        metavar='METRICS_FILE',
+        help=('Write the time, memory and counters of each stage and the '
+              'solver statistics to METRICS_FILE as JSON.'))
+    parser.add_argument(
+        '--trace-memory',
+        action='store_true',
+        help=('With --metrics, also record the peak memory allocated in each '
+              'stage, and the source lines whose allocations grew the most '
+              'in it, which slows every stage down.'))
+    parser.add_argument(
+        '--profile-stage',
+        metavar='STAGE',
+        help=('Profile the stage named STAGE in the metrics, such as '
+              '"Solving model", with cProfile.'))
+    parser.add_argument(
+        '--profile-output',
+        default='profile.pstats',
+        help='The file to write the --profile-stage stats to.')
+    parser.add_argument(
+        '--debug-names',
+        action='store_true',
+        help='Give the solver human-readable variable and constraint names.')
+    args = parser.parse_args(argv)
 
-    sorted_variables = sorted(
-        variable_to_solver_var.values(), key=lambda v: v.name())
-    for variable in sorted_variables:
-        if variable.solution_value() > 0:
-            print('%s = %d' % (variable.name(), variable.solution_value()))
+    solver_options = solver_options_of(args)
+    options = model_options_of(args, solver_options)
+    try:
+        check_options(options)
+        make_backend(solver_options).check_options(options)
+    except ValueError as error:
+        parser.error(str(error))
+    return args
 
 
 if __name__ == "__main__":
-    model_input = fetch_and_convert_data()
-    model = build_model(model_input)
+    args = parse_args()
+    run_metrics = Metrics(
+        trace_memory=args.trace_memory,
+        profile_span=args.profile_stage,
+        profile_path=args.profile_output)
+    activate(run_metrics)
+    solver_options = solver_options_of(args)
+    options = model_options_of(args, solver_options)
+    cache = None
+    if args.cache_dir:
+        cache = ModelCache(
+            args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+    with Timer("Loading input"):
+        if args.input_dir:
+            model_input = load_input_dir(args.input_dir)
+        else:
+            model_input = fetch_and_convert_data(
+                snapshot_path=args.snapshot, offline=args.offline)
+    if args.start_grid:
+        model_input = with_start_grid(model_input, args.start_grid)
+    if args.scenarios:
+        results = solve_scenarios(
+            model_input,
+            load_scenarios(args.scenarios),
+            options,
+            solver_options,
+            pin_unaffected=args.pin_unaffected)
+        print(format_comparison(results))
+    else:
+        build_model(
+            model_input,
+            options,
+            solver_options,
+            build_workers=args.build_workers,
+            decompose=args.decompose,
+            state_path=args.incremental,
+            pin_unaffected=args.pin_unaffected,
+            cache=cache,
+            output_path=args.output)
+    if args.metrics:
+        run_metrics.export_json(args.metrics)
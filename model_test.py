@@ -0,0 +1,50 @@
+from assertpy import assert_that
+import pytest
+
+from data import BIG_M_CONFLICTS
+from data import NO_OVERLAP_CONFLICTS
+from data import OCCUPANCY_CONFLICTS
+from model import model_options_of
+from model import parse_args
+from model import solver_options_of
+
+
+def conflict_formulation_of(argv):
+    args = parse_args(argv)
+    return model_options_of(args, solver_options_of(args)).conflict_formulation
+
+
+def test_conflict_formulation_defaults_to_the_backends():
+    assert_that(conflict_formulation_of([])).is_equal_to(BIG_M_CONFLICTS)
+    assert_that(conflict_formulation_of(['--backend', 'cp-sat'])).is_equal_to(
+        NO_OVERLAP_CONFLICTS)
+    assert_that(conflict_formulation_of([
+        '--backend', 'cp-sat', '--conflict-formulation', 'big-m',
+    ])).is_equal_to(BIG_M_CONFLICTS)
+
+
+def test_room_classes_default_to_a_formulation_that_supports_them():
+    assert_that(conflict_formulation_of(['--room-classes'])).is_equal_to(
+        OCCUPANCY_CONFLICTS)
+    assert_that(conflict_formulation_of([
+        '--room-classes', '--backend', 'cp-sat',
+    ])).is_equal_to(NO_OVERLAP_CONFLICTS)
+    with pytest.raises(SystemExit):
+        parse_args(['--room-classes', '--conflict-formulation', 'big-m'])
+
+
+def test_lazy_conflicts_default_to_big_m():
+    assert_that(conflict_formulation_of([
+        '--lazy-conflicts', '--backend', 'cp-sat',
+    ])).is_equal_to(BIG_M_CONFLICTS)
+    with pytest.raises(SystemExit):
+        parse_args(['--lazy-conflicts', '--conflict-formulation', 'occupancy'])
+    with pytest.raises(SystemExit):
+        parse_args(['--lazy-conflicts', '--room-classes'])
+
+
+def test_unsupported_options_are_rejected_before_loading_input():
+    with pytest.raises(SystemExit):
+        parse_args(['--conflict-formulation', 'no-overlap'])
+    with pytest.raises(SystemExit):
+        parse_args(['--greedy-hint'])
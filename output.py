@@ -0,0 +1,134 @@
+""" A module for writing schedules out as soon as they are found.
+
+Schedules are written as one row per section, the meetings of a course at
+the same start time in the same room, with the columns SCHEDULE_COLUMNS,
+to a CSV file with a header row or a JSON lines file with one object per
+row. The rows are written as they are produced, in the order of the
+schedule's class starts, so nothing is sorted or formatted as a whole.
+"""
+import csv
+from itertools import groupby
+import json
+import os
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import TextIO
+
+from data import Course
+from data import DayPattern
+from data import ModelBuilderInput
+from data import Room
+from data import TimeRange
+from loaders import CSV_SUFFIX
+from loaders import JSONL_SUFFIX
+from solve import Schedule
+
+
+SCHEDULE_COLUMNS = [
+    'course', 'section', 'days', 'start', 'end', 'room',
+    'lab_room', 'lab_start', 'lab_end']
+
+
+def schedule_rows(
+        model_input: ModelBuilderInput,
+        schedule: Schedule) -> Iterator[Dict[str, str]]:
+    """ Yield a row for each section of the schedule, in the order of its
+    first class start. Times are formatted as HH:MM, as in the input.
+
+    The start and end are those of the section in its room, including its
+    lab unless the lab is held in a lab room. Then the lab's room, start
+    and end are given separately, and are otherwise empty.
+
+    The class starts of each course are merged into sections one course at
+    a time, so they must be adjacent, as they are in every schedule found
+    by solve_model, since variables are built course by course. Only the
+    class starts of one course are held at once. """
+    day_range = model_input.day_range
+    for (course, class_starts) in groupby(
+            schedule.class_starts, key=lambda c: c.course):
+        sections = {}
+        for class_start in class_starts:
+            key = (class_start.slot, class_start.room)
+            sections[key] = sections.get(key, '') + class_start.days
+        for ((slot, room), days) in sections.items():
+            yield section_row(day_range, course, slot, room, days)
+
+
+def section_row(
+        day_range: TimeRange,
+        course: Course,
+        slot: int,
+        room: Room,
+        days: str) -> Dict[str, str]:
+    start_time = day_range.time(slot)
+    end_time = start_time.add_minutes(course.room_minutes_per_day)
+    row = {
+        'course': course.course_id,
+        'section': course.course_name,
+        'days': DayPattern.parse(days),
+        'start': start_time.strftime('%H:%M'),
+        'end': end_time.strftime('%H:%M'),
+        'room': room.room_name,
+        'lab_room': '',
+        'lab_start': '',
+        'lab_end': '',
+    }
+    if course.has_lab_room:
+        lab_start_time = start_time.add_minutes(
+            course.lecture_minutes_per_day)
+        lab_end_time = lab_start_time.add_minutes(
+            course.lab_minutes_per_day)
+        row['lab_room'] = course.lab_room
+        row['lab_start'] = lab_start_time.strftime('%H:%M')
+        row['lab_end'] = lab_end_time.strftime('%H:%M')
+    return row
+
+
+def write_rows(
+        outfile: TextIO,
+        rows: Iterable[Dict[str, str]],
+        jsonl: bool = False) -> int:
+    """ Write the rows to outfile as CSV with a header row, or as JSON lines
+    if jsonl is True, and return the number of rows written. """
+    num_rows = 0
+    if jsonl:
+        for row in rows:
+            outfile.write(json.dumps(row) + '\n')
+            num_rows += 1
+    else:
+        writer = csv.DictWriter(outfile, SCHEDULE_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            num_rows += 1
+    return num_rows
+
+
+class ScheduleFile:
+    """ A sink for solve_model's on_schedule that writes each schedule to
+    path, replacing the previous one. The format is JSON lines if path ends
+    in JSONL_SUFFIX, and CSV if it ends in CSV_SUFFIX.
+
+    Each schedule is written to a temporary file which is then moved over
+    path, so that path always holds a complete schedule, even if the run
+    is stopped.
+    """
+    def __init__(self, path: str, model_input: ModelBuilderInput):
+        if not path.endswith((CSV_SUFFIX, JSONL_SUFFIX)):
+            raise ValueError("Unknown schedule file type {}".format(path))
+        self.path = path
+        self.model_input = model_input
+        self.num_written = 0
+
+    def __call__(self, schedule: Schedule):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', newline='') as outfile:
+            num_rows = write_rows(
+                outfile,
+                schedule_rows(self.model_input, schedule),
+                jsonl=self.path.endswith(JSONL_SUFFIX))
+        os.replace(temp_path, self.path)
+        self.num_written += 1
+        print("Wrote {} schedule {} with {} sections to {}".format(
+            schedule.status, self.num_written, num_rows, self.path))
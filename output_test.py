@@ -0,0 +1,111 @@
+from assertpy import assert_that
+from dataclasses import replace
+import json
+
+from backends import OPTIMAL
+from constraints_test import small_input
+from convert import str_to_time
+from data import ModelOptions
+from data import NO_OVERLAP_CONFLICTS
+from data import SolverOptions
+from loaders import iter_rows
+from output import SCHEDULE_COLUMNS
+from output import ScheduleFile
+from output import schedule_rows
+from solve import Schedule
+from solve import solve_model
+from variables import ClassStartVariable
+
+
+def test_schedule_rows_merge_days():
+    model_input = small_input()
+    schedule = solve_model(model_input)
+
+    rows = list(schedule_rows(model_input, schedule))
+
+    assert_that(rows).is_length(2)
+    mth1 = next(row for row in rows if row['course'] == 'MTH 1')
+    assert_that(mth1['days']).is_equal_to('MW')
+    assert_that(mth1['section']).is_equal_to('0')
+    start = str_to_time(mth1['start'])
+    assert_that(str_to_time(mth1['end'])).is_equal_to(start.add_minutes(50))
+
+
+def test_schedule_rows_stream_one_course_at_a_time():
+    model_input = small_input()
+    (mth1, mth2) = model_input.courses
+    (room_a, room_b) = model_input.rooms
+
+    def class_starts():
+        yield ClassStartVariable(course=mth1, days='M', slot=1, room=room_a)
+        yield ClassStartVariable(course=mth1, days='W', slot=1, room=room_a)
+        yield ClassStartVariable(course=mth2, days='W', slot=3, room=room_b)
+        raise AssertionError("Read past the second course")
+
+    rows = schedule_rows(
+        model_input, Schedule(status=OPTIMAL, class_starts=class_starts()))
+
+    row = next(rows)
+    assert_that((row['course'], row['days'], row['room'])).is_equal_to(
+        ('MTH 1', 'MW', 'A'))
+
+def test_schedule_rows_give_labs_in_lab_rooms_separately():
+    model_input = small_input()
+    (mth1, mth2) = model_input.courses
+    mth1 = replace(mth1, lab_minutes_per_week=60)
+    mth2 = replace(mth2, lab_minutes_per_week=30, lab_room='LAB')
+    (room_a, room_b) = model_input.rooms
+    schedule = Schedule(status=OPTIMAL, class_starts=[
+        ClassStartVariable(course=mth1, days='MW', slot=0, room=room_a),
+        ClassStartVariable(course=mth2, days='W', slot=12, room=room_b),
+    ])
+
+    rows = list(schedule_rows(model_input, schedule))
+
+    assert_that([(row['start'], row['end'], row['room']) for row in rows]
+                ).is_equal_to([('08:00', '09:20', 'A'), ('09:00', '09:30', 'B')])
+    assert_that([(row['lab_room'], row['lab_start'], row['lab_end'])
+                 for row in rows]).is_equal_to(
+        [('', '', ''), ('LAB', '09:30', '10:00')])
+
+
+def test_schedule_file_keeps_the_latest_schedule(tmp_path):
+    model_input = small_input()
+    path = str(tmp_path / 'schedule.csv')
+    sink = ScheduleFile(path, model_input)
+
+    solve_model(model_input, on_schedule=sink)
+
+    assert_that(sink.num_written).is_equal_to(1)
+    rows = list(iter_rows(path))
+    assert_that(rows).is_length(2)
+    assert_that(rows[0]).is_length(len(SCHEDULE_COLUMNS))
+    assert_that(str(tmp_path / 'schedule.csv.tmp')).does_not_exist()
+
+
+def test_schedule_file_writes_json_lines(tmp_path):
+    model_input = small_input()
+    path = str(tmp_path / 'schedule.jsonl')
+
+    solve_model(model_input, on_schedule=ScheduleFile(path, model_input))
+
+    with open(path) as infile:
+        rows = [json.loads(line) for line in infile]
+    assert_that(rows).is_length(2)
+    assert_that(rows[0]).contains_key(*SCHEDULE_COLUMNS)
+
+
+def test_solve_model_streams_incumbents():
+    model_input = small_input()
+    schedules = []
+
+    schedule = solve_model(
+        model_input,
+        ModelOptions(conflict_formulation=NO_OVERLAP_CONFLICTS),
+        SolverOptions(backend='cp-sat', num_workers=1, time_limit_seconds=10),
+        on_schedule=schedules.append)
+
+    assert_that(schedule.has_solution()).is_true()
+    assert_that(schedules).is_not_empty()
+    assert_that(schedules[-1].class_starts).is_equal_to(
+        schedule.class_starts)
@@ -0,0 +1,100 @@
+""" A module for building the model's constraint matrix in parallel.
+
+Conflict, occupancy and meeting consistency constraints never span rooms,
+and each one can be assigned to the first day of its branching variable
+(or to the day of its slot, for occupancy constraints). So the matrix is
+built in partitions of (day, room group) in a process pool, each worker
+returning its rows as integer-indexed arrays, which are then concatenated
+in a fixed partition order so the result does not depend on scheduling.
+"""
+from itertools import chain
+import os
+
+import numpy as np
+
+from constraints import build_conflict_constraints
+from constraints import build_lab_room_constraints
+from constraints import build_meeting_consistency_constraints
+from constraints import build_occupancy_constraints
+from constraints import build_uniqueness_constraints
+from constraints import check_options
+from data import BIG_M_CONFLICTS
+from data import DayPattern
+from data import ModelBuilderInput
+from data import ModelOptions
+from data import OCCUPANCY_CONFLICTS
+from matrix import ConstraintMatrix
+from matrix import build_rows
+from matrix import concatenate_rows
+from pool import quiet
+from pool import worker_pool
+from pool import worker_state
+from variables import VariableIndexes
+
+
+@quiet
+def _build_partition_rows(day, rooms):
+    model_input = worker_state['model_input']
+    variables = worker_state['variables']
+    options = worker_state['options']
+
+    room_indexes = [
+        variables.room_index[room] for room in rooms
+        if room in variables.room_index
+    ]
+    branching_ids = np.flatnonzero(
+        (variables.first_day_of == DayPattern.valid_chars.index(day))
+        & np.isin(variables.room_of, room_indexes))
+
+    constraints = build_meeting_consistency_constraints(
+        model_input, variables, branching_ids)
+
+    if options.conflict_formulation == BIG_M_CONFLICTS:
+        constraints.extend(build_conflict_constraints(
+            model_input, variables, branching_ids))
+    elif options.conflict_formulation == OCCUPANCY_CONFLICTS:
+        constraints.extend(build_occupancy_constraints(
+            model_input, variables, [(day, room) for room in rooms]))
+
+    return build_rows(constraints)
+
+
+def build_constraint_matrix_in_parallel(
+        model_input: ModelBuilderInput,
+        variables: VariableIndexes,
+        options: ModelOptions = ModelOptions(),
+        max_workers: int = None) -> ConstraintMatrix:
+    """ Build the same constraints as build_constraints, directly into a
+    constraint matrix, using a pool of max_workers processes. The rows
+    are in a different order than build_constraint_matrix's.
+    """
+    check_options(options)
+    max_workers = max_workers or os.cpu_count()
+    days = DayPattern.valid_chars
+
+    # Aim for a couple of partitions per worker, so that a few expensive
+    # partitions do not leave the other workers idle.
+    num_room_groups = min(
+        len(model_input.rooms),
+        max(1, -(-2 * max_workers // len(days))))
+    room_groups = [
+        model_input.rooms[i::num_room_groups] for i in range(num_room_groups)
+    ]
+    partitions = [(day, rooms) for day in days for rooms in room_groups]
+
+    # Lab rooms are shared across room groups, so their constraints are
+    # built here with the uniqueness constraints.
+    uniqueness_rows = build_rows(chain(
+        build_uniqueness_constraints(model_input, variables),
+        build_lab_room_constraints(model_input, variables)))
+
+    with worker_pool(
+            max_workers, model_input=model_input, variables=variables,
+            options=options) as executor:
+        partition_rows = list(executor.map(
+            _build_partition_rows, *zip(*partitions)))
+
+    matrix = concatenate_rows(variables, [uniqueness_rows] + partition_rows)
+    print("Built {} constraints in {} partitions".format(
+        matrix.num_rows, len(partitions)))
+    return matrix
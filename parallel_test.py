@@ -0,0 +1,53 @@
+from assertpy import assert_that
+import pytest
+
+from constraints import build_constraints
+from constraints_test import small_input
+from data import CONFLICT_FORMULATIONS
+from data import ModelOptions
+from matrix import build_constraint_matrix
+from parallel import build_constraint_matrix_in_parallel
+from variables import build_variables
+
+
+def sorted_rows(matrix):
+    boundaries = matrix.row_boundaries()
+    rows = []
+    for row in range(matrix.num_rows):
+        start, end = boundaries[row], boundaries[row + 1]
+        rows.append((
+            matrix.lower_bounds[row],
+            matrix.upper_bounds[row],
+            sorted(zip(
+                matrix.cols[start:end].tolist(),
+                matrix.coefficients[start:end].tolist())),
+        ))
+    return sorted(rows)
+
+
+@pytest.mark.parametrize('conflict_formulation', CONFLICT_FORMULATIONS)
+@pytest.mark.parametrize('collapse_day_patterns', [False, True])
+def test_parallel_matrix_has_same_rows(
+        conflict_formulation, collapse_day_patterns):
+    model_input = small_input()
+    options = ModelOptions(
+        conflict_formulation=conflict_formulation,
+        collapse_day_patterns=collapse_day_patterns)
+    variables = build_variables(model_input, options)
+
+    serial = build_constraint_matrix(
+        variables, build_constraints(model_input, variables, options))
+    parallel = build_constraint_matrix_in_parallel(
+        model_input, variables, options, max_workers=2)
+
+    assert_that(sorted_rows(parallel)).is_equal_to(sorted_rows(serial))
+
+
+def test_parallel_matrix_rejects_room_classes_with_big_m():
+    model_input = small_input()
+    options = ModelOptions(room_classes=True)
+    variables = build_variables(model_input, options)
+
+    with pytest.raises(ValueError):
+        build_constraint_matrix_in_parallel(
+            model_input, variables, options, max_workers=2)
@@ -0,0 +1,42 @@
+""" A module for running tasks in a pool of worker processes.
+
+State shared by every task, such as the model input, is sent to each worker
+once when it starts, rather than once per task, and read from worker_state.
+The progress messages of quiet tasks are discarded, since they would
+interleave across workers.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import wraps
+import io
+import os
+from typing import Callable
+from typing import Dict
+
+
+# Set in each worker process by _init_worker.
+worker_state = {}
+
+
+def _init_worker(state: Dict):
+    worker_state.update(state)
+
+
+def worker_pool(max_workers: int = None, **state) -> ProcessPoolExecutor:
+    """ A pool of max_workers processes, one per core by default, in each
+    of which worker_state holds the given keyword arguments. """
+    return ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(),
+        initializer=_init_worker,
+        initargs=(state,))
+
+
+def quiet(task: Callable) -> Callable:
+    """ Wrap a task run in a worker so that its progress messages are
+    discarded. The wrapped task keeps its name, so it can still be sent to
+    the workers. """
+    @wraps(task)
+    def quiet_task(*args, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return task(*args, **kwargs)
+    return quiet_task
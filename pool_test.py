@@ -0,0 +1,20 @@
+from assertpy import assert_that
+
+from pool import quiet
+from pool import worker_pool
+from pool import worker_state
+
+
+@quiet
+def scale(x):
+    print("Scaling {}".format(x))
+    return worker_state['factor'] * x
+
+
+def test_worker_pool_shares_state_with_quiet_tasks(capfd):
+    with worker_pool(2, factor=3) as executor:
+        assert_that(list(executor.map(scale, [1, 2, 3]))).is_equal_to(
+            [3, 6, 9])
+
+    assert_that(capfd.readouterr().out).is_empty()
+    assert_that(scale.__name__).is_equal_to('scale')
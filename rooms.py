@@ -0,0 +1,161 @@
+""" A module for grouping interchangeable rooms into classes, and for
+assigning concrete rooms to a schedule solved over room classes.
+
+Two rooms are interchangeable if they can fit exactly the same courses and
+are occupied at exactly the same times. A room which is also a lab room is
+never interchangeable, since labs are held in it by name.
+Modelling each class of interchangeable rooms as a single room with a
+capacity removes the symmetric variables that differ only in which room
+of the class they use.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from dataclasses import replace
+from typing import List
+from typing import Set
+from typing import Tuple
+
+from data import Course
+from data import DayPattern
+from data import ModelBuilderInput
+from data import Room
+from variables import ClassStartVariable
+
+
+@dataclass(eq=True, frozen=True)
+class RoomClass(Room):
+    """ A class of interchangeable rooms, which fit the same courses.
+
+    The seats are those of the smallest room in the class.
+    """
+    rooms: Tuple[Room, ...] = ()
+
+    @property
+    def capacity(self) -> int:
+        return len(self.rooms)
+
+    def contains(self, room) -> bool:
+        return self == room or room in self.rooms
+
+
+def group_rooms(model_input: ModelBuilderInput) -> ModelBuilderInput:
+    """ Replace the rooms of the model input with classes of
+    interchangeable rooms.
+
+    A room fits exactly the courses with enrollment less than its seats, so
+    rooms fit the same courses if and only if the same number of distinct
+    enrollments are less than their seats. The occupied times of the rooms
+    of a class become those of the class. Each lab room keeps its own class
+    and name.
+    """
+    enrollments = sorted(set(
+        course.enrollment for course in model_input.courses))
+    lab_rooms = {
+        course.lab_room for course in model_input.courses
+        if course.has_lab_room}
+    occupied_times = defaultdict(list)
+    for occupied_time in model_input.occupied_times:
+        occupied_times[occupied_time.room_name].append(occupied_time)
+
+    rooms_by_key = defaultdict(list)
+    for room in model_input.rooms:
+        occupied_key = frozenset(
+            (o.days, o.start_time, o.end_time)
+            for o in occupied_times[room.room_name])
+        if room.room_name in lab_rooms:
+            occupied_key = room.room_name
+        rooms_by_key[(bisect_left(enrollments, room.seats), occupied_key)
+                     ].append(room)
+
+    room_classes = []
+    class_occupied_times = []
+    for rooms in rooms_by_key.values():
+        room_class = RoomClass(
+            room_name='/'.join(room.room_name for room in rooms),
+            seats=min(room.seats for room in rooms),
+            rooms=tuple(rooms),
+        )
+        room_classes.append(room_class)
+        class_occupied_times.extend(dict.fromkeys(
+            replace(occupied_time, room_name=room_class.room_name)
+            for occupied_time in occupied_times[rooms[0].room_name]))
+    # Lab rooms which are not rooms keep their occupied times.
+    room_names = {room.room_name for room in model_input.rooms}
+    class_occupied_times.extend(
+        occupied_time for occupied_time in model_input.occupied_times
+        if occupied_time.room_name not in room_names)
+    print("Grouped {} rooms into {} room classes".format(
+        len(model_input.rooms), len(room_classes)))
+
+    return replace(
+        model_input,
+        rooms=room_classes,
+        occupied_times=class_occupied_times)
+
+
+def assign_rooms(
+        model_input: ModelBuilderInput,
+        class_starts: List[ClassStartVariable]) -> List[ClassStartVariable]:
+    """ Replace each room class in the solved class starts with a concrete
+    room.
+
+    The sections (meetings of a course at the same time in the same room
+    class) are considered in order of their start slot, and each is given
+    the first room of its class that is free on all of its days. Since at
+    most capacity classes of a room class are in session at once, there is
+    always a free room on each day, but if no single room is free on all of
+    them the section is given a different room on different days, see
+    split_courses.
+    """
+    day_range = model_input.day_range
+    sections = defaultdict(str)
+    for class_start in class_starts:
+        sections[(class_start.course, class_start.slot, class_start.room)] += (
+            class_start.days)
+
+    # The last slot occupied by a class in each (day, room).
+    last_occupied = defaultdict(lambda: -1)
+    room_class_starts = []
+
+    for (course, slot, room_class) in sorted(sections, key=lambda s: s[1]):
+        days = DayPattern.parse(sections[(course, slot, room_class)])
+        end_slot = slot + day_range.duration_slots(course.room_minutes_per_day)
+
+        free_rooms = [
+            [room for room in room_class.rooms
+             if last_occupied[(day, room)] < slot]
+            for day in days
+        ]
+        common_rooms = [
+            room for room in free_rooms[0]
+            if all(room in day_rooms for day_rooms in free_rooms[1:])
+        ]
+
+        if common_rooms:
+            day_rooms = [(days, common_rooms[0])]
+        else:
+            day_rooms = [
+                (day, day_free_rooms[0])
+                for (day, day_free_rooms) in zip(days, free_rooms)
+            ]
+
+        for (room_days, room) in day_rooms:
+            for day in room_days:
+                last_occupied[(day, room)] = end_slot
+            room_class_starts.append(ClassStartVariable(
+                course=course, days=room_days, slot=slot, room=room))
+
+    return room_class_starts
+
+
+def split_courses(class_starts: List[ClassStartVariable]) -> Set[Course]:
+    """ The courses which start at the same time in different rooms on
+    different days. """
+    rooms = defaultdict(set)
+    for class_start in class_starts:
+        rooms[(class_start.course, class_start.slot)].add(class_start.room)
+    return {
+        course for ((course, _), course_rooms) in rooms.items()
+        if len(course_rooms) > 1
+    }
@@ -0,0 +1,98 @@
+from assertpy import assert_that
+from dataclasses import replace
+
+from backends import OPTIMAL
+from constraints_test import small_input
+from data import CP_SAT_BACKEND
+from data import DayPattern
+from data import ModelOptions
+from data import NO_OVERLAP_CONFLICTS
+from data import Room
+from data import SolverOptions
+from generate import InstanceOptions
+from generate import generate_input
+from rooms import assign_rooms
+from rooms import group_rooms
+from rooms import split_courses
+from solve import solve_model
+from variables import ClassStartVariable
+
+
+def test_group_rooms_by_courses_they_fit():
+    model_input = replace(small_input(), rooms=[
+        Room(room_name='A', seats=30),
+        Room(room_name='B', seats=25),
+        Room(room_name='C', seats=10),
+        Room(room_name='D', seats=21),
+    ])
+    room_classes = group_rooms(model_input).rooms
+
+    assert_that(sorted(r.room_name for r in room_classes)).is_equal_to(
+        ['A/B/D', 'C'])
+    for room_class in room_classes:
+        for course in model_input.courses:
+            for room in room_class.rooms:
+                assert_that(room.can_fit(course)).is_equal_to(
+                    room_class.can_fit(course))
+
+
+def test_assign_rooms_keeps_sections_in_one_room():
+    model_input = replace(small_input(), rooms=[
+        Room(room_name='A', seats=30),
+        Room(room_name='B', seats=30),
+    ])
+    (room_class,) = group_rooms(model_input).rooms
+    (mth1, mth2) = model_input.courses
+
+    class_starts = [
+        ClassStartVariable(course=mth1, days='M', slot=0, room=room_class),
+        ClassStartVariable(course=mth1, days='W', slot=0, room=room_class),
+        ClassStartVariable(course=mth2, days='W', slot=5, room=room_class),
+    ]
+    assigned = assign_rooms(model_input, class_starts)
+
+    assert_that(assigned).is_length(2)
+    rooms_by_course = {c.course: (c.days, c.room.room_name) for c in assigned}
+    assert_that(rooms_by_course[mth1]).is_equal_to(('MW', 'A'))
+    assert_that(rooms_by_course[mth2]).is_equal_to(('W', 'B'))
+
+
+def test_assign_rooms_splits_sections_without_a_common_room():
+    model_input = replace(small_input(), rooms=[
+        Room(room_name='A', seats=30),
+        Room(room_name='B', seats=30),
+    ])
+    (room_class,) = group_rooms(model_input).rooms
+    (mth1, mth2) = model_input.courses
+    long_m = replace(mth1, course_id='MTH 3', day_pattern=DayPattern.parse('M'))
+    long_w = replace(mth1, course_id='MTH 4', day_pattern=DayPattern.parse('W'))
+    short_m = replace(mth2, course_id='MTH 5', day_pattern=DayPattern.parse('M'))
+
+    # On M, A is free from slot 7 and B from slot 11, and on W, A is free
+    # from slot 11 and B throughout.
+    class_starts = [
+        ClassStartVariable(course=long_w, days='W', slot=0, room=room_class),
+        ClassStartVariable(course=short_m, days='M', slot=0, room=room_class),
+        ClassStartVariable(course=long_m, days='M', slot=0, room=room_class),
+        ClassStartVariable(course=mth1, days='M', slot=8, room=room_class),
+        ClassStartVariable(course=mth1, days='W', slot=8, room=room_class),
+    ]
+    assigned = assign_rooms(model_input, class_starts)
+
+    assert_that(split_courses(assigned)).is_equal_to({mth1})
+    assert_that(split_courses(class_starts)).is_empty()
+
+
+def test_solve_model_does_not_split_courses_across_rooms():
+    model_input = generate_input(
+        InstanceOptions(num_courses=25, num_rooms=6, seed=3))
+    options = ModelOptions(
+        conflict_formulation=NO_OVERLAP_CONFLICTS, room_classes=True)
+    schedule = solve_model(
+        model_input, options, SolverOptions(backend=CP_SAT_BACKEND))
+
+    assert_that(schedule.status).is_equal_to(OPTIMAL)
+    assert_that(split_courses(schedule.class_starts)).is_empty()
+    room_names = {room.room_name for room in model_input.rooms}
+    for class_start in schedule.class_starts:
+        assert_that(room_names).contains(class_start.room.room_name)
@@ -0,0 +1,227 @@
+""" A module for solving what-if scenarios against a base model input.
+
+A scenario is a small change to the base input, such as closing a room or
+moving a course to another block. The base input is solved once, and then
+every scenario is applied to it and solved in a process pool, starting from
+the base schedule as in incremental.py. The base input and schedule are sent
+to each worker once, so only the scenarios themselves are sent per task. The
+results are compared with the base schedule in a table.
+"""
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+import json
+from timeit import default_timer as timer
+from typing import Dict
+from typing import List
+
+from data import BaseDataclass
+from data import DayPattern
+from data import ModelBuilderInput
+from data import ModelOptions
+from data import SolverOptions
+from incremental import affected_courses
+from incremental import diff_inputs
+from pool import quiet
+from pool import worker_pool
+from pool import worker_state
+from solve import Schedule
+from solve import WarmStart
+from solve import solve_model
+from solve import solve_unpinned
+
+
+@dataclass
+class Scenario(BaseDataclass):
+    """ A change to the base model input.
+
+    Attributes:
+     - name: the name of the scenario in the comparison table.
+     - removed_rooms: names of rooms which are closed.
+     - room_seats: room name -> its new number of seats.
+     - course_blocks: course id -> the block its sections move to.
+     - course_day_patterns: course id -> the day pattern its sections move
+       to.
+    """
+    name: str
+    removed_rooms: List[str] = field(default_factory=list)
+    room_seats: Dict[str, int] = field(default_factory=dict)
+    course_blocks: Dict[str, int] = field(default_factory=dict)
+    course_day_patterns: Dict[str, str] = field(default_factory=dict)
+
+
+def apply_scenario(
+        model_input: ModelBuilderInput,
+        scenario: Scenario) -> ModelBuilderInput:
+    """ The model input with the scenario's changes. Courses keep their
+    position in the list of courses. """
+    room_names = {room.room_name for room in model_input.rooms}
+    course_ids = {course.course_id for course in model_input.courses}
+    block_ids = {block.block_id for block in model_input.blocks}
+    for room_name in set(scenario.removed_rooms) | set(scenario.room_seats):
+        if room_name not in room_names:
+            raise ValueError("Unknown room {} in scenario {}".format(
+                room_name, scenario.name))
+    for course_id in (set(scenario.course_blocks)
+                      | set(scenario.course_day_patterns)):
+        if course_id not in course_ids:
+            raise ValueError("Unknown course {} in scenario {}".format(
+                course_id, scenario.name))
+    for block_id in scenario.course_blocks.values():
+        if block_id not in block_ids:
+            raise ValueError("Unknown block {} in scenario {}".format(
+                block_id, scenario.name))
+
+    removed_rooms = set(scenario.removed_rooms)
+    rooms = [
+        replace(room, seats=scenario.room_seats.get(room.room_name, room.seats))
+        for room in model_input.rooms
+        if room.room_name not in removed_rooms
+    ]
+    courses = [
+        replace(
+            course,
+            desired_block=scenario.course_blocks.get(
+                course.course_id, course.desired_block),
+            day_pattern=DayPattern.parse(scenario.course_day_patterns.get(
+                course.course_id, course.day_pattern)))
+        for course in model_input.courses
+    ]
+    occupied_times = [
+        occupied_time for occupied_time in model_input.occupied_times
+        if occupied_time.room_name not in removed_rooms
+    ]
+    return replace(
+        model_input,
+        courses=courses,
+        rooms=rooms,
+        occupied_times=occupied_times)
+
+
+@dataclass
+class ScenarioResult:
+    """ The outcome of solving a scenario.
+
+    Attributes:
+     - name: the scenario's name.
+     - schedule: the scenario's schedule.
+     - num_moved: the number of courses whose start time or room differs
+       from the base schedule.
+     - wall_time: the seconds taken to build and solve the scenario.
+    """
+    name: str
+    schedule: Schedule
+    num_moved: int
+    wall_time: float
+
+
+def count_moved(
+        base_input: ModelBuilderInput,
+        base: Schedule,
+        model_input: ModelBuilderInput,
+        schedule: Schedule) -> int:
+    """ The number of courses, matched by position, whose meetings differ
+    between the two schedules. """
+    def meetings(courses, class_starts):
+        index = {course: i for (i, course) in enumerate(courses)}
+        by_course = {}
+        for class_start in class_starts:
+            by_course.setdefault(index[class_start.course], set()).add(
+                (class_start.days, class_start.slot,
+                 class_start.room.room_name))
+        return by_course
+
+    base_meetings = meetings(base_input.courses, base.class_starts)
+    new_meetings = meetings(model_input.courses, schedule.class_starts)
+    return sum(
+        base_meetings.get(i) != new_meetings.get(i)
+        for i in range(len(model_input.courses)))
+
+
+@quiet
+def _solve_scenario(scenario: Scenario) -> ScenarioResult:
+    base_input = worker_state['base_input']
+    base = worker_state['base']
+    options = worker_state['options']
+    solver_options = worker_state['solver_options']
+    start = timer()
+    model_input = apply_scenario(base_input, scenario)
+
+    warm_start = WarmStart(class_starts=base.class_starts)
+    if worker_state['pin_unaffected']:
+        diff = diff_inputs(base_input, model_input)
+        warm_start.fixed_courses = (
+            set(model_input.courses)
+            - affected_courses(model_input, diff, base))
+    schedule = solve_model(
+        model_input, options, solver_options, warm_start=warm_start)
+
+    # As in solve_incremental, a scenario may only be infeasible because
+    # of the pinned courses.
+    if warm_start.fixed_courses and not schedule.has_solution():
+        schedule = solve_unpinned(
+            model_input, options, solver_options, base.class_starts, start)
+
+    return ScenarioResult(
+        name=scenario.name,
+        schedule=schedule,
+        num_moved=count_moved(base_input, base, model_input, schedule),
+        wall_time=timer() - start)
+
+
+def solve_scenarios(
+        model_input: ModelBuilderInput,
+        scenarios: List[Scenario],
+        options: ModelOptions = ModelOptions(),
+        solver_options: SolverOptions = SolverOptions(),
+        pin_unaffected: bool = False,
+        max_workers: int = None) -> List[ScenarioResult]:
+    """ Solve the base model input, then each scenario in a pool of
+    max_workers processes, and return the results in order, starting with
+    the base.
+
+    Each scenario's solve is hinted with the base schedule. If
+    pin_unaffected is True, the courses unaffected by the scenario are also
+    fixed to their start time and room in the base schedule, which is
+    faster but may miss schedules that move them. If the pinned scenario
+    has no schedule, it is solved again without pinning, in the time left
+    of the scenario's time limit. Each solver is given a single search
+    worker, since the scenarios already use every core.
+    """
+    start = timer()
+    base = solve_model(model_input, options, solver_options)
+    base_result = ScenarioResult(
+        name='base', schedule=base, num_moved=0, wall_time=timer() - start)
+    if not base.has_solution():
+        print("The base input has no schedule, status={}".format(base.status))
+        return [base_result]
+
+    solver_options = replace(solver_options, num_workers=1)
+    with worker_pool(
+            max_workers, base_input=model_input, base=base, options=options,
+            solver_options=solver_options,
+            pin_unaffected=pin_unaffected) as executor:
+        results = list(executor.map(_solve_scenario, scenarios))
+    return [base_result] + results
+
+
+def format_comparison(results: List[ScenarioResult]) -> str:
+    """ A table of each scenario's status, the number of courses moved from
+    the base schedule, and the seconds taken. """
+    rows = [('scenario', 'status', 'moved', 'seconds')] + [
+        (result.name, result.schedule.status, str(result.num_moved),
+         '{:.3g}'.format(result.wall_time))
+        for result in results
+    ]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return '\n'.join(
+        '  '.join(value.ljust(width) for (value, width) in zip(row, widths))
+        .rstrip()
+        for row in rows)
+
+
+def load_scenarios(path: str) -> List[Scenario]:
+    """ Load scenarios from a JSON file holding a list of objects with the
+    attributes of Scenario. """
+    with open(path) as infile:
+        return [Scenario(**scenario) for scenario in json.load(infile)]
@@ -0,0 +1,63 @@
+from dataclasses import replace
+
+from assertpy import assert_that
+
+from backends import OPTIMAL
+from constraints_test import small_input
+from data import Block
+from data import Time
+from scenarios import Scenario
+from scenarios import apply_scenario
+from scenarios import format_comparison
+from scenarios import solve_scenarios
+
+
+def test_apply_scenario():
+    model_input = small_input()
+
+    changed = apply_scenario(model_input, Scenario(
+        name='close B', removed_rooms=['B'], room_seats={'A': 40},
+        course_blocks={'MTH 2': 0}, course_day_patterns={'MTH 1': 'TR'}))
+
+    assert_that([(room.room_name, room.seats) for room in changed.rooms]
+                ).is_equal_to([('A', 40)])
+    assert_that([course.day_pattern for course in changed.courses]
+                ).is_equal_to(['TR', 'W'])
+    assert_that(apply_scenario).raises(ValueError).when_called_with(
+        model_input, Scenario(name='close C', removed_rooms=['C']))
+
+
+def test_solve_scenarios_compares_with_base():
+    model_input = small_input()
+
+    results = solve_scenarios(model_input, [
+        Scenario(name='close B', removed_rooms=['B']),
+        Scenario(name='MTH 2 on Tuesday', course_day_patterns={'MTH 2': 'T'}),
+    ], max_workers=1)
+
+    assert_that([result.name for result in results]).is_equal_to(
+        ['base', 'close B', 'MTH 2 on Tuesday'])
+    assert_that([result.schedule.status for result in results]).is_equal_to(
+        [OPTIMAL] * 3)
+    assert_that(results[2].num_moved).is_positive()
+    assert_that(format_comparison(results).splitlines()[0].split()).is_equal_to(
+        ['scenario', 'status', 'moved', 'seconds'])
+
+
+def test_solve_scenarios_unpins_when_pinning_is_infeasible():
+    model_input = small_input()
+    model_input = replace(model_input, blocks=model_input.blocks + [
+        Block(block_id=1, start_time=Time(hour=9, minute=0),
+              end_time=Time(hour=9, minute=30)),
+    ])
+
+    # MTH 1 ends after 9:00 in the base schedule, so MTH 2 only fits in A
+    # at 9:00 if MTH 1 moves.
+    results = solve_scenarios(model_input, [
+        Scenario(name='close B', removed_rooms=['B'],
+                 course_blocks={'MTH 2': 1}),
+    ], pin_unaffected=True, max_workers=1)
+
+    assert_that([result.schedule.status for result in results]).is_equal_to(
+        [OPTIMAL] * 2)
+    assert_that(results[1].num_moved).is_equal_to(2)
@@ -0,0 +1,230 @@
+""" A module for screening the model input for infeasibility before the
+model is built.
+
+Each course is in session somewhere in the window from the first legal
+start slot of its block until its lecture starting at the last legal slot
+ends, and needs its room for room_slots + 1 slots of that window on each of
+its days, since classes may not share their first and last slots. So for
+any day and range of slots, the courses whose windows lie in the range
+need at least the sum of those slots, in the rooms that fit them.
+
+Since a room fits exactly the courses with enrollment less than its seats,
+the courses with at least a given enrollment can only use the rooms with
+more seats than that. Comparing their demand with the free slots of those
+rooms in the range, for every enrollment tier, checks Hall's condition for
+the nested sets of courses that matter, and a group of courses that fails
+it can never be scheduled together. The same holds for the labs sharing a
+lab room, against its free slots. Lectures held in a lab room which is also
+one of the rooms are not counted against its labs, which only weakens the
+bound. These bounds only look at the input, so they take a fraction of
+the time of building the model, let alone solving it.
+"""
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from data import Course
+from data import DayPattern
+from data import ModelBuilderInput
+from data import Room
+
+
+@dataclass
+class Overload:
+    """ A group of courses which can not all be scheduled.
+
+    Attributes:
+     - courses: the courses of the group.
+     - reason: why they can not all be scheduled.
+    """
+    courses: List[Course]
+    reason: str
+
+    def __str__(self):
+        return "{}: {}".format(self.reason, ', '.join(
+            "{} {}".format(course.course_id, course.course_name)
+            for course in self.courses))
+
+
+def find_overload(model_input: ModelBuilderInput) -> Overload:
+    """ Return the smallest group of courses found whose demand for room
+    slots exceeds the supply on some day, or None if every bound holds. """
+    day_range = model_input.day_range
+    courses = model_input.courses
+    blocks_by_id = {block.block_id: block for block in model_input.blocks}
+
+    firsts = []
+    lasts = []
+    room_slots = []
+    for course in courses:
+        block = blocks_by_id[course.desired_block]
+        slots = block.start_slots(day_range, course)
+        if not slots:
+            return Overload(
+                courses=[course],
+                reason="No legal start time in block {}".format(block.block_id))
+        firsts.append(slots[0])
+        lasts.append(slots[-1])
+        room_slots.append(day_range.duration_slots(course.room_minutes_per_day))
+    firsts = np.array(firsts, dtype=np.int64)
+    lasts = np.array(lasts, dtype=np.int64)
+    room_slots = np.array(room_slots, dtype=np.int64)
+    ends = lasts + room_slots
+    enrollments = np.array([course.enrollment for course in courses])
+
+    lab_slots = np.array([
+        course.lab_slots(day_range) for course in courses],
+        dtype=np.int64).reshape(-1, 2)
+    (lab_offsets, lab_ends) = (lab_slots[:, 0], lab_slots[:, 1])
+    lab_rooms = np.array([
+        course.lab_room if course.has_lab_room else None
+        for course in courses], dtype=object)
+    num_slots = int(max(
+        ends.max(initial=0), (lasts + lab_ends).max(initial=0))) + 1
+
+    overloads = []
+    for day in DayPattern.valid_chars:
+        meets = np.array([day in course.day_pattern for course in courses],
+                         dtype=bool)
+        if not meets.any():
+            continue
+        free_before = free_slots_before(model_input, day, num_slots)
+        overloads.extend(find_room_overloads(
+            model_input, day, meets, firsts, ends, room_slots + 1,
+            enrollments, free_before))
+
+        for lab_room in sorted(set(lab_rooms[meets]) - {None}):
+            uses_lab = meets & (lab_rooms == lab_room)
+            lab_free_before = free_slots_before(
+                model_input, day, num_slots,
+                [Room(room_name=lab_room, seats=0)])[0]
+            overloads.extend(find_lab_overloads(
+                model_input, day, lab_room, uses_lab, firsts + lab_offsets,
+                lasts + lab_ends, lab_ends - lab_offsets + 1, lab_free_before))
+
+    if not overloads:
+        return None
+    return min(overloads, key=lambda overload: len(overload.courses))
+
+
+def free_slots_before(
+        model_input: ModelBuilderInput,
+        day: str,
+        num_slots: int,
+        rooms: List[Room] = None) -> np.ndarray:
+    """ The number of free slots of each of the rooms, which default to the
+    model input's, before each slot on the day, counting each slot once per
+    class the room can hold at once. """
+    rooms = model_input.rooms if rooms is None else rooms
+    room_indexes = {
+        room.room_name: room_index for (room_index, room) in enumerate(rooms)}
+
+    free = np.ones((len(rooms), num_slots), dtype=np.int64)
+    for occupied_time in model_input.occupied_times:
+        if (day not in occupied_time.days
+                or occupied_time.room_name not in room_indexes):
+            continue
+        (first, last) = occupied_time.slots(model_input.day_range)
+        free[room_indexes[occupied_time.room_name],
+             max(first, 0):max(last + 1, 0)] = 0
+    free *= np.array([room.capacity for room in rooms])[:, None]
+    return np.concatenate(
+        [np.zeros((len(free), 1), dtype=np.int64), free.cumsum(axis=1)],
+        axis=1)
+
+
+def slot_ranges(firsts: np.ndarray, ends: np.ndarray):
+    """ The ranges from each distinct window start to each distinct window
+    end after it, which are the only ranges whose bounds can be tight. """
+    for first in np.unique(firsts).tolist():
+        for end in np.unique(ends).tolist():
+            if end >= first:
+                yield (first, end)
+
+
+def describe_range(model_input, day, first, end):
+    day_range = model_input.day_range
+    return "on {} from {} to {}".format(
+        day, day_range.time(first).strftime('%H:%M'),
+        day_range.time(end).strftime('%H:%M'))
+
+
+def find_room_overloads(
+        model_input: ModelBuilderInput,
+        day: str,
+        meets: np.ndarray,
+        firsts: np.ndarray,
+        ends: np.ndarray,
+        demands: np.ndarray,
+        enrollments: np.ndarray,
+        free_before: np.ndarray) -> List[Overload]:
+    """ The smallest overloaded group of courses meeting on the day, for
+    each range of slots which has one. """
+    courses = model_input.courses
+    increment = model_input.day_range.increment_minutes
+    seats = np.array([room.seats for room in model_input.rooms])
+    seat_order = np.argsort(-seats, kind='stable')
+
+    overloads = []
+    for (first, end) in slot_ranges(firsts[meets], ends[meets]):
+        contained = np.flatnonzero(meets & (firsts >= first) & (ends <= end))
+        if not len(contained):
+            continue
+        # Courses by decreasing enrollment, and their cumulative demand.
+        contained = contained[np.argsort(
+            -enrollments[contained], kind='stable')]
+        demand = np.cumsum(demands[contained])
+        # The supply of the rooms with more seats than each enrollment.
+        room_supply = np.concatenate([[0], np.cumsum(
+            free_before[seat_order, end + 1] - free_before[seat_order, first])])
+        num_fitting = np.searchsorted(
+            -seats[seat_order], -enrollments[contained], side='left')
+        supply = room_supply[num_fitting]
+
+        # Only the last course of each enrollment tier closes a group.
+        tier_ends = np.append(
+            enrollments[contained][1:] != enrollments[contained][:-1], True)
+        overloaded = np.flatnonzero(tier_ends & (demand > supply))
+        if not len(overloaded):
+            continue
+        i = int(overloaded[0])
+        overloads.append(Overload(
+            courses=[courses[c] for c in contained[:i + 1].tolist()],
+            reason=("Needing {} room minutes {} in rooms with more than {} "
+                    "seats, which have {} free").format(
+                int(demand[i]) * increment,
+                describe_range(model_input, day, first, end),
+                int(enrollments[contained[i]]),
+                int(supply[i]) * increment)))
+    return overloads
+
+
+def find_lab_overloads(
+        model_input: ModelBuilderInput,
+        day: str,
+        lab_room: str,
+        uses_lab: np.ndarray,
+        firsts: np.ndarray,
+        ends: np.ndarray,
+        demands: np.ndarray,
+        free_before: np.ndarray) -> List[Overload]:
+    """ The group of courses with labs in the lab room on the day, for each
+    range of slots in which they need it for longer than it is free. """
+    courses = model_input.courses
+    increment = model_input.day_range.increment_minutes
+
+    overloads = []
+    for (first, end) in slot_ranges(firsts[uses_lab], ends[uses_lab]):
+        contained = np.flatnonzero(
+            uses_lab & (firsts >= first) & (ends <= end))
+        demand = int(demands[contained].sum())
+        supply = int(free_before[end + 1] - free_before[first])
+        if demand > supply:
+            overloads.append(Overload(
+                courses=[courses[c] for c in contained.tolist()],
+                reason="Needing {} minutes of lab room {} {}, which has {}"
+                .format(demand * increment, lab_room,
+                        describe_range(model_input, day, first, end),
+                        supply * increment)))
+    return overloads
@@ -0,0 +1,45 @@
+from dataclasses import replace
+
+from assertpy import assert_that
+
+from backends import INFEASIBLE
+from constraints_test import small_input
+from data import DayPattern
+from data import OccupiedTime
+from data import Room
+from data import Time
+from screening import find_overload
+from solve import solve_model
+
+
+def test_small_input_passes():
+    assert_that(find_overload(small_input())).is_none()
+
+
+def test_finds_course_without_a_fitting_room():
+    model_input = small_input()
+    (mth1, mth2) = model_input.courses
+    model_input = replace(model_input, rooms=[Room(room_name='B', seats=10)])
+
+    overload = find_overload(model_input)
+
+    assert_that(overload.courses).is_equal_to([mth1])
+    assert_that(overload.reason).contains('more than 20 seats')
+
+
+def test_finds_courses_crowded_out_by_occupied_times():
+    model_input = small_input()
+    # On Wednesday, A is only free until 8:40, which leaves no time for a
+    # 50 minute lecture starting after 8:00.
+    model_input = replace(
+        model_input,
+        rooms=[Room(room_name='A', seats=30)],
+        occupied_times=[OccupiedTime(
+            room_name='A', days=DayPattern.parse('W'),
+            start_time=Time(hour=8, minute=40),
+            end_time=Time(hour=10, minute=0))])
+
+    overload = find_overload(model_input)
+
+    assert_that(overload.courses).is_length(1)
+    assert_that(solve_model(model_input).status).is_equal_to(INFEASIBLE)
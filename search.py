@@ -0,0 +1,274 @@
+""" A module for scheduling by local search, without building the model.
+
+Each course is given a single start slot and room for all of its days, so
+meeting consistency holds by construction, and the only violations are
+conflicts: slots at which more classes and labs are in session in a room
+than it has capacity for, or in a lab room than one. These are counted in
+a per-(room, day, slot) occupancy array, with the lab rooms which are not
+one of the rooms after the rooms, so a move only touches the slots
+occupied by the classes it moves, and its change in conflicts takes time
+proportional to their length, independent of the size of the instance.
+Occupied times are counted as classes filling their room, so that
+overlapping one is a conflict as well.
+
+The search starts by placing each course, hardest first, at the best of
+a few random legal room times, then anneals with three moves: shifting a
+course to another start slot in its block, moving it to another room that
+fits it, and swapping the start slots and rooms of two courses in the same
+block. Moves mostly pick courses with conflicts. The temperature cools
+over a fixed number of iterations and then reheats, so that a seed gives
+the same moves however fast the machine is. The search stops as soon as
+no conflicts are left, which is reported right away, or once its time
+budget runs out, with the schedule with the fewest conflicts found.
+"""
+import math
+import random
+from timeit import default_timer as timer
+from typing import Callable
+from typing import List
+from typing import Tuple
+
+import numpy as np
+
+from data import DayPattern
+from data import ModelBuilderInput
+from greedy import RoomWindows
+import metrics
+from variables import ClassStartVariable
+
+
+DEFAULT_BUDGET_SECONDS = 60
+INITIAL_CANDIDATES = 16
+START_TEMPERATURE = 2.0
+END_TEMPERATURE = 0.05
+CHECK_INTERVAL = 1000
+ANNEAL_ITERATIONS = 200000
+CONFLICT_SAMPLES = 8
+
+
+class LocalSearch:
+    """ A schedule of start slots and rooms for model_input's courses, with
+    its number of conflicts. """
+    def __init__(self, model_input: ModelBuilderInput, seed: int = 0):
+        self.model_input = model_input
+        self.random = random.Random(seed)
+        day_range = model_input.day_range
+        courses = model_input.courses
+        rooms = model_input.rooms
+        blocks_by_id = {block.block_id: block for block in model_input.blocks}
+
+        self.legal_rooms = []
+        self.legal_slots = []
+        for course in courses:
+            block = blocks_by_id[course.desired_block]
+            self.legal_rooms.append([
+                room_index for (room_index, room) in enumerate(rooms)
+                if room.can_fit(course)])
+            self.legal_slots.append(block.start_slots(day_range, course))
+            if not self.legal_rooms[-1] or not self.legal_slots[-1]:
+                raise ValueError("No legal room/time for {}".format(course))
+        self.legal_room_sets = [set(r) for r in self.legal_rooms]
+        self.legal_slot_sets = [set(s) for s in self.legal_slots]
+        # Swaps are only tried between courses in the same block.
+        self.block_courses = {}
+        for (course_index, course) in enumerate(courses):
+            self.block_courses.setdefault(course.desired_block, []).append(
+                course_index)
+
+        self.days = [
+            np.array([DayPattern.valid_chars.index(day)
+                      for day in course.day_pattern])
+            for course in courses
+        ]
+        self.room_windows = RoomWindows(day_range, rooms, courses)
+        self.capacities = self.room_windows.capacities
+        num_days = len(DayPattern.valid_chars)
+        self.in_session = np.zeros(
+            (len(self.capacities), num_days, self.room_windows.num_slots),
+            dtype=np.int32)
+        self.add_occupied_times()
+
+        self.slots = [None] * len(courses)
+        self.rooms = [None] * len(courses)
+        self.num_conflicts = 0
+
+    def add_occupied_times(self):
+        room_indexes = {
+            room_name: room_index
+            for (room_index, room_name)
+            in enumerate(self.room_windows.room_names)}
+        for occupied_time in self.model_input.occupied_times:
+            if occupied_time.room_name not in room_indexes:
+                continue
+            room = room_indexes[occupied_time.room_name]
+            (first, last) = occupied_time.slots(self.model_input.day_range)
+            for day in occupied_time.days:
+                self.in_session[
+                    room, DayPattern.valid_chars.index(day),
+                    max(first, 0):last + 1] += self.capacities[room]
+
+    def occupy(self, course: int, slot: int, room: int, sign: int) -> int:
+        """ Add (sign 1) or remove (sign -1) the course's classes at the
+        slot and room, and return the change in the number of conflicts. """
+        return sum(
+            self.change_counts(
+                self.in_session[window_room], self.capacities[window_room],
+                self.days[course], first, last, sign)
+            for (window_room, first, last) in self.room_windows.windows(
+                course, slot, room))
+
+    @staticmethod
+    def change_counts(in_session, capacity, days, first, last, sign) -> int:
+        counts = in_session[days, first:last + 1]
+        if sign > 0:
+            change = int((counts >= capacity).sum())
+        else:
+            change = -int((counts > capacity).sum())
+        in_session[days, first:last + 1] = counts + sign
+        return change
+
+    def move(self, course: int, slot: int, room: int) -> int:
+        """ Move the course to the slot and room, and return the change in
+        the number of conflicts. """
+        change = 0
+        if self.slots[course] is not None:
+            change += self.occupy(
+                course, self.slots[course], self.rooms[course], -1)
+        change += self.occupy(course, slot, room, 1)
+        (self.slots[course], self.rooms[course]) = (slot, room)
+        self.num_conflicts += change
+        return change
+
+    def place_all(self):
+        """ Place each course, fewest legal room times and then largest
+        enrollment first, at the best of a few random legal room times. """
+        courses = self.model_input.courses
+        order = sorted(range(len(courses)), key=lambda i: (
+            len(self.legal_rooms[i]) * len(self.legal_slots[i]),
+            -courses[i].enrollment))
+        for course in order:
+            best = None
+            for _ in range(INITIAL_CANDIDATES):
+                slot = self.random.choice(self.legal_slots[course])
+                room = self.random.choice(self.legal_rooms[course])
+                conflicts = self.occupy(course, slot, room, 1)
+                self.occupy(course, slot, room, -1)
+                if best is None or conflicts < best[0]:
+                    best = (conflicts, slot, room)
+                if conflicts == 0:
+                    break
+            self.move(course, best[1], best[2])
+
+    def is_conflicted(self, course: int) -> bool:
+        return any(
+            (self.in_session[window_room, self.days[course], first:last + 1]
+             > self.capacities[window_room]).any()
+            for (window_room, first, last) in self.room_windows.windows(
+                course, self.slots[course], self.rooms[course]))
+
+    def pick_course(self) -> int:
+        """ A random course, preferring one with conflicts. """
+        for _ in range(CONFLICT_SAMPLES):
+            course = self.random.randrange(len(self.slots))
+            if self.is_conflicted(course):
+                break
+        return course
+
+    def can_take(self, course: int, slot: int, room: int) -> bool:
+        return (slot in self.legal_slot_sets[course]
+                and room in self.legal_room_sets[course])
+
+    def try_move(self, temperature: float) -> bool:
+        """ Make a random move, and undo it unless it is accepted. """
+        course = self.pick_course()
+        previous = [(course, self.slots[course], self.rooms[course])]
+        kind = self.random.random()
+        if kind < 0.4:
+            change = self.move(
+                course, self.random.choice(self.legal_slots[course]),
+                self.rooms[course])
+        elif kind < 0.8:
+            change = self.move(
+                course, self.slots[course],
+                self.random.choice(self.legal_rooms[course]))
+        else:
+            other = self.random.choice(self.block_courses[
+                self.model_input.courses[course].desired_block])
+            (slot, room) = (self.slots[other], self.rooms[other])
+            if other == course or not (
+                    self.can_take(course, slot, room)
+                    and self.can_take(other, *previous[0][1:])):
+                return False
+            previous.append((other, slot, room))
+            change = self.move(other, *previous[0][1:])
+            change += self.move(course, slot, room)
+
+        if change <= 0 or self.random.random() < math.exp(
+                -change / temperature):
+            return True
+        for (moved, slot, room) in reversed(previous):
+            self.move(moved, slot, room)
+        return False
+
+    def class_starts(self) -> List[ClassStartVariable]:
+        rooms = self.model_input.rooms
+        return [
+            ClassStartVariable(
+                course=course, days=day, slot=self.slots[i],
+                room=rooms[self.rooms[i]])
+            for (i, course) in enumerate(self.model_input.courses)
+            for day in course.day_pattern
+        ]
+
+
+def search_locally(
+        model_input: ModelBuilderInput,
+        budget_seconds: float = None,
+        seed: int = 0,
+        on_class_starts: Callable[[List[ClassStartVariable]], None] = None
+        ) -> Tuple[List[ClassStartVariable], int]:
+    """ Search for a schedule without conflicts for at most budget_seconds,
+    and return the class starts of the schedule with the fewest conflicts
+    found, with its number of conflicts. The search is repeatable for a
+    given seed, as long as it finishes within budget.
+
+    If on_class_starts is given, it is called with the class starts of a
+    schedule without conflicts as soon as one is found, before the search
+    returns.
+    """
+    budget_seconds = budget_seconds or DEFAULT_BUDGET_SECONDS
+    start = timer()
+    search = LocalSearch(model_input, seed)
+    search.place_all()
+    print("Placed {} courses with {} conflicts".format(
+        len(model_input.courses), search.num_conflicts))
+
+    iterations = 0
+    best = search.num_conflicts
+    best_class_starts = search.class_starts()
+    while search.num_conflicts > 0:
+        if timer() - start >= budget_seconds:
+            break
+        cooled = (iterations % ANNEAL_ITERATIONS) / ANNEAL_ITERATIONS
+        temperature = START_TEMPERATURE * (
+            END_TEMPERATURE / START_TEMPERATURE) ** cooled
+        for _ in range(CHECK_INTERVAL):
+            search.try_move(temperature)
+            if search.num_conflicts == 0:
+                break
+        iterations += CHECK_INTERVAL
+        if search.num_conflicts < best:
+            best = search.num_conflicts
+            best_class_starts = search.class_starts()
+            print("Local search iteration {}: {} conflicts".format(
+                iterations, best))
+            if best == 0 and on_class_starts:
+                on_class_starts(best_class_starts)
+
+    print("Local search finished after {} iterations with {} conflicts"
+          .format(iterations, best))
+    metrics.record('local_search.iterations', iterations)
+    metrics.record('local_search.conflicts', best)
+    if best == 0 and iterations == 0 and on_class_starts:
+        on_class_starts(best_class_starts)
+    return (best_class_starts, best)
@@ -0,0 +1,115 @@
+from dataclasses import replace
+
+from assertpy import assert_that
+
+from backends import FEASIBLE
+from backends import UNKNOWN
+from constraints_test import small_input
+from data import DayPattern
+from data import ModelOptions
+from data import OccupiedTime
+from data import SolverOptions
+from data import Time
+from generate import InstanceOptions
+from generate import generate_input
+from search import LocalSearch
+from search import search_locally
+from solve import solve_model
+
+
+def test_moves_count_conflicts_incrementally():
+    model_input = small_input()
+    search = LocalSearch(model_input)
+    (mth1, mth2) = (0, 1)
+
+    # MTH 1 is in A from slot 1 to 11, MTH 2 from slot 5 to 12 on Wednesday.
+    search.move(mth1, 1, 0)
+    assert_that(search.move(mth2, 5, 0)).is_equal_to(7)
+    assert_that(search.move(mth2, 5, 1)).is_equal_to(-7)
+    assert_that(search.num_conflicts).is_equal_to(0)
+    assert_that(search.move(mth2, 11, 0)).is_equal_to(1)
+
+
+def test_labs_conflict_with_classes_in_their_room():
+    model_input = small_input()
+    (mth1, mth2) = model_input.courses
+    model_input = replace(model_input, courses=[
+        mth1, replace(mth2, lab_minutes_per_week=30, lab_room='A')])
+    search = LocalSearch(model_input)
+
+    # MTH 2's lab in A runs from slot 7 to 13 on Wednesday.
+    search.move(0, 1, 0)
+    assert_that(search.move(1, 1, 1)).is_equal_to(5)
+    assert_that(search.move(1, 6, 1)).is_equal_to(-5)
+    # With its lecture in A as well, it is in A from slot 12 to 24.
+    assert_that(search.move(1, 12, 0)).is_equal_to(0)
+    assert_that(search.move(0, 13, 0)).is_equal_to(11)
+
+
+def test_occupied_times_are_conflicts():
+    model_input = replace(small_input(), occupied_times=[OccupiedTime(
+        room_name='A', days=DayPattern.parse('M'),
+        start_time=Time(hour=8, minute=30), end_time=Time(hour=8, minute=45))])
+    search = LocalSearch(model_input)
+
+    assert_that(search.move(0, 1, 0)).is_equal_to(4)
+    assert_that(search.move(0, 10, 0)).is_equal_to(-4)
+
+
+def test_search_repairs_conflicts_repeatably():
+    model_input = generate_input(InstanceOptions(num_courses=80, num_rooms=12))
+    search = LocalSearch(model_input, seed=1)
+    search.place_all()
+    assert_that(search.num_conflicts).is_positive()
+
+    streamed = []
+    (class_starts, num_conflicts) = search_locally(
+        model_input, 30, seed=1, on_class_starts=streamed.append)
+
+    assert_that(num_conflicts).is_zero()
+    assert_that(streamed).is_equal_to([class_starts])
+    assert_that(search_locally(model_input, 30, seed=1)).is_equal_to(
+        (class_starts, 0))
+    by_day_room = {}
+    for class_start in class_starts:
+        end = class_start.slot + model_input.day_range.duration_slots(
+            class_start.course.room_minutes_per_day)
+        by_day_room.setdefault((class_start.days, class_start.room), []).append(
+            (class_start.slot, end))
+    for intervals in by_day_room.values():
+        intervals.sort()
+        for ((_, end), (next_start, _)) in zip(intervals, intervals[1:]):
+            assert_that(next_start).is_greater_than(end)
+
+
+def test_solve_model_with_local_search():
+    model_input = generate_input(InstanceOptions())
+
+    schedules = []
+    schedule = solve_model(
+        model_input, ModelOptions(), SolverOptions(local_search=True),
+        on_schedule=schedules.append)
+
+    assert_that(schedule.status).is_equal_to(FEASIBLE)
+    assert_that(schedules).is_equal_to([schedule])
+    assert_that(schedule.class_starts).is_length(sum(
+        len(course.day_pattern) for course in model_input.courses))
+
+
+def test_search_out_of_time_keeps_the_fewest_conflicts():
+    model_input = generate_input(InstanceOptions(num_courses=80, num_rooms=12))
+    search = LocalSearch(model_input, seed=1)
+    search.place_all()
+    streamed = []
+
+    (class_starts, num_conflicts) = search_locally(
+        model_input, 1e-9, seed=1, on_class_starts=streamed.append)
+
+    assert_that(num_conflicts).is_equal_to(search.num_conflicts)
+    assert_that(class_starts).is_equal_to(search.class_starts())
+    assert_that(streamed).is_empty()
+
+    schedule = solve_model(model_input, ModelOptions(), SolverOptions(
+        local_search=True, time_limit_seconds=1e-9, seed=1))
+    assert_that(schedule.status).is_equal_to(UNKNOWN)
+    assert_that(schedule.class_starts).is_equal_to(class_starts)
@@ -0,0 +1,357 @@
+""" A module for building and solving the course scheduler model. """
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+from timeit import default_timer as timer
+from typing import Callable
+from typing import List
+from typing import Set
+
+import numpy as np
+
+from backends import FEASIBLE
+from backends import INFEASIBLE
+from backends import OPTIMAL
+from backends import UNKNOWN
+from backends import make_backend
+from cache import ModelCache
+from cache import fingerprint
+from constraints import build_constraints
+from constraints import check_options
+from data import Course
+from data import ModelBuilderInput
+from data import ModelOptions
+from data import SolverOptions
+from greedy import construct_greedily
+from lazy import solve_lazily
+from matrix import build_constraint_matrix
+import metrics
+from parallel import build_constraint_matrix_in_parallel
+from rooms import assign_rooms
+from rooms import group_rooms
+from rooms import split_courses
+from screening import find_overload
+from search import search_locally
+from timer import Timer
+from variables import ClassStartVariable
+from variables import VariableIndexes
+from variables import build_variables
+
+
+@dataclass
+class Schedule:
+    """ The outcome of solving the model.
+
+    Attributes:
+     - status: a solve status from backends.py.
+     - class_starts: the ClassStartVariables that are 1 in the solution.
+    """
+    status: str
+    class_starts: List[ClassStartVariable]
+
+    def has_solution(self):
+        return self.status in (OPTIMAL, FEASIBLE)
+
+
+@dataclass
+class WarmStart:
+    """ A previous schedule to start solving from.
+
+    Attributes:
+     - class_starts: class starts passed to the solver as a hint.
+     - fixed_courses: courses whose start time and room are fixed to those
+       in class_starts, if they are still legal.
+    """
+    class_starts: List[ClassStartVariable]
+    fixed_courses: Set[Course] = field(default_factory=set)
+
+    def fixed_starts(self):
+        """ The (slot, room) of each fixed course, skipping courses which
+        did not start at the same time in the same room on every day. """
+        starts = {}
+        for class_start in self.class_starts:
+            if class_start.course in self.fixed_courses:
+                starts.setdefault(class_start.course, set()).add(
+                    (class_start.slot, class_start.room))
+
+        return {
+            course: next(iter(course_starts))
+            for (course, course_starts) in starts.items()
+            if len(course_starts) == 1
+        }
+
+
+def hint_variable_ids(
+        variables: VariableIndexes,
+        class_starts: List[ClassStartVariable]) -> List[int]:
+    """ The ids of the variables which agree with the given class starts,
+    which need not have been built with the same options or rooms. """
+    rooms = {
+        (class_start.course, day, class_start.slot): class_start.room
+        for class_start in class_starts
+        for day in class_start.days
+    }
+    return [
+        variable_id
+        for (variable_id, variable) in enumerate(variables)
+        if all(
+            variable.room.contains(
+                rooms.get((variable.course, day, variable.slot)))
+            for day in variable.days)
+    ]
+
+
+def solve_model(
+        model_input: ModelBuilderInput,
+        options: ModelOptions = ModelOptions(),
+        solver_options: SolverOptions = SolverOptions(),
+        build_workers: int = 1,
+        warm_start: WarmStart = None,
+        cache: ModelCache = None,
+        on_schedule: Callable[[Schedule], None] = None) -> Schedule:
+    """ Build and solve the course scheduler model.
+
+    If build_workers is more than 1, the constraint matrix is built in a
+    pool of that many processes.
+
+    If a warm_start is given, its courses are fixed and its class starts
+    passed to the solver as a hint. Otherwise, with greedy_hint or
+    greedy_only in the solver options, a greedily constructed schedule is
+    passed as the hint, and with greedy_only it is returned without solving
+    if it places every course.
+
+    The input is first screened with find_overload, and if a group of
+    courses can not all be scheduled, the schedule is INFEASIBLE without
+    building the model.
+
+    If a cache is given, the schedule is looked up under a fingerprint of
+    the input and options, and otherwise the built model is looked up under
+    a fingerprint of the input and model options, so that only the solve
+    is repeated when just the solver options changed. Warm-started solves
+    are not cached, and nor are models with lazy conflicts.
+
+    With local_search in the solver options, the model is not built, and
+    the schedule is searched for by local search instead, which ignores the
+    model options. If the search runs out of time, the schedule is UNKNOWN,
+    with the class starts of the schedule with the fewest conflicts found.
+
+    With room_classes in the model options, if concrete rooms can not be
+    assigned so that each course meets in the same room every day, the
+    schedule has status UNKNOWN, and the final one is solved again over
+    concrete rooms, see solve_on_rooms.
+
+    If on_schedule is given, it is called with each improved schedule as
+    soon as the solver finds it, and with the final schedule if it has a
+    solution. Schedules found before the final one have status FEASIBLE.
+    """
+    start = timer()
+    model_key = None
+    if cache is not None and warm_start is None:
+        model_key = fingerprint(model_input, options)
+        solution_key = fingerprint(model_input, options, solver_options)
+        schedule = cache.get('schedule', solution_key)
+        if schedule is not None:
+            if on_schedule:
+                on_schedule(schedule)
+            return schedule
+
+    with Timer("Screening input"):
+        overload = find_overload(model_input)
+    if overload is not None:
+        print("Infeasible input. {}".format(overload))
+        metrics.record('screening.overloaded_courses', len(overload.courses))
+        return Schedule(status=INFEASIBLE, class_starts=[])
+
+    if solver_options.local_search:
+        def on_class_starts(class_starts: List[ClassStartVariable]):
+            on_schedule(Schedule(status=FEASIBLE, class_starts=class_starts))
+
+        with metrics.span('search_locally'):
+            (class_starts, num_conflicts) = search_locally(
+                model_input, solver_options.time_limit_seconds,
+                solver_options.seed,
+                on_class_starts=on_class_starts if on_schedule else None)
+        if num_conflicts:
+            return Schedule(status=UNKNOWN, class_starts=class_starts)
+        schedule = Schedule(status=FEASIBLE, class_starts=class_starts)
+        if model_key:
+            cache.put('schedule', solution_key, schedule)
+        return schedule
+
+    check_options(options)
+    original_input = model_input
+    if options.room_classes:
+        model_input = group_rooms(model_input)
+
+    backend = make_backend(solver_options)
+    backend.check_options(options)
+
+    def to_schedule(status: str, values: np.ndarray) -> Schedule:
+        class_starts = [
+            variables[variable_id]
+            for variable_id in np.flatnonzero(values > 0.5)
+        ]
+        if options.room_classes:
+            class_starts = assign_rooms(original_input, class_starts)
+            if status in (OPTIMAL, FEASIBLE) and split_courses(class_starts):
+                status = UNKNOWN
+        return Schedule(status=status, class_starts=class_starts)
+
+    cached_model = None
+    if model_key and not options.lazy_conflicts:
+        cached_model = cache.get('model', model_key)
+    matrix = None
+    constraints = None
+    if cached_model is not None:
+        (variables, matrix) = cached_model
+    else:
+        with Timer("Building variables"):
+            fixed_starts = warm_start.fixed_starts() if warm_start else None
+            with metrics.span('build_variables'):
+                variables = build_variables(model_input, options, fixed_starts)
+
+    hint = None
+    if warm_start:
+        hint = hint_variable_ids(variables, warm_start.class_starts)
+    elif solver_options.greedy_hint or solver_options.greedy_only:
+        with metrics.span('construct_greedily'):
+            (hint, unplaced) = construct_greedily(model_input, variables)
+        metrics.count('greedy_unplaced', len(unplaced))
+        if solver_options.greedy_only and not unplaced:
+            values = np.zeros(len(variables))
+            values[hint] = 1
+            schedule = to_schedule(FEASIBLE, values)
+            if schedule.has_solution():
+                if on_schedule:
+                    on_schedule(schedule)
+                if model_key:
+                    cache.put('schedule', solution_key, schedule)
+                return schedule
+
+    # With lazy conflicts, the constraints are built while solving, in
+    # solve_lazily.
+    if matrix is None and not options.lazy_conflicts:
+        with Timer("Building constraints"):
+            if build_workers > 1:
+                with metrics.span('build_constraint_matrix_in_parallel'):
+                    matrix = build_constraint_matrix_in_parallel(
+                        model_input, variables, options,
+                        max_workers=build_workers)
+            else:
+                with metrics.span('build_constraints'):
+                    constraints = build_constraints(
+                        model_input, variables, options)
+                with metrics.span('build_constraint_matrix'):
+                    matrix = build_constraint_matrix(variables, constraints)
+        if model_key:
+            cache.put('model', model_key, (variables, matrix))
+
+    streamed = []
+
+    def on_solution(values: np.ndarray):
+        streamed.append(values)
+        metrics.count('incumbents')
+        schedule = to_schedule(FEASIBLE, values)
+        if schedule.has_solution():
+            on_schedule(schedule)
+
+    if options.lazy_conflicts:
+        # The solutions of every round but the last have overlaps, so only
+        # the final schedule is streamed.
+        result = solve_lazily(model_input, variables, backend, options, hint)
+    else:
+        result = backend.solve(
+            model_input, variables, matrix, constraints, hint=hint,
+            on_solution=on_solution if on_schedule else None)
+
+    print("Finished solve, status={}.".format(result.status))
+    metrics.record('solver.status', result.status)
+    metrics.record('solver.wall_time', result.wall_time)
+    for (name, value) in result.statistics.items():
+        metrics.record('solver.' + name, value)
+
+    schedule = to_schedule(result.status, result.values)
+    if result.status in (OPTIMAL, FEASIBLE) and not schedule.has_solution():
+        schedule = solve_on_rooms(
+            original_input, options, solver_options, schedule.class_starts,
+            start, build_workers=build_workers, on_schedule=on_schedule)
+        if model_key and schedule.has_solution():
+            cache.put('schedule', solution_key, schedule)
+        return schedule
+    if on_schedule and schedule.has_solution() and not (
+            streamed and np.array_equal(streamed[-1], result.values)):
+        on_schedule(schedule)
+    if model_key and schedule.has_solution():
+        cache.put('schedule', solution_key, schedule)
+    return schedule
+
+
+def solve_unpinned(
+        model_input: ModelBuilderInput,
+        options: ModelOptions,
+        solver_options: SolverOptions,
+        class_starts: List[ClassStartVariable],
+        start: float,
+        build_workers: int = 1,
+        on_schedule: Callable[[Schedule], None] = None) -> Schedule:
+    """ Solve the model again after a solve with pinned courses found no
+    schedule, hinted with class_starts but with nothing pinned.
+
+    The time limit, if any, is shared with the pinned solve, which started
+    at start, a default_timer time. If it has already passed, the schedule
+    is UNKNOWN.
+    """
+    print("Pinned model has no solution, solving without pinning")
+    solver_options = time_left(solver_options, start)
+    if solver_options is None:
+        print("Ran out of time before solving without pinning")
+        return Schedule(status=UNKNOWN, class_starts=[])
+    return solve_model(
+        model_input, options, solver_options, build_workers=build_workers,
+        warm_start=WarmStart(class_starts=class_starts),
+        on_schedule=on_schedule)
+
+
+def solve_on_rooms(
+        model_input: ModelBuilderInput,
+        options: ModelOptions,
+        solver_options: SolverOptions,
+        class_starts: List[ClassStartVariable],
+        start: float,
+        build_workers: int = 1,
+        on_schedule: Callable[[Schedule], None] = None) -> Schedule:
+    """ Solve the model again over concrete rooms after a solve over room
+    classes found a schedule whose rooms could not be assigned without
+    splitting a course across rooms, hinted with the courses of
+    class_starts which were not split.
+
+    The time limit, if any, is shared with the solve over room classes,
+    which started at start, a default_timer time. If it has already passed,
+    the schedule is UNKNOWN, with the split class starts.
+    """
+    split = split_courses(class_starts)
+    print("{} courses meet in different rooms on different days, solving "
+          "over concrete rooms".format(len(split)))
+    metrics.record('rooms.split_courses', len(split))
+    solver_options = time_left(solver_options, start)
+    if solver_options is None:
+        print("Ran out of time before solving over concrete rooms")
+        return Schedule(status=UNKNOWN, class_starts=class_starts)
+    return solve_model(
+        model_input, replace(options, room_classes=False), solver_options,
+        build_workers=build_workers,
+        warm_start=WarmStart(class_starts=[
+            class_start for class_start in class_starts
+            if class_start.course not in split]),
+        on_schedule=on_schedule)
+
+
+def time_left(solver_options: SolverOptions, start: float) -> SolverOptions:
+    """ The solver options with the time limit, if any, reduced by the time
+    since start, a default_timer time, or None if it has already passed. """
+    if solver_options.time_limit_seconds is None:
+        return solver_options
+    seconds_left = solver_options.time_limit_seconds - (timer() - start)
+    if seconds_left <= 0:
+        return None
+    return replace(solver_options, time_limit_seconds=seconds_left)
@@ -1,17 +1,24 @@
 from timeit import default_timer as timer
 
+import metrics
+
 
 class Timer(object):
+    """ Print a message and the time taken by a stage, and record it as a
+    span of the active Metrics, see metrics.py. """
     def __init__(self, msg, fmt="%0.3g"):
         self.msg = msg
         self.fmt = fmt
 
     def __enter__(self):
         print(self.msg)
+        self.span = metrics.span(self.msg)
+        self.span.__enter__()
         self.start = timer()
         return self
 
     def __exit__(self, *args):
         t = timer() - self.start
+        self.span.__exit__(*args)
         print(("%s took " + self.fmt + " seconds") % (self.msg, t))
         self.time = t
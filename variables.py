@@ -1,23 +1,31 @@
 """ A module for building and representing the variables for the class
 scheduler model.
 """
+from array import array
 from collections import defaultdict
 from dataclasses import dataclass
-from itertools import product
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+
+import numpy as np
 
 from data import Block
 from data import Course
 from data import CourseDay
+from data import DayPattern
 from data import DayRoomTime
 from data import ModelBuilderInput
+from data import ModelOptions
 from data import Room
-from data import Time
 from data import TimeRange
+import metrics
 
 
 class Variable:
-    def to_solver_var(self, solver):
-        return solver.IntVar(self.min(), self.max(), str(self))
+    """ A base class for the model's integer variables, which are bounded
+    by min() and max(). """
 
 
 @dataclass(eq=True, frozen=True)
@@ -25,16 +33,22 @@ class ClassStartVariable(Variable):
     """ A binary variable indexed by
 
     Course c
-    Day (str) d
+    Days (str) d
     Time t
     Room r
 
-    which is 1 if and only if Course c on Day d starts at Time
+    which is 1 if and only if Course c on each of the Days d starts at Time
     t in Room r.
+
+    Days is a single day, unless the model collapses day patterns, in
+    which case it is the course's entire day pattern.
+
+    The time is stored as a slot index into the model's day range,
+    see TimeRange.
     """
     course: Course
-    day: str
-    time: Time
+    days: str
+    slot: int
     room: Room
 
     def min(self):
@@ -51,49 +65,398 @@ class ClassStartVariable(Variable):
         )
 
     def __str__(self):
+        return "ClassStart_{}_{}_{:03d}_Room_{}".format(
+            self.unique_class_key(),
+            self.days,
+            self.slot,
+            self.room.room_name)
+
+    def display_name(self, day_range: TimeRange):
+        """ Like __str__, but with the start slot converted to a Time. """
         return "ClassStart_{}_{}_{}_Room_{}".format(
             self.unique_class_key(),
-            self.day,
-            self.time,
+            self.days,
+            day_range.time(self.slot),
             self.room.room_name)
 
 
+def day_mask(days: str) -> int:
+    """ A bitmask with bit i set if days includes DayPattern.valid_chars[i]. """
+    mask = 0
+    for day in days:
+        mask |= 1 << DayPattern.valid_chars.index(day)
+    return mask
+
+
+def mask_days(mask: int) -> str:
+    return ''.join(
+        day for (i, day) in enumerate(DayPattern.valid_chars)
+        if mask & (1 << i))
+
+
+# The bits of a packed (course, days, slot, room) key, see pack_keys.
+ROOM_BITS = 16
+SLOT_BITS = 12
+MASK_BITS = len(DayPattern.valid_chars)
+
+
+def pack_keys(courses, masks, slots, rooms) -> np.ndarray:
+    """ Pack arrays of course, day mask, slot and room indexes into one
+    int64 key per variable. """
+    keys = np.asarray(courses, dtype=np.int64) << MASK_BITS
+    keys |= np.asarray(masks, dtype=np.int64)
+    keys <<= SLOT_BITS
+    keys |= np.asarray(slots, dtype=np.int64)
+    keys <<= ROOM_BITS
+    keys |= np.asarray(rooms, dtype=np.int64)
+    return keys
+
+
+def csr_index(keys: np.ndarray, ids: np.ndarray, num_keys: int):
+    """ The (offsets, ids) of a CSR index from each key to its ids, which
+    are ids[offsets[key]:offsets[key + 1]] in increasing order. """
+    order = np.lexsort((ids, keys))
+    counts = np.bincount(keys, minlength=num_keys)
+    offsets = np.zeros(num_keys + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return (offsets, ids[order].astype(np.int32))
+
+
 class VariableIndexes:
+    """ The model's variables, and indexes into them.
+
+    Courses and rooms are interned to their position in self.courses and
+    self.rooms, and days to their position in DayPattern.valid_chars. Each
+    variable is stored as a course index, a bitmask of its days, a slot and
+    a room index in parallel arrays, and is given an integer id, which is
+    its position in those arrays and its column in the solver's constraint
+    matrix. Indexing or iterating returns ClassStartVariables built on
+    demand.
+
+    Variables are added with add or add_start, after which the arrays and
+    the CSR indexes by (course, day) and (day, room, slot) are built on
+    first use. Duplicate variables are dropped, keeping the first.
+    """
+    fields = ('course', 'mask', 'slot', 'room')
+    typecodes = ('i', 'B', 'i', 'i')
+    dtypes = (np.int32, np.uint8, np.int32, np.int32)
+
     def __init__(self):
-        self.variables = set()
-        self.by_course_day = defaultdict(list)
-        self.by_day_room_time = defaultdict(list)
+        self.courses = []
+        self.course_index = {}
+        self.rooms = []
+        self.room_index = {}
+        self._pending = tuple(array(typecode) for typecode in self.typecodes)
+        self._arrays = None
+
+    def intern_course(self, course: Course) -> int:
+        if course not in self.course_index:
+            self.course_index[course] = len(self.courses)
+            self.courses.append(course)
+        return self.course_index[course]
+
+    def intern_room(self, room: Room) -> int:
+        if room not in self.room_index:
+            self.room_index[room] = len(self.rooms)
+            self.rooms.append(room)
+        return self.room_index[room]
+
+    def add_start(self, course: int, mask: int, slot: int, room: int):
+        """ Add the variable for the interned course and room. """
+        if self._pending is None:
+            # Adding after the arrays were built, so start from them.
+            arrays = self._build()
+            self._pending = tuple(
+                array(typecode, arrays[name].tolist())
+                for (typecode, name) in zip(self.typecodes, self.fields))
+            self._arrays = None
+        for (values, value) in zip(self._pending, (course, mask, slot, room)):
+            values.append(value)
+        self._arrays = None
+
+    def add(self, variable: ClassStartVariable):
+        self.add_start(
+            self.intern_course(variable.course),
+            day_mask(variable.days),
+            variable.slot,
+            self.intern_room(variable.room))
+
+    def _build(self):
+        if self._arrays is not None:
+            return self._arrays
+
+        (courses, masks, slots, rooms) = (
+            np.array(values, dtype=dtype)
+            for (values, dtype) in zip(self._pending, self.dtypes))
+        keys = pack_keys(courses, masks, slots, rooms)
+        (_, first) = np.unique(keys, return_index=True)
+        if len(first) < len(keys):
+            keep = np.sort(first)
+            (courses, masks, slots, rooms, keys) = (
+                values[keep] for values in (courses, masks, slots, rooms, keys))
+        # The arrays are only kept as numpy arrays from now on.
+        self._pending = None
+
+        num_days = len(DayPattern.valid_chars)
+        num_slots = int(slots.max()) + 1 if len(slots) else 0
+
+        # Each variable is indexed under every one of its days.
+        day_ids = [np.flatnonzero(masks & (1 << day)) for day in range(num_days)]
+        indexed_ids = np.concatenate(day_ids)
+        indexed_days = np.repeat(
+            np.arange(num_days), [len(ids) for ids in day_ids])
+
+        self._arrays = {
+            'course': courses,
+            'mask': masks,
+            'slot': slots,
+            'room': rooms,
+            'num_slots': num_slots,
+            'sorted_keys': np.sort(keys),
+            'key_order': np.argsort(keys, kind='stable').astype(np.int32),
+            'first_day': np.array(
+                [(mask & -mask).bit_length() - 1 for mask in range(1 << num_days)],
+                dtype=np.int8)[masks],
+            'by_course_day': csr_index(
+                courses[indexed_ids].astype(np.int64) * num_days + indexed_days,
+                indexed_ids,
+                len(self.courses) * num_days),
+            'by_day_room_slot': csr_index(
+                (indexed_days * len(self.rooms) + rooms[indexed_ids]).astype(
+                    np.int64) * num_slots + slots[indexed_ids],
+                indexed_ids,
+                num_days * len(self.rooms) * num_slots),
+        }
+        return self._arrays
+
+    @property
+    def course_of(self) -> np.ndarray:
+        return self._build()['course']
+
+    @property
+    def mask_of(self) -> np.ndarray:
+        return self._build()['mask']
+
+    @property
+    def slot_of(self) -> np.ndarray:
+        return self._build()['slot']
+
+    @property
+    def room_of(self) -> np.ndarray:
+        return self._build()['room']
+
+    @property
+    def first_day_of(self) -> np.ndarray:
+        """ The index of the first day of each variable. """
+        return self._build()['first_day']
 
     def __len__(self):
-        return len(self.variables)
+        return len(self.course_of)
+
+    def __getitem__(self, variable_id: int) -> ClassStartVariable:
+        arrays = self._build()
+        return ClassStartVariable(
+            course=self.courses[arrays['course'][variable_id]],
+            days=mask_days(int(arrays['mask'][variable_id])),
+            slot=int(arrays['slot'][variable_id]),
+            room=self.rooms[arrays['room'][variable_id]])
 
     def __iter__(self):
-        return iter(self.variables)
+        arrays = self._build()
+        for (course, mask, slot, room) in zip(
+                arrays['course'].tolist(), arrays['mask'].tolist(),
+                arrays['slot'].tolist(), arrays['room'].tolist()):
+            yield ClassStartVariable(
+                course=self.courses[course], days=mask_days(mask),
+                slot=slot, room=self.rooms[room])
 
-    def add(self, variable: ClassStartVariable):
-        course_day = CourseDay(course=variable.course, day=variable.day)
-        day_room_time = DayRoomTime(
-            day=variable.day, room=variable.room, time=variable.time
-        )
+    def find_ids(self, courses, masks, slots, rooms) -> np.ndarray:
+        """ The ids of the variables given as arrays of course, day mask,
+        slot and room indexes, or -1 for variables that do not exist. """
+        arrays = self._build()
+        keys = pack_keys(courses, masks, slots, rooms)
+        sorted_keys = arrays['sorted_keys']
+        positions = np.searchsorted(sorted_keys, keys)
+        positions = np.minimum(positions, max(len(sorted_keys) - 1, 0))
+        found = (len(sorted_keys) > 0) & (sorted_keys[positions] == keys)
+        return np.where(found, arrays['key_order'][positions], -1)
+
+    def id_of(self, variable: ClassStartVariable) -> int:
+        if (variable.course not in self.course_index
+                or variable.room not in self.room_index):
+            raise KeyError(variable)
+        variable_id = int(self.find_ids(
+            [self.course_index[variable.course]],
+            [day_mask(variable.days)],
+            [variable.slot],
+            [self.room_index[variable.room]])[0])
+        if variable_id < 0:
+            raise KeyError(variable)
+        return variable_id
+
+    def course_day_ids(self, course: int, day: int) -> np.ndarray:
+        """ The ids of the variables of the course on the day. """
+        (offsets, ids) = self._build()['by_course_day']
+        key = course * len(DayPattern.valid_chars) + day
+        return ids[offsets[key]:offsets[key + 1]]
+
+    def day_room_slot_ids(
+            self, day: int, room: int, first_slot: int,
+            last_slot: int = None) -> np.ndarray:
+        """ The ids of the variables starting in the room on the day at any
+        slot from first_slot to last_slot inclusive, which defaults to
+        first_slot, ordered by slot and then id. """
+        arrays = self._build()
+        (offsets, ids) = arrays['by_day_room_slot']
+        num_slots = arrays['num_slots']
+        if last_slot is None:
+            last_slot = first_slot
+        first_slot = max(first_slot, 0)
+        last_slot = min(last_slot, num_slots - 1)
+        if first_slot > last_slot:
+            return ids[:0]
+        key = (day * len(self.rooms) + room) * num_slots
+        return ids[offsets[key + first_slot]:offsets[key + last_slot + 1]]
+
+    def day_room_start_slots(self, day: int, room: int) -> np.ndarray:
+        """ The slots at which some variable starts in the room on the
+        day, in increasing order. """
+        arrays = self._build()
+        (offsets, _) = arrays['by_day_room_slot']
+        num_slots = arrays['num_slots']
+        key = (day * len(self.rooms) + room) * num_slots
+        counts = np.diff(offsets[key:key + num_slots + 1])
+        return np.flatnonzero(counts)
 
-        self.by_course_day[course_day].append(variable)
-        self.by_day_room_time[day_room_time].append(variable)
-        self.variables.add(variable)
+    @property
+    def by_course_day(self) -> Dict[CourseDay, List[ClassStartVariable]]:
+        """ The variables of each (course, day), as ClassStartVariables. """
+        return {
+            CourseDay(course=course, day=day): [
+                self[i] for i in self.course_day_ids(course_index, day_index)]
+            for (course_index, course) in enumerate(self.courses)
+            for (day_index, day) in enumerate(DayPattern.valid_chars)
+            if len(self.course_day_ids(course_index, day_index))
+        }
 
+    @property
+    def by_day_room_time(self) -> Dict[DayRoomTime, List[ClassStartVariable]]:
+        """ The variables of each (day, room, slot), as ClassStartVariables. """
+        return {
+            DayRoomTime(day=day, room=room, slot=int(slot)): [
+                self[i] for i in self.day_room_slot_ids(
+                    day_index, room_index, slot)]
+            for (day_index, day) in enumerate(DayPattern.valid_chars)
+            for (room_index, room) in enumerate(self.rooms)
+            for slot in self.day_room_start_slots(day_index, room_index)
+        }
 
-def build_variables(model_input: ModelBuilderInput) -> VariableIndexes:
+
+class OccupiedSlots:
+    """ An interval index of the slots at which each (day, room) is
+    occupied by the model input's occupied times.
+
+    An occupied time covers the slots from the one at or before its start
+    to the one at or after its end, so, as between two classes, a class may
+    not start as it ends or end as it starts. The spans of each (day, room)
+    are merged into sorted, disjoint ranges, so that whether a class
+    overlaps any of them is a single binary search.
+    """
+    def __init__(self, model_input: ModelBuilderInput):
+        spans = defaultdict(list)
+        for occupied_time in model_input.occupied_times:
+            (first, last) = occupied_time.slots(model_input.day_range)
+            for day in occupied_time.days:
+                spans[(day, occupied_time.room_name)].append((first, last))
+
+        # (day, room name) -> (first slots, last slots) of the merged spans.
+        self.spans = {}
+        for (key, day_room_spans) in spans.items():
+            merged = []
+            for (first, last) in sorted(day_room_spans):
+                if merged and first <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], last)
+                else:
+                    merged.append([first, last])
+            self.spans[key] = tuple(
+                np.array(column, dtype=np.int64) for column in zip(*merged))
+
+    def free_slots(
+            self,
+            room_name: str,
+            days: str,
+            start_slots: Iterable[int],
+            room_slots: int) -> np.ndarray:
+        """ The start slots at which a class in the room on each of the days,
+        occupying it from its start slot to room_slots later inclusive,
+        overlaps no occupied time. """
+        start_slots = np.asarray(start_slots, dtype=np.int64)
+        blocked = np.zeros(len(start_slots), dtype=bool)
+        for day in days:
+            if (day, room_name) not in self.spans:
+                continue
+            (firsts, lasts) = self.spans[(day, room_name)]
+            # The last span starting no later than the class ends.
+            span = np.searchsorted(
+                firsts, start_slots + room_slots, side='right') - 1
+            blocked |= (span >= 0) & (lasts[np.maximum(span, 0)] >= start_slots)
+        return start_slots[~blocked]
+
+
+def build_variables(
+        model_input: ModelBuilderInput,
+        options: ModelOptions = ModelOptions(),
+        fixed_starts: Dict[Course, Tuple[int, Room]] = None,
+) -> VariableIndexes:
+    """ Build the class start variables for every legal room and time of
+    each course.
+
+    Room times which overlap an occupied time of the room on any day of
+    the course are left out, rather than constrained, and so are start
+    times at which the course's lab overlaps one of its lab room.
+
+    Courses in fixed_starts only get variables for the given (slot, room),
+    provided it is still legal.
+    """
     variable_indexes = VariableIndexes()
     blocks_by_id = {b.block_id: b for b in model_input.blocks}
+    fixed_starts = fixed_starts or {}
+    occupied_slots = OccupiedSlots(model_input)
+    num_occupied = 0
 
     for course in model_input.courses:
         block = blocks_by_id[course.desired_block]
         legal_rooms = [
             room for room in model_input.rooms if room.can_fit(course)]
-        legal_times = [
-            time for time in model_input.day_range.values()
-            if block.contains(time)
+        legal_slots = block.start_slots(model_input.day_range, course)
+        room_slots = model_input.day_range.duration_slots(
+            course.room_minutes_per_day)
+        num_room_times = len(legal_rooms) * len(legal_slots)
+        if course.has_lab_room:
+            (lab_first, lab_last) = course.lab_slots(model_input.day_range)
+            legal_slots = (occupied_slots.free_slots(
+                course.lab_room, course.day_pattern,
+                np.asarray(legal_slots, dtype=np.int64) + lab_first,
+                lab_last - lab_first) - lab_first).tolist()
+
+        room_times = [
+            (room, slot)
+            for room in legal_rooms
+            for slot in occupied_slots.free_slots(
+                room.room_name, course.day_pattern, legal_slots,
+                room_slots).tolist()
         ]
-        room_times = list(product(legal_rooms, legal_times))
+        num_occupied += num_room_times - len(room_times)
+
+        if course in fixed_starts:
+            (fixed_slot, fixed_room) = fixed_starts[course]
+            fixed_room_times = [
+                (room, slot) for (room, slot) in room_times
+                if slot == fixed_slot and room.contains(fixed_room)
+            ]
+            if fixed_room_times:
+                room_times = fixed_room_times
+
         print("Generating {} variables for course='{}' days={} block={}".format(
             len(room_times),
             course.course_id,
@@ -103,12 +466,23 @@ def build_variables(model_input: ModelBuilderInput) -> VariableIndexes:
         if not room_times:
             raise ValueError("No legal room/time for {}".format(course))
 
-        for (room, time) in room_times:
-            for day in course.day_pattern:
-                variable = ClassStartVariable(
-                    course=course, day=day, time=time, room=room,
-                )
-                variable_indexes.add(variable)
+        if options.collapse_day_patterns:
+            meeting_days = [course.day_pattern]
+        else:
+            meeting_days = list(course.day_pattern)
+
+        metrics.observe(
+            'variables_per_course', len(room_times) * len(meeting_days))
+        course_index = variable_indexes.intern_course(course)
+        masks = [day_mask(days) for days in meeting_days]
+        for (room, slot) in room_times:
+            room_index = variable_indexes.intern_room(room)
+            for mask in masks:
+                variable_indexes.add_start(course_index, mask, slot, room_index)
 
+    if num_occupied:
+        print("Left out {} occupied room times".format(num_occupied))
+        metrics.count('occupied_room_times', num_occupied)
     print("Created {} class start variables".format(len(variable_indexes)))
+    metrics.count('variables', len(variable_indexes))
     return variable_indexes
@@ -0,0 +1,113 @@
+from dataclasses import replace
+
+from assertpy import assert_that
+
+from constraints_test import small_input
+from data import CourseDay
+from data import DayPattern
+from data import DayRoomTime
+from data import ModelOptions
+from data import OccupiedTime
+from data import Time
+from variables import ClassStartVariable
+from variables import build_variables
+
+
+def test_indexes_match_variables():
+    model_input = small_input()
+    variables = build_variables(model_input)
+
+    for (variable_id, variable) in enumerate(variables):
+        assert_that(variables[variable_id]).is_equal_to(variable)
+        assert_that(variables.id_of(variable)).is_equal_to(variable_id)
+        for day in variable.days:
+            assert_that(variables.by_course_day[
+                CourseDay(course=variable.course, day=day)]
+            ).contains(variable)
+            assert_that(variables.by_day_room_time[
+                DayRoomTime(day=day, room=variable.room, slot=variable.slot)]
+            ).contains(variable)
+
+    total = sum(len(day_room_vars) for day_room_vars in variables.by_day_room_time.values())
+    assert_that(total).is_equal_to(len(variables))
+
+
+def test_collapsed_variables_are_indexed_on_each_day():
+    model_input = small_input()
+    variables = build_variables(
+        model_input, ModelOptions(collapse_day_patterns=True))
+    variable = variables[0]
+
+    assert_that(variable.days).is_equal_to('MW')
+    for day_index in (0, 2):
+        assert_that(variables.day_room_slot_ids(
+            day_index, 0, variable.slot).tolist()).contains(0)
+
+
+def test_add_drops_duplicates_and_missing_variables_raise():
+    model_input = small_input()
+    variables = build_variables(model_input)
+    num_variables = len(variables)
+    first = variables[0]
+
+    variables.add(first)
+    assert_that(variables).is_length(num_variables)
+
+    friday = ClassStartVariable(
+        course=first.course, days='F', slot=first.slot, room=first.room)
+    assert_that(variables.id_of).raises(KeyError).when_called_with(friday)
+    variables.add(friday)
+    assert_that(variables.id_of(friday)).is_equal_to(num_variables)
+
+
+def test_occupied_room_times_are_left_out():
+    model_input = small_input()
+    (mth1, mth2) = model_input.courses
+    occupied_input = replace(model_input, occupied_times=[OccupiedTime(
+        room_name='A', days=DayPattern.parse('M'),
+        start_time=Time(hour=8, minute=30), end_time=Time(hour=8, minute=45))])
+
+    variables = build_variables(model_input)
+    occupied_variables = build_variables(occupied_input)
+
+    # MTH 1 meets on Monday, so it may not be in A from 8:30 to 8:45,
+    # including the slot at the end of its lecture.
+    assert_that([v for v in occupied_variables if v.course == mth1]
+                ).is_equal_to([v for v in variables
+                               if v.course == mth1 and v.slot > 9])
+    # MTH 2 only meets on Wednesday.
+    assert_that([v for v in occupied_variables if v.course == mth2]
+                ).is_equal_to([v for v in variables if v.course == mth2])
+
+
+def test_labs_overlapping_occupied_times_are_left_out():
+    model_input = small_input()
+    (mth1, mth2) = model_input.courses
+    # MTH 2's lab in LAB runs from 30 to 60 minutes after it starts.
+    lab_input = replace(model_input, courses=[
+        mth1, replace(mth2, lab_minutes_per_week=30, lab_room='LAB')])
+    occupied_input = replace(lab_input, occupied_times=[OccupiedTime(
+        room_name='LAB', days=DayPattern.parse('W'),
+        start_time=Time(hour=9, minute=30), end_time=Time(hour=9, minute=45))])
+
+    variables = build_variables(lab_input)
+    occupied_variables = build_variables(occupied_input)
+
+    assert_that([v for v in occupied_variables if v.course.course_id == 'MTH 2']
+                ).is_equal_to([v for v in variables
+                               if v.course.course_id == 'MTH 2' and v.slot < 6])
+
+
+def test_start_grid_leaves_out_starts_off_the_grid():
+    model_input = small_input()
+    gridded_input = replace(model_input, blocks=[
+        replace(block, start_grid_minutes=15) for block in model_input.blocks])
+
+    variables = build_variables(model_input)
+    gridded_variables = build_variables(gridded_input)
+
+    assert_that(gridded_variables).is_length(
+        len([v for v in variables
+             if model_input.day_range.time(v.slot).minute % 15 == 0]))
+    assert_that(len(variables)).is_greater_than_or_equal_to(
+        3 * len(gridded_variables))